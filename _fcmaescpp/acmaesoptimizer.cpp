@@ -404,8 +404,12 @@ public:
                 iterations++) {
             // generate and evaluate popsize offspring
             newArgs();
+            mat xs(dim, popsize);
+            for (int k = 0; k < popsize; k++)
+                xs.col(k) = fitfun->decode(arx.col(k));
+            // a single call for the whole population if the fitness is parallel
+            fitness = fitfun->values(xs).row(0).transpose();
             for (int k = 0; k < popsize; k++) {
-                fitness[k] = fitfun->eval(fitfun->decode(arx.col(k)))(0);
                 if (!isfinite(fitness[k]))
                     fitness[k] = DBL_MAX;
             }
@@ -426,7 +430,8 @@ public:
             eval.evaluate(x, i);
             evals_x[i] = x;
         }
-        while (fitfun->evaluations() < maxEvaluations) {
+        while (fitfun->evaluations() < maxEvaluations && !fitfun->terminate()
+                && stop == 0) {
             vec_id* vid = eval.result();
             vec y = vec(vid->_v);
             int p = vid->_id;
@@ -439,6 +444,8 @@ public:
             eval.evaluate(x, p);
             evals_x[p] = x;
         }
+        evalStats = std::vector<double>(EVAL_STATS_SIZE + 2 * workers);
+        eval.stats(evalStats.data(), workers);
     }
 
     vec getBestX() {
@@ -457,6 +464,11 @@ public:
         return stop;
     }
 
+    // evaluator telemetry of do_optimize_delayed_update
+    const std::vector<double>& getEvalStats() {
+        return evalStats;
+    }
+
     Fitness* getFitfun() {
         return fitfun;
     }
@@ -511,6 +523,7 @@ private:
     double bestValue;
     vec bestX;
     int stop;
+    std::vector<double> evalStats;
     int told = 0;
     pcg64 *rs;
 };
@@ -518,9 +531,9 @@ private:
 
 using namespace acmaes;
 
-extern "C" {
-void optimizeACMA_C(long runid, callback_type func, int dim,
-        double *init, double *lower, double *upper, double *sigma,
+// one of func, func_par and func_scalar is defined
+static void optimizeACMA(long runid, callback_type func, callback_parallel func_par,
+        callback_scalar func_scalar, int dim, double *init, double *lower, double *upper, double *sigma,
         int maxEvals, double stopfitness, int mu, int popsize, double accuracy,
         long seed, bool normalize, int update_gap, int workers, double* res) {
     int n = dim;
@@ -538,12 +551,15 @@ void optimizeACMA_C(long runid, callback_type func, int dim,
         lower_limit.resize(0);
         upper_limit.resize(0);
     }
-    Fitness fitfun(func, n, 1, lower_limit, upper_limit);
+    Fitness fitfun = func_par != NULL ?
+            Fitness(func_par, n, 1, lower_limit, upper_limit) :
+            func_scalar != NULL ? Fitness(func_scalar, n, lower_limit, upper_limit) :
+            Fitness(func, n, 1, lower_limit, upper_limit);
     fitfun.setNormalize(normalize);
     AcmaesOptimizer opt(runid, &fitfun, popsize, mu, guess, inputSigma,
             maxEvals, accuracy, stopfitness, update_gap, seed);
     try {
-        if (workers <= 1)
+        if (workers <= 1 || fitfun.isParallel())
             opt.doOptimize();
         else
             opt.do_optimize_delayed_update(workers);
@@ -555,8 +571,122 @@ void optimizeACMA_C(long runid, callback_type func, int dim,
         res[n + 1] = fitfun.evaluations();
         res[n + 2] = opt.getIterations();
         res[n + 3] = opt.getStop();
+        const std::vector<double> &stats = opt.getEvalStats();
+        std::copy(stats.begin(), stats.end(), res + n + 4);
     } catch (std::exception &e) {
         cout << e.what() << endl;
     }
 }
+
+extern "C" {
+void optimizeACMA_C(long runid, callback_type func, int dim,
+        double *init, double *lower, double *upper, double *sigma,
+        int maxEvals, double stopfitness, int mu, int popsize, double accuracy,
+        long seed, bool normalize, int update_gap, int workers, double* res) {
+    optimizeACMA(runid, func, NULL, NULL, dim, init, lower, upper, sigma, maxEvals,
+            stopfitness, mu, popsize, accuracy, seed, normalize, update_gap,
+            workers, res);
+}
+
+// calls the single objective func_scalar directly
+void optimizeACMA_scalar_C(long runid, callback_scalar func_scalar, int dim,
+        double *init, double *lower, double *upper, double *sigma,
+        int maxEvals, double stopfitness, int mu, int popsize, double accuracy,
+        long seed, bool normalize, int update_gap, int workers, double* res) {
+    optimizeACMA(runid, NULL, NULL, func_scalar, dim, init, lower, upper, sigma,
+            maxEvals, stopfitness, mu, popsize, accuracy, seed, normalize,
+            update_gap, workers, res);
+}
+
+// evaluates each generation with a single func_par call
+void optimizeACMA_par_C(long runid, callback_parallel func_par, int dim,
+        double *init, double *lower, double *upper, double *sigma,
+        int maxEvals, double stopfitness, int mu, int popsize, double accuracy,
+        long seed, bool normalize, int update_gap, double* res) {
+    optimizeACMA(runid, NULL, func_par, NULL, dim, init, lower, upper, sigma, maxEvals,
+            stopfitness, mu, popsize, accuracy, seed, normalize, update_gap,
+            1, res);
+}
+
+// ask / tell interface, the returned handle needs to be released by destroyACMA_C.
+uintptr_t initACMA_C(long runid, int dim, double *init, double *lower,
+        double *upper, double *sigma, int maxEvals, double stopfitness, int mu,
+        int popsize, double accuracy, long seed, bool normalize, int update_gap) {
+    int n = dim;
+    vec guess(n), lower_limit(n), upper_limit(n), inputSigma(n);
+    bool useLimit = false;
+    for (int i = 0; i < n; i++) {
+        guess[i] = init[i];
+        inputSigma[i] = sigma[i];
+        lower_limit[i] = lower[i];
+        upper_limit[i] = upper[i];
+        useLimit |= (lower[i] != 0);
+        useLimit |= (upper[i] != 0);
+    }
+    if (useLimit == false) {
+        lower_limit.resize(0);
+        upper_limit.resize(0);
+    }
+    Fitness *fitfun = new Fitness((callback_type) NULL, n, 1, lower_limit,
+            upper_limit);
+    fitfun->setNormalize(normalize);
+    AcmaesOptimizer *opt = new AcmaesOptimizer(runid, fitfun, popsize, mu,
+            guess, inputSigma, maxEvals, accuracy, stopfitness, update_gap, seed);
+    return (uintptr_t) opt;
+}
+
+void destroyACMA_C(uintptr_t ptr) {
+    AcmaesOptimizer *opt = (AcmaesOptimizer*) ptr;
+    delete opt->getFitfun();
+    delete opt;
+}
+
+// writes n argument vectors to xs
+void askACMA_C(uintptr_t ptr, int n, double *xs) {
+    AcmaesOptimizer *opt = (AcmaesOptimizer*) ptr;
+    int dim = opt->getDim();
+    for (int i = 0; i < n; i++) {
+        vec x = opt->ask();
+        std::copy(x.data(), x.data() + dim, xs + i * dim);
+    }
+}
+
+// tells the function values ys of the n argument vectors xs, returns the stop criteria
+int tellACMA_C(uintptr_t ptr, int n, double *ys, double *xs) {
+    AcmaesOptimizer *opt = (AcmaesOptimizer*) ptr;
+    int dim = opt->getDim();
+    try {
+        for (int i = 0; i < n; i++) {
+            opt->getFitfun()->incrEvaluations();
+            opt->tell(ys[i], Eigen::Map<vec>(xs + i * dim, dim));
+        }
+    } catch (std::exception &e) {
+        cout << e.what() << endl;
+    }
+    return opt->getStop();
+}
+
+// writes best x, best y, evaluations, iterations and stop criteria to res
+void stateACMA_C(uintptr_t ptr, double *res) {
+    AcmaesOptimizer *opt = (AcmaesOptimizer*) ptr;
+    int n = opt->getDim();
+    vec bestX = opt->getBestX();
+    for (int i = 0; i < n; i++)
+        res[i] = bestX[i];
+    res[n] = opt->getBestValue();
+    res[n + 1] = opt->getFitfun()->evaluations();
+    res[n + 2] = opt->getIterations();
+    res[n + 3] = opt->getStop();
+}
+
+// size of the telemetry without the per worker counters, see evaluator.h. Signals that
+// optimizeACMA_C and optimizeDE_C append the telemetry to the result if workers > 1.
+int evalStatsSize_C() {
+    return EVAL_STATS_SIZE;
+}
+
+// signals that optimizeACMA_C checks is_terminate and the stop criteria also if workers > 1
+int terminateWorkersACMA_C() {
+    return 1;
+}
 }
@@ -88,7 +88,7 @@ public:
     void doOptimize() {
 
         // -------------------- Generation Loop --------------------------------
-        for (iterations = 1; fitfun->evaluations() < maxEvaluations;
+        for (iterations = 1; fitfun->evaluations() < maxEvaluations && !fitfun->terminate();
                 iterations++) {
             int stallCount = optimize(rnd);
             if (getBestCost() < stopfitness) {
@@ -122,9 +122,9 @@ private:
 
 using namespace biteopt;
 
-extern "C" {
-void optimizeBite_C(long runid, callback_type func, int dim, int seed,
-        double *init, double *lower, double *upper, int maxEvals,
+// either func or func_scalar is defined
+static void optimizeBite(long runid, callback_type func, callback_scalar func_scalar,
+        int dim, int seed, double *init, double *lower, double *upper, int maxEvals,
         double stopfitness, int M, int stall_iterations, double* res) {
     int n = dim;
     vec lower_limit(n), upper_limit(n);
@@ -139,7 +139,9 @@ void optimizeBite_C(long runid, callback_type func, int dim, int seed,
         lower_limit.resize(0);
         upper_limit.resize(0);
     }
-    Fitness fitfun(func, n, 1, lower_limit, upper_limit);
+    Fitness fitfun = func_scalar != NULL ?
+            Fitness(func_scalar, n, lower_limit, upper_limit) :
+            Fitness(func, n, 1, lower_limit, upper_limit);
     BiteOptimizer opt(runid, &fitfun, dim, init, seed, M, stall_iterations, maxEvals,
             stopfitness);
 
@@ -157,5 +159,26 @@ void optimizeBite_C(long runid, callback_type func, int dim, int seed,
         cout << e.what() << endl;
     }
 }
+
+extern "C" {
+void optimizeBite_C(long runid, callback_type func, int dim, int seed,
+        double *init, double *lower, double *upper, int maxEvals,
+        double stopfitness, int M, int stall_iterations, double* res) {
+    optimizeBite(runid, func, NULL, dim, seed, init, lower, upper, maxEvals,
+            stopfitness, M, stall_iterations, res);
+}
+
+// calls the single objective func_scalar directly
+void optimizeBite_scalar_C(long runid, callback_scalar func_scalar, int dim, int seed,
+        double *init, double *lower, double *upper, int maxEvals,
+        double stopfitness, int M, int stall_iterations, double* res) {
+    optimizeBite(runid, NULL, func_scalar, dim, seed, init, lower, upper, maxEvals,
+            stopfitness, M, stall_iterations, res);
+}
+
+// signals that optimizeBite_C checks is_terminate
+int terminateBite_C() {
+    return 1;
+}
 }
 
@@ -87,7 +87,7 @@ public:
     void doOptimize() {
 
         // -------------------- Generation Loop --------------------------------
-        for (iterations = 1; fitfun->evaluations() < maxEvaluations;
+        for (iterations = 1; fitfun->evaluations() < maxEvaluations && !fitfun->terminate();
                 iterations++) {
             int stallCount = optimize(rnd);
             if (getBestCost() < stopfitness) {
@@ -120,10 +120,10 @@ private:
 
 using namespace csmaopt;
 
-extern "C" {
-void optimizeCsma_C(long runid, callback_type func, int dim, int seed,
-        double *init, double *lower, double *upper, double *sigma, int maxEvals,
-        double stopfitness, int popsize, double* res) {
+// either func or func_scalar is defined
+static void optimizeCsma(long runid, callback_type func, callback_scalar func_scalar,
+        int dim, int seed, double *init, double *lower, double *upper, double *sigma,
+        int maxEvals, double stopfitness, int popsize, double* res) {
     int n = dim;
     vec lower_limit(n), upper_limit(n);
     bool useLimit = false;
@@ -137,7 +137,9 @@ void optimizeCsma_C(long runid, callback_type func, int dim, int seed,
         lower_limit.resize(0);
         upper_limit.resize(0);
     }
-    Fitness fitfun(func, dim, 1, lower_limit, upper_limit);
+    Fitness fitfun = func_scalar != NULL ?
+            Fitness(func_scalar, dim, lower_limit, upper_limit) :
+            Fitness(func, dim, 1, lower_limit, upper_limit);
     CsmaOptimizer opt(runid, &fitfun, dim, init, sigma, seed, popsize, maxEvals,
             stopfitness);
 
@@ -155,5 +157,26 @@ void optimizeCsma_C(long runid, callback_type func, int dim, int seed,
         cout << e.what() << endl;
     }
 }
+
+extern "C" {
+void optimizeCsma_C(long runid, callback_type func, int dim, int seed,
+        double *init, double *lower, double *upper, double *sigma, int maxEvals,
+        double stopfitness, int popsize, double* res) {
+    optimizeCsma(runid, func, NULL, dim, seed, init, lower, upper, sigma, maxEvals,
+            stopfitness, popsize, res);
+}
+
+// calls the single objective func_scalar directly
+void optimizeCsma_scalar_C(long runid, callback_scalar func_scalar, int dim, int seed,
+        double *init, double *lower, double *upper, double *sigma, int maxEvals,
+        double stopfitness, int popsize, double* res) {
+    optimizeCsma(runid, NULL, func_scalar, dim, seed, init, lower, upper, sigma,
+            maxEvals, stopfitness, popsize, res);
+}
+
+// signals that optimizeCsma_C checks is_terminate
+int terminateCsma_C() {
+    return 1;
+}
 }
 
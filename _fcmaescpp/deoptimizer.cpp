@@ -250,6 +250,61 @@ public:
         }
     }
 
+    // generational variant evaluating each generation and its temporal locality
+    // improvements with one call of a parallel fitness.
+    void do_optimize_par() {
+        iterations = 0;
+        while (fitfun->evaluations() < maxEvaluations && !fitfun->terminate()) {
+            vec xb = popX.col(bestI);
+            mat xs(dim, popsize);
+            for (int p = 0; p < popsize; p++)
+                xs.col(p) = nextX(p, popX.col(p), xb);
+            vec ys = fitfun->values(xs).row(0).transpose();
+            std::vector<int> improved;
+            for (int p = 0; p < popsize; p++)
+                if (isfinite(ys[p]) && ys[p] < popY[p])
+                    improved.push_back(p);
+            // temporal locality
+            mat xs2(dim, improved.size());
+            for (int i = 0; i < improved.size(); i++)
+                xs2.col(i) = next_improve(xb, xs.col(improved[i]), popX.col(improved[i]));
+            vec ys2 = improved.empty() ? vec(0) :
+                    vec(fitfun->values(xs2).row(0).transpose());
+            int i = 0;
+            for (int p = 0; p < popsize; p++) {
+                if (i < improved.size() && improved[i] == p) {
+                    vec x = xs.col(p);
+                    double y = ys[p];
+                    if (isfinite(ys2[i]) && ys2[i] < y) {
+                        y = ys2[i];
+                        x = xs2.col(i);
+                    }
+                    i++;
+                    popX.col(p) = x;
+                    popY(p) = y;
+                    popIter[p] = iterations;
+                    if (y < popY[bestI]) {
+                        bestI = p;
+                        if (y < bestY) {
+                            bestY = y;
+                            bestX = x;
+                            if (isfinite(stopfitness) && bestY < stopfitness) {
+                                stop = 1;
+                                return;
+                            }
+                        }
+                    }
+                } else {
+                    // reinitialize individual
+                    if (keep * rnd01() < iterations - popIter[p]) {
+                        popX.col(p) = fitfun->sample(*rs);
+                        popY[p] = DBL_MAX;
+                    }
+                }
+            }
+        }
+    }
+
     void do_optimize_delayed_update(int workers) {
     	 iterations = 0;
     	 fitfun->resetEvaluations();
@@ -285,6 +340,8 @@ public:
     		 evals_p[cp] = p;
              cp = (cp + 1) % evals_size; 
     	 }
+         evalStats = std::vector<double>(EVAL_STATS_SIZE + 2 * workers);
+         eval.stats(evalStats.data(), workers);
 	}
 
     void init() {
@@ -316,6 +373,11 @@ public:
         return stop;
     }
 
+    // evaluator telemetry of do_optimize_delayed_update
+    const std::vector<double>& getEvalStats() {
+        return evalStats;
+    }
+
     Fitness* getFitfun() {
         return fitfun;
     }
@@ -324,6 +386,10 @@ public:
         return dim;
     }
 
+    bool* getIsInt() {
+        return isInt;
+    }
+
 private:
     long runid;
     Fitness *fitfun;
@@ -337,6 +403,7 @@ private:
     vec bestX;
     int bestI;
     int stop;
+    std::vector<double> evalStats;
     double F0;
     double CR0;
     double F;
@@ -356,9 +423,9 @@ private:
 
 using namespace differential_evolution;
 
-extern "C" {
-void optimizeDE_C(long runid, callback_type func, int dim, int seed,
-        double *lower, double *upper, bool *ints,
+// one of func, func_par and func_scalar is defined
+static void optimizeDE(long runid, callback_type func, callback_parallel func_par,
+        callback_scalar func_scalar, int dim, int seed, double *lower, double *upper, bool *ints,
         int maxEvals, double keep,
         double stopfitness, int popsize, double F, double CR, int workers, double* res) {
     vec lower_limit(dim), upper_limit(dim);
@@ -375,11 +442,16 @@ void optimizeDE_C(long runid, callback_type func, int dim, int seed,
             upper_limit[i] += .499999999;
         }
     }
-    Fitness fitfun(func, dim, 1, lower_limit, upper_limit);
+    Fitness fitfun = func_par != NULL ?
+            Fitness(func_par, dim, 1, lower_limit, upper_limit) :
+            func_scalar != NULL ? Fitness(func_scalar, dim, lower_limit, upper_limit) :
+            Fitness(func, dim, 1, lower_limit, upper_limit);
     DeOptimizer opt(runid, &fitfun, dim, seed, popsize, maxEvals, keep,
             stopfitness, F, CR, useIsInt ? isInt : NULL);
     try {
-        if (workers <= 1)
+        if (fitfun.isParallel())
+            opt.do_optimize_par();
+        else if (workers <= 1)
             opt.doOptimize();
         else
             opt.do_optimize_delayed_update(workers);
@@ -391,9 +463,111 @@ void optimizeDE_C(long runid, callback_type func, int dim, int seed,
         res[dim + 1] = fitfun.evaluations();
         res[dim + 2] = opt.getIterations();
         res[dim + 3] = opt.getStop();
+        const std::vector<double> &stats = opt.getEvalStats();
+        std::copy(stats.begin(), stats.end(), res + dim + 4);
     } catch (std::exception &e) {
         cout << e.what() << endl;
     }
 }
+
+extern "C" {
+void optimizeDE_C(long runid, callback_type func, int dim, int seed,
+        double *lower, double *upper, bool *ints,
+        int maxEvals, double keep,
+        double stopfitness, int popsize, double F, double CR, int workers, double* res) {
+    optimizeDE(runid, func, NULL, NULL, dim, seed, lower, upper, ints, maxEvals, keep,
+            stopfitness, popsize, F, CR, workers, res);
+}
+
+// calls the single objective func_scalar directly
+void optimizeDE_scalar_C(long runid, callback_scalar func_scalar, int dim, int seed,
+        double *lower, double *upper, bool *ints,
+        int maxEvals, double keep,
+        double stopfitness, int popsize, double F, double CR, int workers, double* res) {
+    optimizeDE(runid, NULL, NULL, func_scalar, dim, seed, lower, upper, ints, maxEvals,
+            keep, stopfitness, popsize, F, CR, workers, res);
+}
+
+// evaluates each generation with a single func_par call
+void optimizeDE_par_C(long runid, callback_parallel func_par, int dim, int seed,
+        double *lower, double *upper, bool *ints,
+        int maxEvals, double keep,
+        double stopfitness, int popsize, double F, double CR, double* res) {
+    optimizeDE(runid, NULL, func_par, NULL, dim, seed, lower, upper, ints, maxEvals, keep,
+            stopfitness, popsize, F, CR, 1, res);
+}
+
+// ask / tell interface, the returned handle needs to be released by destroyDE_C.
+uintptr_t initDE_C(long runid, int dim, int seed, double *lower, double *upper,
+        bool *ints, int maxEvals, double keep, double stopfitness, int popsize,
+        double F, double CR) {
+    vec lower_limit(dim), upper_limit(dim);
+    bool *isInt = new bool[dim];
+    bool useIsInt = false;
+    for (int i = 0; i < dim; i++) {
+        lower_limit[i] = lower[i];
+        upper_limit[i] = upper[i];
+        isInt[i] = ints[i];
+        useIsInt |= ints[i];
+        if (isInt[i]) {
+            // adjust bounds because ints are rounded
+            lower_limit[i] -= .499999999;
+            upper_limit[i] += .499999999;
+        }
+    }
+    if (!useIsInt) {
+        delete[] isInt;
+        isInt = NULL;
+    }
+    Fitness *fitfun = new Fitness((callback_type) NULL, dim, 1, lower_limit,
+            upper_limit);
+    DeOptimizer *opt = new DeOptimizer(runid, fitfun, dim, seed, popsize,
+            maxEvals, keep, stopfitness, F, CR, isInt);
+    return (uintptr_t) opt;
+}
+
+void destroyDE_C(uintptr_t ptr) {
+    DeOptimizer *opt = (DeOptimizer*) ptr;
+    delete opt->getFitfun();
+    delete[] opt->getIsInt();
+    delete opt;
+}
+
+// writes n argument vectors to xs and their population indices to ps
+void askDE_C(uintptr_t ptr, int n, double *xs, int *ps) {
+    DeOptimizer *opt = (DeOptimizer*) ptr;
+    int dim = opt->getDim();
+    for (int i = 0; i < n; i++) {
+        vec x = opt->ask(ps[i]);
+        std::copy(x.data(), x.data() + dim, xs + i * dim);
+    }
+}
+
+// tells the function values ys of the n argument vectors xs, returns the stop criteria
+int tellDE_C(uintptr_t ptr, int n, double *ys, double *xs, int *ps) {
+    DeOptimizer *opt = (DeOptimizer*) ptr;
+    int dim = opt->getDim();
+    try {
+        for (int i = 0; i < n; i++) {
+            opt->getFitfun()->incrEvaluations();
+            opt->tell(ys[i], Eigen::Map<vec>(xs + i * dim, dim), ps[i]);
+        }
+    } catch (std::exception &e) {
+        cout << e.what() << endl;
+    }
+    return opt->getStop();
 }
 
+// writes best x, best y, evaluations, iterations and stop criteria to res
+void stateDE_C(uintptr_t ptr, double *res) {
+    DeOptimizer *opt = (DeOptimizer*) ptr;
+    int dim = opt->getDim();
+    vec bestX = opt->getBestX();
+    for (int i = 0; i < dim; i++)
+        res[i] = bestX[i];
+    res[dim] = opt->getBestValue();
+    res[dim + 1] = opt->getFitfun()->evaluations();
+    res[dim + 2] = opt->getIterations();
+    res[dim + 3] = opt->getStop();
+}
+}
@@ -20,7 +20,7 @@ typedef Eigen::Matrix<double, Eigen::Dynamic, 1> vec;
 typedef Eigen::Matrix<int, Eigen::Dynamic, 1> ivec;
 typedef Eigen::Matrix<double, Eigen::Dynamic, Eigen::Dynamic> mat;
 
-typedef void (*callback_parallel)(int, int, double[], double[]);
+typedef bool (*callback_parallel)(int, int, double[], double[]);
 
 namespace gcl_differential_evolution {
 
@@ -90,6 +90,7 @@ public:
     Fitness(callback_parallel func_par_, int dim_, const vec &lower_limit,
             const vec &upper_limit) {
         func_par = func_par_;
+        _terminate = false;
         dim = dim_;
         lower = lower_limit;
         upper = upper_limit;
@@ -114,12 +115,16 @@ public:
             for (int i = 0; i < n; i++)
                 pargs[p * n + i] = popX(i, p);
         }
-        func_par(popsize, n, pargs, res);
+        _terminate = func_par(popsize, n, pargs, res) || _terminate;
         for (int p = 0; p < popX.cols(); p++)
             ys[p] = res[p];
         evaluationCounter += popsize;
     }
 
+    bool terminate() {
+        return _terminate;
+    }
+
     bool feasible(int i, double x) {
         return lower.size() == 0 || (x >= lower[i] && x <= upper[i]);
     }
@@ -145,6 +150,7 @@ public:
 
 private:
     callback_parallel func_par;
+    bool _terminate;
     int dim;
     vec lower;
     vec upper;
@@ -222,7 +228,7 @@ public:
                 gen_stuck = 0;
             previous_best = bestY;
 
-            if (fitfun->getEvaluations() >= maxEvaluations)
+            if (fitfun->getEvaluations() >= maxEvaluations || fitfun->terminate())
                 return;
             for (int p = 0; p < popsize; p++) {
                 int r1, r2, r3;
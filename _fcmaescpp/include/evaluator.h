@@ -77,10 +77,19 @@ typedef Eigen::Matrix<int, Eigen::Dynamic, Eigen::Dynamic> imat;
 
 typedef bool (*callback_type)(int, const double*, double*);
 
-static std::uniform_real_distribution<> distr_01 = std::uniform_real_distribution<>(
+// single objective function returning its value, cannot signal termination.
+typedef double (*callback_scalar)(int, const double*);
+
+// evaluates a population of n individuals: xs holds n * dim arguments, ys receives
+// n * nobj function values, both stored individual after individual.
+typedef bool (*callback_parallel)(int, int, double[], double[]);
+
+// thread local, the distributions may cache state and optimizers run in parallel threads
+// of the native retry, see retry.cpp.
+static thread_local std::uniform_real_distribution<> distr_01 = std::uniform_real_distribution<>(
         0, 1);
 
-static std::normal_distribution<> gauss_01 = std::normal_distribution<>(0, 1);
+static thread_local std::normal_distribution<> gauss_01 = std::normal_distribution<>(0, 1);
 
 static Eigen::MatrixXd normal(int dx, int dy, pcg64 &rs) {
     return Eigen::MatrixXd::NullaryExpr(dx, dy, [&]() {
@@ -157,33 +166,46 @@ public:
 
     Fitness(callback_type func, int dim, int nobj, const vec &lower,
             const vec &upper) :
-                _func(func), _dim(dim), _nobj(nobj), _lower(lower), _upper(upper) {
-        _scale = _upper - _lower;
-        _typx = 0.5 * (_upper + _lower);
-        _evaluationCounter = 0;
-        _normalize = false;
-        _terminate = false;
+                _func(func), _func_par(NULL), _func_scalar(NULL), _dim(dim), _nobj(nobj), _lower(lower), _upper(upper) {
+        init();
+    }
+
+    Fitness(callback_scalar func_scalar, int dim, const vec &lower,
+            const vec &upper) :
+                _func(NULL), _func_par(NULL), _func_scalar(func_scalar), _dim(dim), _nobj(1), _lower(lower), _upper(upper) {
+        init();
+    }
+
+    // population based evaluation, see values(const mat&). Single evaluations
+    // call func_par with a population of size 1.
+    Fitness(callback_parallel func_par, int dim, int nobj, const vec &lower,
+            const vec &upper) :
+                _func(NULL), _func_par(func_par), _func_scalar(NULL), _dim(dim), _nobj(nobj), _lower(lower), _upper(upper) {
+        init();
     }
 
     bool terminate() {
         return _terminate;
     }
 
+    bool isParallel() {
+        return _func_par != NULL;
+    }
+
     vec eval(const vec &X) {
-        double res[_nobj];
-        _terminate = _terminate || _func(_dim, X.data(), res);
-        for (int i = 0; i < _nobj; i++) {
-            if (std::isnan(res[i]) || !std::isfinite(res[i]))
-                res[i] = 1E99;
-        }
-        _evaluationCounter++;
-        vec rvec = Eigen::Map<vec, Eigen::Unaligned>(res, _nobj);
-        return rvec;
+        return eval(X.data());
     }
 
     vec eval(const double *const p) {
         double res[_nobj];
-        _terminate = _terminate || _func(_dim, p, res);
+        if (_func_par != NULL) {
+            double x[_dim];
+            std::copy(p, p + _dim, x);
+            _terminate = _func_par(1, _dim, x, res) || _terminate;
+        } else if (_func_scalar != NULL)
+            res[0] = _func_scalar(_dim, p);
+        else
+            _terminate = _func(_dim, p, res) || _terminate;
         for (int i = 0; i < _nobj; i++) {
             if (std::isnan(res[i]) || !std::isfinite(res[i]))
                 res[i] = 1E99;
@@ -193,6 +215,26 @@ public:
         return rvec;
     }
 
+    // evaluates the columns of popX, returns a nobj x popsize matrix.
+    // Uses a single func_par call if defined.
+    mat values(const mat &popX) {
+        int popsize = popX.cols();
+        mat ys(_nobj, popsize);
+        if (_func_par == NULL) {
+            for (int p = 0; p < popsize; p++)
+                ys.col(p) = eval(popX.col(p));
+            return ys;
+        }
+        mat xs(popX); // func_par may modify its arguments
+        _terminate = _func_par(popsize, _dim, xs.data(), ys.data()) || _terminate;
+        for (int i = 0; i < ys.size(); i++) {
+            if (std::isnan(ys(i)) || !std::isfinite(ys(i)))
+                ys(i) = 1E99;
+        }
+        _evaluationCounter += popsize;
+        return ys;
+    }
+
     void valuesVec(const mat &popX, int popsize, vec &ys) {
         for (int p = 0; p < popsize; p++) {
             vec x = decode(getClosestFeasible(popX.col(p)));
@@ -282,7 +324,18 @@ public:
     }
 
 private:
+
+    void init() {
+        _scale = _upper - _lower;
+        _typx = 0.5 * (_upper + _lower);
+        _evaluationCounter = 0;
+        _normalize = false;
+        _terminate = false;
+    }
+
     callback_type _func;
+    callback_parallel _func_par;
+    callback_scalar _func_scalar;
     int _dim;
     int _nobj;
     vec _lower;
@@ -294,6 +347,15 @@ private:
     long _evaluationCounter;
 };
 
+// number of latency histogram bins, bin k counts evaluations taking [2^k, 2^(k+1)) microseconds
+static const int EVAL_HIST_BINS = 24;
+// size of the telemetry buffer without the per worker counters, see evaluator::stats
+static const int EVAL_STATS_SIZE = 8 + EVAL_HIST_BINS;
+
+static double seconds(Clock::duration d) {
+    return std::chrono::duration<double>(d).count();
+}
+
 struct vec_id {
 public:
 
@@ -314,6 +376,15 @@ public:
         _t0 = Clock::now();
         if (_workers <= 0)
             _workers = std::thread::hardware_concurrency();
+        _busy = std::vector<double>(_workers, 0);
+        _evals = std::vector<long>(_workers, 0);
+        _hist = std::vector<long>(EVAL_HIST_BINS, 0);
+        _queueSum = 0;
+        _queueSamples = 0;
+        _queueMax = 0;
+        _driver = 0;
+        _wait = 0;
+        _hasReceived = false;
         for (int thread_id = 0; thread_id < _workers; thread_id++) {
             _jobs.push_back(evaluator_job(thread_id, this));
         }
@@ -326,24 +397,75 @@ public:
     }
 
     void evaluate(vec &x, int id) {
+        if (_hasReceived) { // driver time since the last result
+            _driver += seconds(Clock::now() - _received);
+            _hasReceived = false;
+        }
+        int queued = _requests->size();
+        _queueSum += queued;
+        _queueSamples++;
+        _queueMax = std::max(_queueMax, queued);
         _requests->put(new vec_id(x, id));
     }
 
     // needs to be deleted
     vec_id* result() {
-        return _evaled->take();
+        time_point<Clock> t = Clock::now();
+        vec_id* vid = _evaled->take();
+        _received = Clock::now();
+        _hasReceived = true;
+        _wait += seconds(_received - t);
+        return vid;
+    }
+
+    // telemetry: s[0] wall time, s[1] evaluations, s[2] busy time, s[3] idle time,
+    // s[4] mean request queue depth, s[5] max queue depth, s[6] driver time between
+    // result and next evaluate, s[7] time waiting for results, s[8..EVAL_STATS_SIZE)
+    // latency histogram, followed by busy time and evaluations of the first n workers.
+    void stats(double *s, int n) {
+        std::unique_lock<std::mutex> lock(_stats_mutex);
+        double elapsed = seconds(Clock::now() - _t0);
+        double busy = 0;
+        long evals = 0;
+        for (int w = 0; w < _workers; w++) {
+            busy += _busy[w];
+            evals += _evals[w];
+        }
+        s[0] = elapsed;
+        s[1] = evals;
+        s[2] = busy;
+        s[3] = std::max(0.0, _workers * elapsed - busy);
+        s[4] = _queueSamples > 0 ? _queueSum / _queueSamples : 0;
+        s[5] = _queueMax;
+        s[6] = _driver;
+        s[7] = _wait;
+        for (int i = 0; i < EVAL_HIST_BINS; i++)
+            s[8 + i] = _hist[i];
+        for (int w = 0; w < n; w++) {
+            s[EVAL_STATS_SIZE + w] = w < _workers ? _busy[w] : 0;
+            s[EVAL_STATS_SIZE + n + w] = w < _workers ? _evals[w] : 0;
+        }
     }
 
     void execute(int thread_id) {
         while (!_stop) {
             vec_id* vid = _requests->take();
             if (!_stop) {
+                time_point<Clock> t = Clock::now();
                 try {
                     vid->_v = _fit->eval(vid->_v);
                 } catch (std::exception &e) {
                     std::cout << e.what() << std::endl;
                     vid->_v = constant(_nobj, DBL_MAX);
                 }
+                double dt = seconds(Clock::now() - t);
+                {
+                    std::unique_lock<std::mutex> lock(_stats_mutex);
+                    _busy[thread_id] += dt;
+                    _evals[thread_id]++;
+                    int bin = dt < 2E-6 ? 0 : (int) std::log2(dt * 1E6);
+                    _hist[std::min(EVAL_HIST_BINS - 1, bin)]++;
+                }
                 _evaled->put(vid);
             } else
                 delete vid;
@@ -388,6 +510,18 @@ private:
     blocking_queue<vec_id*>* _evaled;
     std::vector<evaluator_job> _jobs;
     time_point<Clock> _t0;
+    // telemetry
+    std::mutex _stats_mutex;
+    std::vector<double> _busy;
+    std::vector<long> _evals;
+    std::vector<long> _hist;
+    double _queueSum;
+    long _queueSamples;
+    int _queueMax;
+    double _driver;
+    double _wait;
+    time_point<Clock> _received;
+    bool _hasReceived;
 };
 
 #endif /* EVALUATOR_HPP_ */
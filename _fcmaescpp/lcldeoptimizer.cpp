@@ -22,7 +22,7 @@ typedef Eigen::Matrix<double, Eigen::Dynamic, 1> vec;
 typedef Eigen::Matrix<int, Eigen::Dynamic, 1> ivec;
 typedef Eigen::Matrix<double, Eigen::Dynamic, Eigen::Dynamic> mat;
 
-typedef void (*callback_parallel)(int, int, double[], double[]);
+typedef bool (*callback_parallel)(int, int, double[], double[]);
 
 namespace lcl_differential_evolution {
 
@@ -94,6 +94,7 @@ public:
             const vec &upper_limit, const vec &guess_, const vec &sigma_,
             pcg64 &rs_) {
         func_par = func_par_;
+        _terminate = false;
         dim = dim_;
         lower = lower_limit;
         upper = upper_limit;
@@ -163,12 +164,16 @@ public:
             for (int i = 0; i < n; i++)
                 pargs[p * n + i] = popX(i, p);
         }
-        func_par(popsize, n, pargs, res);
+        _terminate = func_par(popsize, n, pargs, res) || _terminate;
         for (int p = 0; p < popX.cols(); p++)
             ys[p] = res[p];
         evaluationCounter += popsize;
     }
 
+    bool terminate() {
+        return _terminate;
+    }
+
     double distance(const vec &x1, const vec &x2) {
         return ((x1 - x2).array() * invScale.array()).matrix().squaredNorm();
     }
@@ -198,6 +203,7 @@ public:
 
 private:
     callback_parallel func_par;
+    bool _terminate;
     int dim;
     vec lower;
     vec upper;
@@ -291,7 +297,7 @@ public:
             }
             previous_best = bestY;
 
-            if (fitfun->getEvaluations() >= maxEvaluations)
+            if (fitfun->getEvaluations() >= maxEvaluations || fitfun->terminate())
                 return;
             for (int p = 0; p < popsize; p++) {
                 int r1, r2, r3;
@@ -486,11 +486,10 @@ public:
         iterations = 0;
         fitfun->resetEvaluations();
         while (fitfun->evaluations() < maxEvaluations && !fitfun->terminate()) {
-            for (int p = 0; p < popsize; p++) {
-                vec x = nextX(p);
-                popX.col(popsize + p) = x;
-                popY.col(popsize + p) = fitfun->eval(x);
-            }
+            for (int p = 0; p < popsize; p++)
+                popX.col(popsize + p) = nextX(p);
+            // a single call for the whole population if the fitness is parallel
+            popY.rightCols(popsize) = fitfun->values(popX.rightCols(popsize));
             pop_update();
         }
     }
@@ -570,6 +569,10 @@ public:
         return ncon;
     }
 
+    bool* getIsInt() {
+        return isInt;
+    }
+
 private:
     long runid;
     Fitness *fitfun;
@@ -611,8 +614,9 @@ private:
 
 using namespace mode_optimizer;
 
-extern "C" {
-void optimizeMODE_C(long runid, callback_type func, callback_type log, int dim,
+// either func or func_par is defined
+static void optimizeMODE(long runid, callback_type func, callback_parallel func_par,
+        callback_type log, int dim,
         int nobj, int ncon, int seed, double *lower, double *upper, bool *ints,
         int maxEvals, int popsize, int workers, double F, double CR,
         double pro_c, double dis_c, double pro_m, double dis_m,
@@ -631,12 +635,14 @@ void optimizeMODE_C(long runid, callback_type func, callback_type log, int dim,
             upper_limit[i] += .499999999;
         }
     }
-    Fitness fitfun(func, dim, nobj + ncon, lower_limit, upper_limit);
+    Fitness fitfun = func_par == NULL ?
+            Fitness(func, dim, nobj + ncon, lower_limit, upper_limit) :
+            Fitness(func_par, dim, nobj + ncon, lower_limit, upper_limit);
     MoDeOptimizer opt(runid, &fitfun, log, dim, nobj, ncon, seed, popsize,
             maxEvals, F, CR, pro_c, dis_c, pro_m, dis_m, nsga_update,
             pareto_update, log_period, useIsInt ? isInt : NULL);
     try {
-        if (workers <= 1)
+        if (workers <= 1 || fitfun.isParallel())
             opt.doOptimize();
         else
             opt.do_optimize_delayed_update(workers);
@@ -646,4 +652,101 @@ void optimizeMODE_C(long runid, callback_type func, callback_type log, int dim,
         std::cout << e.what() << std::endl;
     }
 }
+
+extern "C" {
+void optimizeMODE_C(long runid, callback_type func, callback_type log, int dim,
+        int nobj, int ncon, int seed, double *lower, double *upper, bool *ints,
+        int maxEvals, int popsize, int workers, double F, double CR,
+        double pro_c, double dis_c, double pro_m, double dis_m,
+        bool nsga_update, double pareto_update, int log_period, double *res) {
+    optimizeMODE(runid, func, NULL, log, dim, nobj, ncon, seed, lower, upper, ints,
+            maxEvals, popsize, workers, F, CR, pro_c, dis_c, pro_m, dis_m,
+            nsga_update, pareto_update, log_period, res);
+}
+
+// evaluates each generation with a single func_par call
+void optimizeMODE_par_C(long runid, callback_parallel func_par, callback_type log, int dim,
+        int nobj, int ncon, int seed, double *lower, double *upper, bool *ints,
+        int maxEvals, int popsize, double F, double CR,
+        double pro_c, double dis_c, double pro_m, double dis_m,
+        bool nsga_update, double pareto_update, int log_period, double *res) {
+    optimizeMODE(runid, NULL, func_par, log, dim, nobj, ncon, seed, lower, upper, ints,
+            maxEvals, popsize, 1, F, CR, pro_c, dis_c, pro_m, dis_m,
+            nsga_update, pareto_update, log_period, res);
+}
+
+// ask / tell interface, the returned handle needs to be released by destroyMODE_C.
+uintptr_t initMODE_C(long runid, int dim, int nobj, int ncon, int seed,
+        double *lower, double *upper, bool *ints, int popsize, double F,
+        double CR, double pro_c, double dis_c, double pro_m, double dis_m,
+        bool nsga_update, double pareto_update) {
+    vec lower_limit(dim), upper_limit(dim);
+    bool *isInt = new bool[dim];
+    bool useIsInt = false;
+    for (int i = 0; i < dim; i++) {
+        lower_limit[i] = lower[i];
+        upper_limit[i] = upper[i];
+        isInt[i] = ints[i];
+        useIsInt |= ints[i];
+        if (isInt[i]) {
+            // adjust bounds because ints are rounded
+            lower_limit[i] -= .499999999;
+            upper_limit[i] += .499999999;
+        }
+    }
+    if (!useIsInt) {
+        delete[] isInt;
+        isInt = NULL;
+    }
+    Fitness *fitfun = new Fitness((callback_type) NULL, dim, nobj + ncon,
+            lower_limit, upper_limit);
+    // no log callback, log_period is never reached
+    MoDeOptimizer *opt = new MoDeOptimizer(runid, fitfun, NULL, dim, nobj,
+            ncon, seed, popsize, 0, F, CR, pro_c, dis_c, pro_m, dis_m,
+            nsga_update, pareto_update, std::numeric_limits<int>::max(), isInt);
+    return (uintptr_t) opt;
+}
+
+void destroyMODE_C(uintptr_t ptr) {
+    MoDeOptimizer *opt = (MoDeOptimizer*) ptr;
+    delete opt->getFitfun();
+    delete[] opt->getIsInt();
+    delete opt;
+}
+
+// writes n argument vectors to xs and their population indices to ps
+void askMODE_C(uintptr_t ptr, int n, double *xs, int *ps) {
+    MoDeOptimizer *opt = (MoDeOptimizer*) ptr;
+    int dim = opt->getDim();
+    for (int i = 0; i < n; i++) {
+        vec x = opt->ask(ps[i]);
+        std::copy(x.data(), x.data() + dim, xs + i * dim);
+    }
+}
+
+// tells the n function value vectors ys of the argument vectors xs, returns the stop criteria
+int tellMODE_C(uintptr_t ptr, int n, double *ys, double *xs, int *ps) {
+    MoDeOptimizer *opt = (MoDeOptimizer*) ptr;
+    int dim = opt->getDim();
+    int nobj = opt->getNobj() + opt->getNcon();
+    try {
+        for (int i = 0; i < n; i++) {
+            opt->getFitfun()->incrEvaluations();
+            opt->tell(Eigen::Map<vec>(ys + i * nobj, nobj),
+                    Eigen::Map<vec>(xs + i * dim, dim), ps[i]);
+        }
+    } catch (std::exception &e) {
+        std::cout << e.what() << std::endl;
+    }
+    return opt->getStop();
+}
+
+// writes the arguments and function values of the population, 2 * popsize entries
+void populationMODE_C(uintptr_t ptr, double *xs, double *ys) {
+    MoDeOptimizer *opt = (MoDeOptimizer*) ptr;
+    mat popX = opt->getX();
+    mat popY = opt->getY();
+    memcpy(xs, popX.data(), sizeof(double) * popX.size());
+    memcpy(ys, popY.data(), sizeof(double) * popY.size());
+}
 }
@@ -0,0 +1,329 @@
+// Copyright (c) Dietmar Wolz.
+//
+// This source code is licensed under the MIT license found in the
+// LICENSE file in the root directory.
+
+// Native parallel retry for objective functions implemented in C, called via
+// fcmaes/retrycpp.py. Follows fcmaes/advretry.py: Threads execute DE -> CMA-ES
+// sequences sharing a result store. Half of the runs are crossover runs starting
+// at a stored solution with boundaries derived from its distance to another one.
+// The number of evaluations of a run grows with the number of executed runs.
+// Running optimizations terminate when the deadline given by maxTime is reached.
+
+// The objective function is called in parallel, it has to be thread safe.
+
+#include <Eigen/Core>
+#include <iostream>
+#include <random>
+#include <float.h>
+#include <stdint.h>
+#include <ctime>
+#include <mutex>
+#include <thread>
+#include <vector>
+#include <memory>
+#include "pcg_random.hpp"
+#include "evaluator.h"
+
+using namespace std;
+
+extern "C" {
+void optimizeDE_C(long runid, callback_type func, int dim, int seed,
+        double *lower, double *upper, bool *ints, int maxEvals, double keep,
+        double stopfitness, int popsize, double F, double CR, int workers, double* res);
+void optimizeACMA_C(long runid, callback_type func, int dim,
+        double *init, double *lower, double *upper, double *sigma,
+        int maxEvals, double stopfitness, int mu, int popsize, double accuracy,
+        long seed, bool normalize, int update_gap, int workers, double* res);
+}
+
+namespace native_retry {
+
+class Store {
+
+public:
+
+    Store(const vec &lower_, const vec &upper_, int numRetries_, int checkInterval_,
+            double maxEvalFac_, int capacity_, double stopfitness_, double maxTime) {
+        lower = lower_;
+        upper = upper_;
+        dim = lower.size();
+        delta = upper - lower;
+        numRetries = numRetries_;
+        checkInterval = max(1, checkInterval_);
+        maxEvalFac = maxEvalFac_;
+        evalFac = 1;
+        evalFacIncr = maxEvalFac / (numRetries / (double) checkInterval);
+        capacity = max(4, capacity_);
+        stopfitness = stopfitness_;
+        xs = mat(dim, capacity);
+        ys = vec(capacity);
+        numStored = 0;
+        numSorted = 0;
+        countRuns = 0;
+        countStarted = 0;
+        countEvals = 0;
+        bestY = DBL_MAX;
+        bestX = zeros(dim);
+        hasDeadline = isfinite(maxTime) && maxTime > 0;
+        if (hasDeadline)
+            deadline = Clock::now() + chrono::duration_cast<Clock::duration>(
+                    chrono::duration<double>(maxTime));
+    }
+
+    // reserves the next run, false if the retry is finished
+    bool nextRun() {
+        lock_guard<mutex> lock(mtx);
+        if (countStarted >= numRetries || bestY <= stopfitness
+                || (hasDeadline && Clock::now() >= deadline))
+            return false;
+        countStarted++;
+        return true;
+    }
+
+    // deadline is immutable, no lock needed
+    bool pastDeadline() {
+        return hasDeadline && Clock::now() >= deadline;
+    }
+
+    int evalNum(int minEvals) {
+        lock_guard<mutex> lock(mtx);
+        return (int) (evalFac * minEvals);
+    }
+
+    // crossover of two sorted entries, false if there are not enough of them
+    bool limits(pcg64 &rs, vec &guess, vec &lo, vec &up, vec &sdev,
+            double &limit) {
+        double diffFac = 0.5 + 0.5 * distr_01(rs);
+        double limFac = (2.0 + 2.0 * distr_01(rs)) * diffFac;
+        vec x0, x1;
+        {
+            lock_guard<mutex> lock(mtx);
+            int i, j;
+            if (!crossover(rs, i, j))
+                return false;
+            x0 = xs.col(i);
+            x1 = xs.col(j);
+            limit = ys[i];
+        }
+        vec deltax = (x1 - x0).cwiseAbs();
+        vec deltaBound = (limFac * deltax).cwiseMax(0.0001);
+        lo = lower.cwiseMax(x0 - deltaBound);
+        up = upper.cwiseMin(x0 + deltaBound);
+        sdev = (diffFac * deltax.array() / delta.array()).matrix().cwiseMax(
+                0.001).cwiseMin(0.5);
+        guess = x1.cwiseMax(lo).cwiseMin(up);
+        return true;
+    }
+
+    void addResult(double y, const vec &x, long evals, double limit) {
+        lock_guard<mutex> lock(mtx);
+        if (countRuns % checkInterval == checkInterval - 1) {
+            if (evalFac < maxEvalFac)
+                evalFac += evalFacIncr;
+            sort();
+        }
+        countRuns++;
+        countEvals += evals;
+        if (y < limit) { // as advretry.py, results above the limit are only counted
+            if (y < bestY) {
+                bestY = y;
+                bestX = x;
+            }
+            if (numStored >= capacity - 1)
+                sort();
+            xs.col(numStored) = x;
+            ys[numStored] = y;
+            numStored++;
+        }
+    }
+
+    void result(double *res) {
+        lock_guard<mutex> lock(mtx);
+        for (int i = 0; i < dim; i++)
+            res[i] = bestX[i];
+        res[dim] = bestY;
+        res[dim + 1] = countEvals;
+        res[dim + 2] = countRuns;
+        res[dim + 3] = numStored;
+    }
+
+private:
+
+    // indices of two sorted entries, the second one is worse
+    bool crossover(pcg64 &rs, int &i, int &j) {
+        int n = numSorted;
+        if (n < 2)
+            return false;
+        double lo = min(0.1 * n, 1.0);
+        double lim = (lo + (0.2 * n - lo) * distr_01(rs)) / n;
+        geometric_distribution<int> geo(min(1.0, lim));
+        for (int k = 0; k < 100; k++) {
+            i = geo(rs);
+            j = i + 1 + geo(rs);
+            if (j < n)
+                return true;
+        }
+        return false;
+    }
+
+    bool isSimilar(int i, int j) {
+        vec dx = (xs.col(i) - xs.col(j)).array() / delta.array();
+        return dx.norm() / sqrt(dim) <= 0.15;
+    }
+
+    // sorts the entries keeping the best 90% different from their two predecessors
+    void sort() {
+        if (numStored < 2) {
+            numSorted = numStored;
+            return;
+        }
+        ivec yi = sort_index(ys.head(numStored));
+        vector<int> keep;
+        for (int k = 0; k < numStored; k++) {
+            int i = yi[k];
+            int nk = keep.size();
+            if ((nk > 0 && isSimilar(i, keep[nk - 1]))
+                    || (nk > 1 && isSimilar(i, keep[nk - 2])))
+                continue;
+            keep.push_back(i);
+        }
+        int n = min((int) keep.size(), (int) (0.9 * capacity));
+        mat xsorted(dim, capacity);
+        vec ysorted(capacity);
+        for (int k = 0; k < n; k++) {
+            xsorted.col(k) = xs.col(keep[k]);
+            ysorted[k] = ys[keep[k]];
+        }
+        xs = xsorted;
+        ys = ysorted;
+        numStored = n;
+        numSorted = n;
+    }
+
+    vec lower;
+    vec upper;
+    vec delta;
+    int dim;
+    int numRetries;
+    int checkInterval;
+    double maxEvalFac;
+    double evalFac;
+    double evalFacIncr;
+    int capacity;
+    double stopfitness;
+    mat xs;
+    vec ys;
+    int numStored;
+    int numSorted;
+    int countRuns;
+    int countStarted;
+    long countEvals;
+    double bestY;
+    vec bestX;
+    bool hasDeadline;
+    time_point<Clock> deadline;
+    mutex mtx;
+};
+
+// objective function and store of the thread executing checkedFunc
+static thread_local callback_type vector_func = NULL;
+static thread_local callback_scalar scalar_func = NULL;
+static thread_local Store *current = NULL;
+
+// calls the objective function of the thread, terminates the run at the deadline
+static bool checkedFunc(int dim, const double *x, double *y) {
+    bool stop = false;
+    if (scalar_func != NULL)
+        y[0] = scalar_func(dim, x);
+    else
+        stop = vector_func(dim, x, y);
+    return stop || current->pastDeadline();
+}
+
+// executes DE -> CMA-ES sequences until the store signals termination
+static void retryLoop(Store *store, callback_type func, callback_scalar sfunc,
+        const vec &lower, const vec &upper, double valueLimit, int popsize,
+        int minEvals, double stopfitness, long seed) {
+    vector_func = func;
+    scalar_func = sfunc;
+    current = store;
+    int dim = lower.size();
+    pcg64 rs(seed);
+    unique_ptr<bool[]> isInt(new bool[dim]()); // no integer variables
+    vector<double> res(dim + 4 + EVAL_STATS_SIZE);
+    while (store->nextRun()) {
+        vec guess, lo, up, sdev;
+        double limit;
+        if (distr_01(rs) >= 0.5
+                || !store->limits(rs, guess, lo, up, sdev, limit)) {
+            lo = lower;
+            up = upper;
+            guess = lower.array()
+                    + (upper - lower).array() * uniformVec(dim, rs).array();
+            sdev = constant(dim, 0.05 + 0.05 * distr_01(rs));
+            limit = valueLimit;
+        }
+        int evals = store->evalNum(minEvals);
+        double deFrac = 0.1 + 0.4 * distr_01(rs);
+        int deEvals = max(popsize, (int) (deFrac * evals));
+        int cmaEvals = max(popsize, evals - deEvals);
+        optimizeDE_C(0, checkedFunc, dim, (int) (rs() & 0x7fffffff), lo.data(), up.data(),
+                isInt.get(), deEvals, 200, stopfitness, popsize, 0.5, 0.9, 1, res.data());
+        vec x = Eigen::Map<vec>(res.data(), dim);
+        double y = res[dim];
+        long nevals = (long) res[dim + 1];
+        if (!store->pastDeadline()) {
+            // continue at the best DE solution
+            guess = x;
+            optimizeACMA_C(0, checkedFunc, dim, guess.data(), lo.data(), up.data(),
+                    sdev.data(), cmaEvals, stopfitness, popsize / 2, popsize, 1.0,
+                    (long) (rs() & 0x7fffffff), true, -1, 1, res.data());
+            nevals += (long) res[dim + 1];
+            if (res[dim] < y) {
+                x = Eigen::Map<vec>(res.data(), dim);
+                y = res[dim];
+            }
+        }
+        store->addResult(y, x, nevals, limit);
+    }
+}
+
+}
+
+using namespace native_retry;
+
+extern "C" {
+
+// either func or sfunc is defined, sfunc has the scalar form double(int, const double*).
+// res receives the best solution, its value, the number of evaluations, the number
+// of runs and the number of stored solutions.
+void optimizeRetry_C(callback_type func, callback_scalar sfunc, int dim,
+        double *lower, double *upper, double valueLimit, int numRetries,
+        int workers, int popsize, int minEvals, double maxEvalFac,
+        int checkInterval, int capacity, double stopfitness, double maxTime,
+        long seed, double *res) {
+    vec lower_limit(dim), upper_limit(dim);
+    for (int i = 0; i < dim; i++) {
+        lower_limit[i] = lower[i];
+        upper_limit[i] = upper[i];
+    }
+    if (workers <= 0)
+        workers = max(1, (int) thread::hardware_concurrency());
+    Store store(lower_limit, upper_limit, numRetries, checkInterval,
+            maxEvalFac, capacity, stopfitness, maxTime);
+    try {
+        vector<thread> threads;
+        for (int w = 0; w < workers; w++)
+            threads.push_back(thread(retryLoop, &store, func, sfunc,
+                    cref(lower_limit), cref(upper_limit), valueLimit, popsize,
+                    minEvals, stopfitness, seed + 1000003L * w));
+        for (thread &t : threads)
+            t.join();
+    } catch (std::exception &e) {
+        cout << e.what() << endl;
+    }
+    store.result(res);
+}
+
+}
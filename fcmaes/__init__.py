@@ -18,6 +18,7 @@ __all__ = [
     'csmacpp',
     'retry',
     'advretry',
+    'retrycpp',
     'multiretry',
     'mode',
     'modecpp',
@@ -26,5 +27,14 @@ __all__ = [
     'optimizer',
     'astro',
     'evaluator',
+    'pool',
+    'asyncopt',
+    'remote',
+    'cache',
+    'checkpoint',
+    'monitor',
+    'stop',
+    'budget',
+    'native',
     'testfun',
 ]
@@ -7,19 +7,22 @@ import time
 import os
 import sys
 import math
-import _pickle as cPickle
-import bz2
 import ctypes as ct
 import numpy as np
 from numpy.linalg import norm
-from random import Random
 import multiprocessing as mp
 from multiprocessing import Process
 from numpy.random import Generator, MT19937, SeedSequence
 from scipy.optimize import OptimizeResult, Bounds
+from scipy.spatial import cKDTree
 
-from fcmaes.retry import _convertBounds, plot
+from fcmaes.retry import _convertBounds, plot, Staging
 from fcmaes.optimizer import dtime, fitting, de_cma, logger
+from fcmaes import checkpoint
+from fcmaes.monitor import LiveFile
+from fcmaes.stop import Stop
+from fcmaes.budget import Budget
+from fcmaes.pool import Lock
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
 os.environ['MKL_NUM_THREADS'] = '1'
@@ -39,7 +42,12 @@ def minimize(fun,
              stop_fitness = -math.inf,
              optimizer = None,
              statistic_num = 0,
-             datafile = None
+             datafile = None,
+             checkpoint_interval = 60,
+             livefile = None,
+             max_time = None,
+             time_scaled = False,
+             eval_workers = 1
              ):   
     """Minimization of a scalar function of one or more variables using 
     smart parallel optimization retry.
@@ -91,6 +99,25 @@ def minimize(fun,
         used / in the sequence of optimizers. 
     datafile, optional
         file to persist / retrieve the internal state of the optimizations. 
+        A snapshot ``datafile.pbz2`` is written in the background, results added since
+        are appended to the journal segment ``datafile.<n>.journal``. Each snapshot starts 
+        a new segment and removes the older ones.
+    checkpoint_interval : float, optional
+        interval in seconds between snapshots. 
+    livefile : string, optional
+        if defined the store is kept in this memory mapped file to monitor
+        the optimization, see fcmaes.monitor.
+    max_time : float, optional
+        wall clock time limit in seconds. Running optimizations are terminated
+        when it is reached, the best result found so far is returned. 
+    time_scaled : bool, optional
+        if True the evaluation budget of a run is scaled by the remaining
+        fraction of max_time. 
+    eval_workers : int, optional
+        number of parallel function evaluations of each optimization run. 
+        workers // eval_workers runs are executed in parallel, runs started when 
+        fewer runs remain get more evaluation workers, see fcmaes.budget. 
+        Only used by optimizers supporting parallel function evaluation. 
     
     Returns
     -------
@@ -105,23 +132,42 @@ def minimize(fun,
     if max_eval_fac is None:
         max_eval_fac = int(min(50, 1 + num_retries // check_interval))
     store = Store(fun, bounds, max_eval_fac, check_interval, capacity, logger, num_retries, 
-                  statistic_num, datafile)
+                  statistic_num, datafile, checkpoint_interval = checkpoint_interval, 
+                  livefile = livefile, time_scaled = time_scaled)
     if not datafile is None:
         try:
             store.load(datafile)
         except:
             pass
-    return retry(store, optimizer.minimize, value_limit, workers, stop_fitness)
+    return retry(store, optimizer.minimize, value_limit, workers, stop_fitness, max_time = max_time,
+                 eval_workers = eval_workers)
 
 def retry(store, optimize, value_limit = math.inf, 
-          workers=mp.cpu_count(), stop_fitness = -math.inf):
+          workers=mp.cpu_count(), stop_fitness = -math.inf, pool = None, num_retries = None,
+          max_time = None, eval_workers = 1):
+    if not max_time is None:
+        store.stop.set_max_time(max_time)
+    store.budget.set(workers, eval_workers)
+    retries = store.budget.retries() if pool is None else min(store.budget.retries(), pool.workers)
     sg = SeedSequence()
-    rgs = [Generator(MT19937(s)) for s in sg.spawn(workers)]
-    proc=[Process(target=_retry_loop,
-            args=(pid, rgs, store, optimize, value_limit, stop_fitness)) for pid in range(workers)]
-    [p.start() for p in proc]
-    [p.join() for p in proc]
+    checkpoints = None if store.datafile is None else \
+        checkpoint.Periodic(store.checkpoint, store.checkpoint_interval)
+    rgs = [Generator(MT19937(s)) for s in sg.spawn(retries)]
+    if num_retries is None:
+        num_retries = store.num_retries
+    args = [(pid, rgs, store, optimize, value_limit, stop_fitness, num_retries) 
+            for pid in range(retries)]
+    with store.stop.on_signals(): # SIGTERM stops all workers
+        if pool is None:
+            proc=[Process(target=_retry_loop, args=arg) for arg in args]
+            [p.start() for p in proc]
+            [p.join() for p in proc]
+        else: # reuse the pool workers, store is sent with the tasks
+            pool.map(_retry_loop, args)
+    store.merge()
     store.sort()
+    if not checkpoints is None:
+        checkpoints.stop()
     store.dump()
     return OptimizeResult(x=store.get_x_best(), fun=store.get_y_best(), 
                           nfev=store.get_count_evals(), success=True)
@@ -146,7 +192,9 @@ def minimize_plot(name, optimizer, fun, bounds, value_limit = math.inf,
  
 class Store(object):
     """thread safe storage for optimization retry results; 
-    delivers boundary and initial step size vectors for advanced retry crossover operation."""
+    delivers boundary and initial step size vectors for advanced retry crossover operation.
+    Results are staged in per worker rings and merged by the worker acquiring the store lock,
+    see retry.Store."""
          
     def __init__(self, 
                  fun, # fitness function
@@ -157,7 +205,13 @@ class Store(object):
                  logger = None, # if None logging is switched off
                  num_retries = None,
                  statistic_num = 0,
-                 datafile = None
+                 datafile = None,
+                 staging = mp.cpu_count(), # number of staging rings, 0 disables staging
+                 diversity = 'neighbors', # 'neighbors', 'all' or None, see sort
+                 min_distance = 0.15, # minimal normalized distance of diverse entries
+                 checkpoint_interval = 60, # seconds between snapshots of the datafile
+                 livefile = None, # memory mapped file for monitoring, see fcmaes.monitor
+                 time_scaled = False # scale the evaluation budget by the remaining time
                ):
         self.fun = fun
         self.lower, self.upper = _convertBounds(bounds)
@@ -177,14 +231,23 @@ class Store(object):
         self.max_eval_fac = max_eval_fac
         self.check_interval = check_interval       
         self.dim = len(self.lower)
-        self.random = Random()
+        self.rg = Generator(MT19937()) # used if no generator is passed
         self.t0 = time.perf_counter()
     
         #shared between processes
-        self.add_mutex = mp.Lock()    
-        self.check_mutex = mp.Lock()                     
-        self.xs = mp.RawArray(ct.c_double, capacity * self.dim)
-        self.ys = mp.RawArray(ct.c_double, capacity)                  
+        self.add_mutex = Lock()    
+        self.best_mutex = Lock()
+        self.save_mutex = Lock()    
+        self.runs_mutex = Lock()    
+        self.check_mutex = Lock()                     
+        self.staging = Staging(staging, self.dim) if staging > 0 else None
+        if livefile is None:
+            self.live = None
+            self.xs_buf = mp.RawArray(ct.c_double, capacity * self.dim)
+            self.ys_buf = mp.RawArray(ct.c_double, capacity)                  
+        else:
+            self.live = LiveFile(livefile, self.dim, 1, capacity)
+        self._create_views()
         self.eval_fac = mp.RawValue(ct.c_double, 1)
         self.count_evals = mp.RawValue(ct.c_long, 0)   
         self.count_runs = mp.RawValue(ct.c_int, 0) 
@@ -193,8 +256,18 @@ class Store(object):
         self.best_y = mp.RawValue(ct.c_double, math.inf) 
         self.worst_y = mp.RawValue(ct.c_double, math.inf)  
         self.best_x = mp.RawArray(ct.c_double, self.dim)
+        self.stop = Stop() # shared stop condition checked by the optimizers
+        self.budget = Budget() # cores shared by the optimization runs
+        self.time_scaled = time_scaled
         self.statistic_num = statistic_num
         self.datafile = datafile
+        self.checkpoint_interval = checkpoint_interval
+        self.journal = None if datafile is None else checkpoint.Journal(datafile, self.dim)
+        self.saved_evals = -1 # number of evaluations at the last checkpoint
+        if not diversity in ('neighbors', 'all', None):
+            raise ValueError("diversity must be 'neighbors', 'all' or None")
+        self.diversity = diversity
+        self.min_distance = min_distance
  
         if statistic_num > 0:  # enable statistics                          
             self.statistic_num = statistic_num
@@ -204,6 +277,33 @@ class Store(object):
             self.sevals = mp.RawValue(ct.c_long, 0)
             self.bval = mp.RawValue(ct.c_double, math.inf)
 
+    def _create_views(self): # numpy views of the shared buffers
+        if self.live is None:
+            self.xs = np.frombuffer(self.xs_buf).reshape(self.capacity, self.dim)
+            self.ys = np.frombuffer(self.ys_buf)
+        else:
+            self.xs = self.live.xs.reshape(self.capacity, self.dim)
+            self.ys = self.live.ys
+
+    def _begin(self): # called holding add_mutex before changing the entries
+        if not self.live is None:
+            self.live.begin()
+
+    def _end(self): # publishes the changes to the live file
+        if not self.live is None:
+            self.live.end(self.num_stored.value, self.count_evals.value, 
+                          self.count_runs.value, self.best_y.value, self.best_x)
+
+    def __getstate__(self): # views are recreated after unpickling
+        state = self.__dict__.copy()
+        del state['xs']
+        del state['ys']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._create_views()
+
     # register improvement - time and value
     def wrapper(self, x):
         y = self.fun(x)
@@ -224,12 +324,58 @@ class Store(object):
                     
     # persist store
     def save(self, name):
-        with bz2.BZ2File(name + '.pbz2', 'w') as f: 
-            cPickle.dump(self.get_data(), f)
+        """atomically writes a snapshot. The results journaled before are part of it, 
+        their journal segments are removed after writing the snapshot."""
+        journaled = not self.journal is None and name == self.datafile
+        with self.save_mutex: # a later snapshot may remove the segments of an earlier one
+            with self.add_mutex: # results are journaled holding add_mutex, see _add
+                self._merge()
+                data = self.get_data()
+                segment = self.journal.rotate() if journaled else 0
+            checkpoint.save(name, data + [segment])
+            if journaled:
+                self.journal.remove(segment)
 
     def load(self, name):
-        data = cPickle.load(bz2.BZ2File(name + '.pbz2', 'rb'))
-        self.set_data(data)
+        """reads the snapshot and replays the results journaled afterwards."""
+        data = checkpoint.load(name)
+        self.set_data(data[:5])
+        if self.journal is None or name != self.datafile:
+            return
+        segment = data[5] if len(data) > 5 else 0
+        self.journal.segment.value = max(self.journal.segment.value, segment)
+        ys, xs = self.journal.read(segment)
+        if len(ys) > 0:
+            self.replay(ys, xs)
+            self.save(name) # removes the replayed segments
+  
+    def replay(self, ys, xs):
+        """adds recorded results."""
+        with self.add_mutex:
+            b = np.argmin(ys)
+            if ys[b] < self.best_y.value:
+                self.best_y.value = ys[b]
+                self.best_x[:] = xs[b]
+            i = 0
+            while i < len(ys):
+                if self.num_stored.value >= self.capacity - 1:
+                    self.sort()
+                ns = self.num_stored.value
+                k = min(len(ys) - i, self.capacity - 1 - ns)
+                self._begin()
+                self.ys[ns:ns+k] = ys[i:i+k]
+                self.xs[ns:ns+k] = xs[i:i+k]
+                self.num_stored.value = ns + k
+                self._end()
+                i += k
+            self.sort()
+
+    def checkpoint(self):
+        """writes a snapshot of the datafile if results were added since the last one."""
+        evals = self.get_count_evals()
+        if evals != self.saved_evals:
+            self.save(self.datafile)
+            self.saved_evals = evals
   
     def get_data(self):
         data = []
@@ -241,13 +387,14 @@ class Store(object):
         return data
         
     def set_data(self, data):
-        xs = data[0]
-        ys = data[1]
-        for i in range(len(ys)):
-            self.replace(i, ys[i], xs[i])
+        n = len(data[1])
+        self._begin()
+        self.xs[:n] = data[0]
+        self.ys[:n] = data[1]
         self.best_x[:] = data[2][:]
         self.best_y.value = data[3]
         self.num_stored.value = data[4]
+        self._end()
         self.sort()
                
     def get_improvements(self):
@@ -270,26 +417,39 @@ class Store(object):
         return stats
                                     
     def eval_num(self, max_evals):
-        return int(self.eval_fac.value * max_evals)
+        evals = int(self.eval_fac.value * max_evals)
+        if self.time_scaled:
+            return max(1, int(evals * self.stop.fraction_left()))
+        return evals
                                                
-    def limits(self): 
+    def limits(self, rg = None): 
         """guess, boundaries and initial step size for crossover operation."""
-        diff_fac = self.random.uniform(0.5, 1.0)
-        lim_fac =  self.random.uniform(2.0, 4.0) * diff_fac
+        proposals = self.limits_batch(1, rg)
+        if len(proposals) == 0:
+            return math.inf, None, None, None, None
+        return proposals[0]
+
+    def limits_batch(self, k, rg = None): 
+        """up to k crossover proposals (y0, guess, lower, upper, sdev) at once, 
+        a worker may prefetch them to reduce lock contention."""
+        if rg is None:
+            rg = self.rg
+        diff_fac = rg.uniform(0.5, 1.0, (k, 1))
+        lim_fac =  rg.uniform(2.0, 4.0, (k, 1)) * diff_fac
         with self.add_mutex:
-            i, j = self.crossover()
-            if i < 0:
-                return math.inf, None, None, None, None
-            x0 = np.asarray(self.get_x(i))
-            x1 = np.asarray(self.get_x(j))
-            y0 = np.asarray(self.get_y(i))
+            i, j = self._crossover_batch(k, rg)
+            valid = i >= 0
+            x0 = self.xs[i[valid]] # fancy indexing copies
+            x1 = self.xs[j[valid]]
+            y0 = self.ys[i[valid]]
              
+        diff_fac = diff_fac[valid]
         deltax = np.abs(x1 - x0)
-        delta_bound = np.maximum(0.0001, lim_fac * deltax)
+        delta_bound = np.maximum(0.0001, lim_fac[valid] * deltax)
         lower = np.maximum(self.lower, x0 - delta_bound)
         upper = np.minimum(self.upper, x0 + delta_bound)
         sdev = np.maximum(0.001, np.minimum(0.5, diff_fac * deltax / self.delta))        
-        return y0, x1, lower, upper, sdev
+        return list(zip(y0, x1, lower, upper, sdev))
                  
     def distance(self, xprev, x): 
         """distance between entries in store."""
@@ -300,76 +460,149 @@ class Store(object):
         self.set_y(i, y)
         self.set_x(i, xs)
         
-    def crossover(self): # Choose two good entries for recombination
+    def crossover(self, rg = None): # Choose two good entries for recombination
         """indices of store entries to be used for crossover operation."""
+        i, j = self._crossover_batch(1, self.rg if rg is None else rg)
+        return int(i[0]), int(j[0])
+
+    def _crossover_batch(self, k, rg):
+        """k index pairs, each entry is selected with probability lim in rank order. 
+        The gaps between selected ranks are geometrically distributed, 
+        up to 100 tries to select both within the sorted entries, -1 if all fail."""
         n = self.num_sorted.value
         if n < 2:
-            return -1, -1
-        lim = self.random.uniform(min(0.1*n, 1), 0.2*n)/n
-        for _ in range(100):
-            i1 = -1
-            i2 = -1
-            for j in range(n):
-                if self.random.random() < lim:
-                    if i1 < 0:
-                        i1 = j
-                    else:
-                        i2 = j
-                        return i1, i2
-        return -1, -1
+            return np.full(k, -1), np.full(k, -1)
+        lim = rg.uniform(min(0.1*n, 1), 0.2*n, (k, 1, 1))/n
+        idx = np.cumsum(rg.geometric(lim, (k, 100, 2)), axis=2) - 1
+        ok = idx[:,:,1] < n
+        tr = np.argmax(ok, axis=1) # first successful try
+        i, j = idx[np.arange(k), tr].T
+        failed = ~ok[np.arange(k), tr]
+        i[failed] = -1
+        j[failed] = -1
+        return i, j
 
     def sort(self): 
         """sorts all store entries, keep only the 90% best to make room for new ones;
-        skip entries having similar x values than their neighbors to preserve diversity"""
+        skip entries having similar x values to preserve diversity. 
+        diversity = 'neighbors' compares with the two previously kept entries, 
+        diversity = 'all' with all better kept entries using a KD-tree."""
         ns = self.num_stored.value
         if ns < 2:
             return
 
-        ys = np.asarray(self.ys[:ns])
-        yi = ys.argsort()
-        sortRuns = []
-
-        xprev = xprev2 = None
-        for i in range(ns):
-            y = ys[yi[i]]
-            x = np.asarray(self.get_x(yi[i]))
-            if (xprev is None or self.distance(xprev, x) > 0.15) and \
-                (xprev2 is None or self.distance(xprev2, x) > 0.15): 
-                sortRuns.append( (y, x) )
-                xprev2 = xprev
-                xprev = x
-
-        numStored = min(len(sortRuns),int(0.9*self.capacity)) # keep 90% best 
-        for i in range(numStored):
-            self.replace(i, sortRuns[i][0], sortRuns[i][1])
+        self._begin()
+        yi = self.ys[:ns].argsort()
+        if self.diversity is None:
+            keep = yi
+        else:
+            # normalized, sorted by y, distance scaled by sqrt(dim) 
+            xn = self.xs[yi] / (self.delta * math.sqrt(self.dim))
+            if self.diversity == 'all':
+                keep = yi[self._diverse_all(xn)]
+            else:
+                keep = yi[self._diverse_neighbors(xn)]
+        numStored = min(len(keep),int(0.9*self.capacity)) # keep 90% best 
+        keep = keep[:numStored]
+        self.ys[:numStored] = self.ys[keep] # fancy indexing copies before writing
+        self.xs[:numStored] = self.xs[keep]
         self.num_sorted.value = numStored  
         self.num_stored.value = numStored     
         self.worst_y.value = self.get_y(numStored-1)
+        self._end()
         return numStored        
 
-    def add_result(self, y, xs, lower, upper, evals, limit=math.inf):
-        """registers an optimization result at the store."""
+    def _diverse_neighbors(self, xn, band = 8):
+        """indices of entries not similar to one of the two previously kept entries.
+        The distances to the ``band`` preceding entries are computed vectorized, the 
+        sequential keep chain only looks them up. Distances to kept entries further
+        away, following a run of skipped entries, are computed on demand."""
+        dmin = self.min_distance
+        n = len(xn)
+        band = min(band, n - 1)
+        near = np.zeros((n, band + 1), dtype=bool) # near[i, d]: entries i and i-d are similar
+        for d in range(1, band + 1):
+            near[d:, d] = norm(xn[d:] - xn[:-d], axis=1) <= dmin
+        if not np.any(near[:, 1:3]):
+            return np.arange(n) # no similar neighbors, all entries are kept
+        near = near.tolist() # fast scalar access
+        kept = [0]
+        for i in range(1, n):
+            similar = False
+            for k in kept[-2:]:
+                d = i - k
+                if near[i][d] if d <= band else norm(xn[i] - xn[k]) <= dmin:
+                    similar = True
+                    break
+            if not similar:
+                kept.append(i)
+        return np.array(kept)
+
+    def _diverse_all(self, xn):
+        """indices of entries not similar to any better kept entry."""
+        pairs = cKDTree(xn).query_pairs(self.min_distance, output_type='ndarray')
+        if len(pairs) == 0:
+            return np.arange(len(xn))
+        pairs.sort(axis=1) # pairs[:,0] is the better entry
+        pairs = pairs[np.argsort(pairs[:,1], kind='stable')]
+        starts = np.searchsorted(pairs[:,1], np.arange(len(xn) + 1))
+        kept = np.ones(len(xn), dtype=bool)
+        for i in np.unique(pairs[:,1]):
+            if np.any(kept[pairs[starts[i]:starts[i+1], 0]]):
+                kept[i] = False
+        return np.flatnonzero(kept)
+
+    def add_result(self, y, xs, lower, upper, evals, limit=math.inf, pid=None):
+        """registers an optimization result at the store. If pid is defined, 
+        the result is staged in the ring of worker pid."""
+        if y < limit:
+            if y < self.best_y.value: # checked again holding the lock
+                with self.best_mutex:
+                    if y < self.best_y.value:
+                        self.best_x[:] = xs[:] # publish best_y after its x
+                        self.best_y.value = y
+                        self.dump()
+        else:
+            y = math.inf # only its evaluations are counted
+        if pid is None or self.staging is None or pid >= self.staging.workers \
+                or not self.staging.put(pid, y, xs, evals):
+            with self.add_mutex: 
+                self._merge()
+                self._add(y, xs, evals)
+        elif self.add_mutex.acquire(False): # elected to merge
+            try:
+                self._merge()
+            finally:
+                self.add_mutex.release()
+
+    def merge(self):
+        """merges all staged results."""
         with self.add_mutex:
-            self.incr_count_evals(evals)
-            if y < limit:
-                if y < self.best_y.value:
-                    self.best_y.value = y
-                    self.best_x[:] = xs[:]
-                    self.dump()
-                    if not self.datafile is None:
-                        self.save(self.datafile)
+            self._merge()
 
-                if self.num_stored.value >= self.capacity - 1:
-                    self.sort()
-                ns = self.num_stored.value
-                self.num_stored.value = ns + 1
-                self.replace(ns, y, xs)
+    def _merge(self):
+        if not self.staging is None:
+            for y, xs, evals in self.staging.drain():
+                self._add(y, xs, evals)
+
+    def _add(self, y, xs, evals): # called holding add_mutex
+        self._begin()
+        self.incr_count_evals(evals)
+        if y < math.inf:
+            if not self.journal is None: # in the segment rotated by the next snapshot
+                self.journal.append(y, xs)
+            if self.num_stored.value >= self.capacity - 1:
+                self.sort()
+            ns = self.num_stored.value
+            self.num_stored.value = ns + 1
+            self.replace(ns, y, xs)
+        self._end()
       
     def get_x(self, pid):
-        return self.xs[pid*self.dim:(pid+1)*self.dim]
+        return self.xs[pid].copy()
 
     def get_xs(self):
-        return np.array([self.get_x(i) for i in range(self.num_stored.value)])
+        return self.xs[:self.num_stored.value].copy()
 
     def get_x_best(self):
         return np.array(self.best_x[:])
@@ -378,7 +611,7 @@ class Store(object):
         return self.ys[pid]
 
     def get_ys(self):
-        return np.array(self.ys[:self.num_stored.value])
+        return self.ys[:self.num_stored.value].copy()
 
     def get_y_best(self):
         return self.best_y.value
@@ -390,13 +623,13 @@ class Store(object):
         return self.count_runs.value
 
     def set_x(self, pid, xs):
-        self.xs[pid*self.dim:(pid+1)*self.dim] = xs[:]
+        self.xs[pid] = xs
 
     def set_y(self, pid, y):
         self.ys[pid] = y            
 
     def get_runs_compare_incr(self, limit):
-        with self.add_mutex:
+        with self.runs_mutex:
             if self.count_runs.value < limit:
                 self.count_runs.value += 1
                 return True
@@ -417,10 +650,7 @@ class Store(object):
         """logs the current status of the store if logger defined."""
         if self.logger is None:
             return
-        Ys = self.get_ys()
-        vals = []
-        for i in range(min(20, len(Ys))):
-            vals.append(round(Ys[i],2))     
+        vals = np.round(self.ys[:min(20, self.num_stored.value)], 2).tolist()
         dt = dtime(self.t0)            
         message = '{0} {1} {2} {3} {4:.6f} {5:.2f} {6} {7} {8!s} {9!s}'.format(
             dt, int(self.count_evals.value / dt), self.count_runs.value, self.count_evals.value, 
@@ -428,36 +658,49 @@ class Store(object):
             vals, self.best_x[:])
         self.logger.info(message)
    
-def _retry_loop(pid, rgs, store, optimize, value_limit, stop_fitness = -math.inf):    
+def _retry_loop(pid, rgs, store, optimize, value_limit, stop_fitness = -math.inf, 
+                num_retries = None):    
     fun = store.wrapper if store.statistic_num > 0 else store.fun
     #reinitialize logging config for windows -  multi threading fix
     if 'win' in sys.platform and not store.logger is None:
         store.logger = logger()
         
-    while store.get_runs_compare_incr(store.num_retries) and store.best_y.value > stop_fitness:               
-        if _crossover(fun, store, optimize, rgs[pid]):
-            continue
+    if num_retries is None:
+        num_retries = store.num_retries
+    while store.get_runs_compare_incr(num_retries) and store.best_y.value > stop_fitness \
+            and not store.stop.is_set():               
+        share = store.budget.acquire(num_retries - store.get_count_runs())
         try:
-            rg = rgs[pid]
-            dim = len(store.lower)
-            sol, y, evals = optimize(fun, Bounds(store.lower, store.upper), None, 
-                                     [rg.uniform(0.05, 0.1)]*dim, rg, store)
-            store.add_result(y, sol, store.lower, store.upper, evals, value_limit)
-        except Exception as ex:
-            continue
+            _retry_run(fun, store, optimize, rgs[pid], pid, value_limit)
+        finally:
+            store.budget.release(share)
+    if store.best_y.value <= stop_fitness: # stop the running optimizations of the other workers
+        store.stop.set()
 #         if pid == 0:
 #             store.dump()
  
-def _crossover(fun, store, optimize, rg):
+def _retry_run(fun, store, optimize, rg, pid = None, value_limit = math.inf):
+    """single optimization run, either a crossover of stored results or using the full bounds."""
+    if _crossover(fun, store, optimize, rg, pid):
+        return
+    try:
+        dim = len(store.lower)
+        sol, y, evals = optimize(fun, Bounds(store.lower, store.upper), None, 
+                                 [rg.uniform(0.05, 0.1)]*dim, rg, store)
+        store.add_result(y, sol, store.lower, store.upper, evals, value_limit, pid)
+    except Exception as ex:
+        pass
+ 
+def _crossover(fun, store, optimize, rg, pid = None):
     if rg.uniform(0,1) < 0.5:
         return False
-    y0, guess, lower, upper, sdev = store.limits()
+    y0, guess, lower, upper, sdev = store.limits(rg)
     if guess is None:
         return False
     guess = fitting(guess, lower, upper) # take X from lower
     try:       
         sol, y, evals = optimize(fun, Bounds(lower, upper), guess, sdev, rg, store)
-        store.add_result(y, sol, lower, upper, evals, y0) # limit to y0  
+        store.add_result(y, sol, lower, upper, evals, y0, pid) # limit to y0  
     except:
         return False   
     return True
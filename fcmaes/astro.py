@@ -9,6 +9,7 @@ import os
 import ctypes as ct
 from scipy.optimize import Bounds
 from fcmaes.decpp import libcmalib
+from fcmaes.native import NativeFun
 
 astro_map = {  
     "messengerfullC": libcmalib.messengerfullC,
@@ -24,12 +25,15 @@ astro_map = {
     }
 
 class Astrofun(object):
-    """Provides access to ESAs GTOP optimization test functions."""
+    """Provides access to ESAs GTOP optimization test functions. 
+    native is the C function, which can be passed to the C++ optimizers instead of fun,
+    see fcmaes.native. It returns non finite values outside the bounds."""
     def __init__(self, name, fun_c, lower, upper):    
         self.name = name 
         self.fun_c = fun_c 
         self.bounds = Bounds(lower, upper)
         self.fun = python_fun(fun_c, self.bounds)
+        self.native = NativeFun(astro_map[fun_c], scalar = True) if fun_c in astro_map else None
 
 for func in astro_map:
     astro_map[func].argtypes = [ct.c_int, ct.POINTER(ct.c_double)]           
@@ -62,6 +66,7 @@ class Gtoc1(object):
                            )
         self.gfun = self.fun
         self.fun = self.gtoc1       
+        self.native = None # fun is shifted
     
     def gtoc1(self, x):
         return self.gfun(x) - 2000000
@@ -168,6 +173,7 @@ class Cassini1multi(object):
                            [0.,400.,470.,400.,2000.,6000.]       
         )
         self.fun = self.cassini1
+        self.native = None
         self.weights = weights
         self.planets = planets
         self.mfun = lambda x: cassini1multi(x + [2,2,3,5])
@@ -185,6 +191,7 @@ class Cassini1minlp(object):
                            [0.,400.,470.,400.,2000.,6000., 9.0,9.0,9.0,9.0 ]       
         )
         self.fun = self.cassini1minlp
+        self.native = None
         self.weights = weights
         self.mfun = cassini1multi
          
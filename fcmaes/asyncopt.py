@@ -0,0 +1,117 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" asyncio based delayed update optimization loop for awaitable objective functions.
+    Useful if the objective function is a request to a simulation service,
+    where blocking a process for each evaluation wastes resources.
+    Uses the ask / tell interfaces of cmaes.Cmaes, de.DE and mode.MODE,
+    all optimizer state updates are executed in the event loop.
+
+    Usage:
+
+    async def fun(x):
+        return await simulation.request(x)
+
+    es = cmaes.Cmaes(bounds, popsize = 32)
+    ret = asyncio.run(asyncopt.minimize(fun, es, max_evaluations = 10000, concurrency = 256))
+"""
+
+import sys
+import asyncio
+import numpy as np
+from scipy.optimize import OptimizeResult
+from fcmaes import cmaes, de, mode
+
+async def minimize(fun,
+                   optimizer,
+                   max_evaluations = 100000,
+                   concurrency = 64):
+    """Minimization of an awaitable objective function using the delayed update
+    ask / tell interface of an optimizer.
+
+    Parameters
+    ----------
+    fun : coroutine function
+        The objective function to be minimized.
+            ``async fun(x) -> float`` or ``async fun(x) -> list(float)`` for mode.MODE
+        where ``x`` is an 1-D array with shape (n,)
+    optimizer : cmaes.Cmaes, de.DE or mode.MODE
+        ask / tell optimizer. mode.MODE needs to be created with workers >= concurrency.
+    max_evaluations : int, optional
+        Forced termination after ``max_evaluations`` function evaluations.
+    concurrency : int, optional
+        Number of function evaluations in flight.
+
+    Returns
+    -------
+    res : scipy.OptimizeResult for cmaes.Cmaes and de.DE
+        The optimization result is represented as an ``OptimizeResult`` object.
+        Important attributes are: ``x`` the solution array,
+        ``fun`` the best function value, ``nfev`` the number of function evaluations,
+        ``nit`` the number of iterations, ``status`` the stopping critera and
+        ``success`` a Boolean flag indicating if the optimizer exited successfully.
+    x, y: for mode.MODE list of argument vectors and corresponding value vectors
+        of the optimization results. """
+
+    penalty = sys.float_info.max
+    if isinstance(optimizer, cmaes.Cmaes):
+        ask = lambda : (None, optimizer.ask_one())
+        tell = lambda p, y, x : optimizer.tell_one(y, x)
+    elif isinstance(optimizer, de.DE):
+        ask = lambda : _ask_filtered(optimizer, concurrency)
+        tell = lambda p, y, x : optimizer.tell_one(p, y, x)
+    elif isinstance(optimizer, mode.MODE):
+        if optimizer.workers < concurrency:
+            raise ValueError('mode.MODE needs to be created with workers >= concurrency')
+        ask = optimizer.ask
+        tell = optimizer.tell
+        penalty = np.full(optimizer.nobj + optimizer.ncon, penalty)
+    else:
+        raise ValueError('unsupported optimizer ' + str(type(optimizer)))
+
+    evals = await _optimize(fun, ask, tell, max_evaluations, concurrency, penalty)
+    if isinstance(optimizer, mode.MODE):
+        return mode.filter(optimizer.x, optimizer.y)
+    return OptimizeResult(x=optimizer.best_x, fun=optimizer.best_value, nfev=evals,
+                          nit=optimizer.iterations, status=optimizer.stop, success=True)
+
+async def _optimize(fun, ask, tell, max_evals, concurrency, penalty):
+    running = set()
+    evals = 0
+    stop = 0
+    while True:
+        while len(running) < concurrency and evals < max_evals: # fill queue
+            p, x = ask()
+            running.add(asyncio.ensure_future(_evaluate(fun, p, x, penalty)))
+            evals += 1
+        if len(running) == 0:
+            break
+        done, running = await asyncio.wait(running, return_when = asyncio.FIRST_COMPLETED)
+        for task in done: # tell evaluated x
+            p, x, y = task.result()
+            stop = tell(p, y, x)
+            if stop != 0:
+                break
+        if stop != 0:
+            break # stop criteria met
+    for task in running: # cancel remaining evaluations
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions = True)
+    return evals
+
+async def _evaluate(fun, p, x, penalty):
+    try:
+        y = await fun(x)
+    except Exception as ex:
+        y = penalty
+    return p, x, y
+
+def _ask_filtered(optimizer, tries):
+    for _ in range(tries):
+        p, x = optimizer.ask_one()
+        if optimizer.filter is None or \
+            optimizer.filter.is_improve(x, optimizer.x[p], optimizer.y[p]):
+                break
+    return p, x
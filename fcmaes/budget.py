@@ -0,0 +1,72 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Core budget shared by parallel retry and parallel function evaluation.
+
+    The retry stores own a Budget instance. A retry using ``workers`` cores and
+    ``eval_workers`` evaluation workers for each optimization run executes
+    workers // eval_workers runs in parallel. Each run acquires its share of the
+    cores when it starts: When fewer runs remain than retry processes, the
+    remaining runs get more evaluation workers so that no core is left idle.
+    With eval_workers = 1 no parallel evaluation was requested, each run gets
+    a single core.
+    Optimizers supporting parallel function evaluation use the share of the
+    current run, see Optimizer.eval_workers.
+"""
+
+import ctypes as ct
+import multiprocessing as mp
+from fcmaes.pool import Lock
+
+class Budget(object):
+    """Number of cores shared by the optimization runs of a parallel retry.
+
+    Parameters
+    ----------
+    cores : int, optional
+        number of cores used by the retry.
+    eval_workers : int, optional
+        number of evaluation workers of each run if all retry processes are busy."""
+
+    def __init__(self, cores = mp.cpu_count(), eval_workers = 1):
+        self.cores = mp.RawValue(ct.c_int, 1)
+        self.eval_workers = mp.RawValue(ct.c_int, 1)
+        self.used = mp.RawValue(ct.c_int, 0) # cores used by running optimizations
+        self.running = mp.RawValue(ct.c_int, 0) # number of running optimizations
+        self.mutex = Lock()
+        self.current = 1 # share of the current run, not shared between processes
+        self.set(cores, eval_workers)
+
+    def set(self, cores, eval_workers = 1):
+        self.cores.value = max(1, cores)
+        self.eval_workers.value = max(1, min(eval_workers, self.cores.value))
+        self.used.value = 0
+        self.running.value = 0
+
+    def retries(self):
+        """number of optimization runs executed in parallel."""
+        return max(1, self.cores.value // self.eval_workers.value)
+
+    def acquire(self, remaining):
+        """share of the cores for a run starting now, remaining is the number of
+        runs still to be started after this one."""
+        with self.mutex:
+            if self.eval_workers.value == 1: # no parallel evaluation requested
+                self.current = 1
+            else:
+                parallel = max(1, min(self.retries(), self.running.value + 1 + max(0, remaining)))
+                share = max(self.eval_workers.value, self.cores.value // parallel)
+                free = self.cores.value - self.used.value
+                self.current = max(1, min(share, free))
+            self.used.value += self.current
+            self.running.value += 1
+            return self.current
+
+    def release(self, share):
+        """returns the share of a finished run."""
+        with self.mutex:
+            self.used.value -= share
+            self.running.value -= 1
+        self.current = 1
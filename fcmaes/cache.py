@@ -0,0 +1,125 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Memoizing wrapper for expensive objective functions.
+
+    Optimizers using discrete arguments (ints for de.DE, decpp.minimize and
+    modecpp.minimize) or decoding continuous arguments (argsort for permutation
+    problems) evaluate the same decoded point repeatedly. Cache stores the
+    function values in shared memory, visible to all worker processes forked after
+    its creation, so repeated points cost a hash lookup instead of a function evaluation.
+
+    Usage:
+
+    cache = Cache(fun, key = lambda x: np.argsort(x))
+    ret = retry.minimize(cache.eval, bounds, ...)
+    print(cache.get_hit_rate())
+
+    A cache sent to pool.Pool workers shares its table with them, see pool.Pool.
+    Don't use it for noisy objective functions.
+"""
+
+import hashlib
+import numpy as np
+import ctypes as ct
+import multiprocessing as mp
+from fcmaes.pool import Lock
+
+class Cache(object):
+    """Process safe memoizing wrapper for an objective function.
+    The table is set associative: A key is hashed to a set of ``ways`` slots,
+    the least recently used slot of the set is replaced if all slots are occupied.
+
+    Parameters
+    ----------
+    fun : callable
+        The objective function ``fun(x) -> float`` or ``fun(x) -> array`` if nobj > 1.
+    nobj : int, optional
+        number of function values.
+    key : callable, optional
+        maps x to the cache key ``key(x) -> array``, for instance the rounded x
+        or its argsort permutation. If None, x itself is used.
+    capacity : int, optional
+        maximal number of cached function values.
+    ways : int, optional
+        number of slots of a set."""
+
+    def __init__(self, fun, nobj = 1, key = None, capacity = 65536, ways = 8):
+        self.fun = fun
+        self.nobj = nobj
+        self.key = key
+        self.ways = ways
+        self.sets = max(1, capacity // ways)
+        size = self.sets * ways
+        self.mutex = Lock()
+        self.hashes_buf = mp.RawArray(ct.c_int64, size) # 0 = empty slot
+        self.used_buf = mp.RawArray(ct.c_int64, size) # last access
+        self.ys_buf = mp.RawArray(ct.c_double, size * nobj)
+        self.clock = mp.RawValue(ct.c_long, 0)
+        self.hits = mp.RawValue(ct.c_long, 0)
+        self.misses = mp.RawValue(ct.c_long, 0)
+        self._create_views()
+
+    def _create_views(self): # numpy views of the shared buffers
+        self.hashes = np.frombuffer(self.hashes_buf, dtype=np.int64)
+        self.used = np.frombuffer(self.used_buf, dtype=np.int64)
+        self.ys = np.frombuffer(self.ys_buf).reshape(self.sets * self.ways, self.nobj)
+
+    def __getstate__(self): # views are recreated after unpickling
+        return {k: v for k, v in self.__dict__.items() if not isinstance(v, np.ndarray)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._create_views()
+
+    def eval(self, x):
+        h = self._hash(x)
+        start = (h % self.sets) * self.ways
+        slots = slice(start, start + self.ways)
+        with self.mutex:
+            self.clock.value += 1
+            found = np.flatnonzero(self.hashes[slots] == h)
+            if len(found) > 0:
+                s = start + found[0]
+                self.used[s] = self.clock.value
+                self.hits.value += 1
+                return self._value(self.ys[s])
+            self.misses.value += 1
+        y = self.fun(x)
+        with self.mutex:
+            self.clock.value += 1
+            s = start + np.argmin(self.used[slots]) # least recently used or empty
+            self.hashes[s] = h
+            self.used[s] = self.clock.value
+            self.ys[s] = y
+        return y
+
+    def get_hits(self):
+        return self.hits.value
+
+    def get_misses(self):
+        return self.misses.value
+
+    def get_hit_rate(self):
+        lookups = self.hits.value + self.misses.value
+        return 0 if lookups == 0 else self.hits.value / lookups
+
+    def clear(self):
+        with self.mutex:
+            self.hashes[:] = 0
+            self.used[:] = 0
+            self.hits.value = 0
+            self.misses.value = 0
+
+    def _hash(self, x):
+        k = np.ascontiguousarray(x if self.key is None else self.key(x))
+        if k.dtype.kind == 'f':
+            k = k + 0.0 # same key for -0.0 and 0.0
+        digest = hashlib.blake2b(k.tobytes(), digest_size = 8).digest()
+        h = int.from_bytes(digest, 'little') >> 1 # positive int64
+        return h if h != 0 else 1
+
+    def _value(self, y):
+        return y[0] if self.nobj == 1 else y.copy()
@@ -0,0 +1,185 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Checkpointing of optimization stores.
+
+    Snapshots are bz2 pickles written to a temporary file which atomically replaces
+    the previous snapshot, so an interrupted write never corrupts it.
+    Writer and Periodic write snapshots in a background thread, Journal is an
+    append-only log of the results added after the last snapshot.
+"""
+
+import os
+import math
+import threading
+import bz2
+import ctypes as ct
+import multiprocessing as mp
+import _pickle as cPickle
+import numpy as np
+from fcmaes.optimizer import eprint
+
+def save(name, data):
+    """atomically replaces the snapshot ``name.pbz2`` by data."""
+    fname = name + '.pbz2'
+    tmp = fname + '.tmp'
+    with bz2.BZ2File(tmp, 'w') as f:
+        cPickle.dump(data, f)
+    os.replace(tmp, fname)
+
+def load(name):
+    """reads the snapshot ``name.pbz2``."""
+    with bz2.BZ2File(name + '.pbz2', 'rb') as f:
+        return cPickle.load(f)
+
+class Writer(object):
+    """Writes snapshots in a background thread. A snapshot not yet written is replaced
+    by a newer one for the same name, so the caller never waits for the disk."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.pending = {}
+        self.writing = False
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, name, data):
+        with self.cond:
+            self.pending[name] = data
+            self.cond.notify_all()
+
+    def flush(self):
+        """waits until all submitted snapshots are written."""
+        with self.cond:
+            while len(self.pending) > 0 or self.writing:
+                self.cond.wait()
+
+    def close(self):
+        self.flush()
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while len(self.pending) == 0 and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                name, data = self.pending.popitem()
+                self.writing = True
+            try:
+                save(name, data)
+            except Exception as ex:
+                eprint('error writing data file ' + name + '.pbz2 ' + str(ex))
+            with self.cond:
+                self.writing = False
+                self.cond.notify_all()
+
+class Periodic(object):
+    """Calls fun every ``interval`` seconds in a background thread and once more when stopped."""
+
+    def __init__(self, fun, interval = 60):
+        self.fun = fun
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self._call()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self._call()
+
+    def _call(self):
+        try:
+            self.fun()
+        except Exception as ex:
+            eprint('checkpoint error ' + str(ex))
+
+class Journal(object):
+    """Append-only files ``name.<segment>.journal`` of (y, x) records. Each process opens 
+    the current segment in append mode and writes a record with a single write call, 
+    records of different processes don't interleave. rotate starts a new segment, so 
+    the segments written before a snapshot can be removed after it is written."""
+
+    def __init__(self, name, dim):
+        self.name = name
+        self.dim = dim
+        segments = self._segments()
+        self.segment = mp.RawValue(ct.c_long, segments[-1] if len(segments) > 0 else 0)
+        self.fd = None
+        self.pid = None
+        self.fd_segment = None
+
+    def __getstate__(self): # file descriptors are not shared
+        state = self.__dict__.copy()
+        state['fd'] = None
+        return state
+
+    def file(self, segment):
+        return self.name + '.' + str(segment) + '.journal'
+
+    def append(self, y, x):
+        if self.fd is None or self.pid != os.getpid() or self.fd_segment != self.segment.value:
+            self._close()
+            self.fd_segment = self.segment.value
+            self.fd = os.open(self.file(self.fd_segment), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self.pid = os.getpid()
+        os.write(self.fd, np.append(y, x).astype(np.float64).tobytes())
+
+    def rotate(self):
+        """starts and returns a new segment. Callers need to exclude concurrent appends."""
+        self.segment.value += 1
+        open(self.file(self.segment.value), 'ab').close() # found by a new Journal
+        return self.segment.value
+
+    def size(self, start = 0):
+        """number of records of the segments starting at segment start."""
+        return sum(os.path.getsize(self.file(s)) // (8 * (self.dim + 1)) 
+                   for s in self._segments() if s >= start)
+
+    def read(self, start = 0):
+        """ys, xs of the records of the segments starting at segment start."""
+        data = [np.fromfile(self.file(s)) for s in self._segments() if s >= start]
+        data = np.concatenate(data + [np.empty(0)])
+        data = data[:len(data) - len(data) % (self.dim + 1)].reshape(-1, self.dim + 1)
+        return data[:,0], data[:,1:]
+
+    def remove(self, end):
+        """removes the segments before segment end."""
+        for s in self._segments():
+            if s < end:
+                try:
+                    os.remove(self.file(s))
+                except OSError:
+                    pass
+
+    def clear(self):
+        self._close()
+        self.remove(math.inf)
+        self.segment.value = 0
+
+    def _close(self):
+        if not self.fd is None and self.pid == os.getpid():
+            os.close(self.fd)
+        self.fd = None
+
+    def _segments(self): # sorted numbers of the existing segments
+        dirname, base = os.path.split(self.name)
+        segments = []
+        for f in os.listdir(dirname or '.'):
+            if f.startswith(base + '.') and f.endswith('.journal'):
+                segment = f[len(base) + 1:-len('.journal')]
+                if segment.isdigit():
+                    segments.append(int(segment))
+        return sorted(segments)
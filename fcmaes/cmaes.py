@@ -18,7 +18,7 @@ import multiprocessing as mp
 from scipy import linalg
 from scipy.optimize import OptimizeResult
 from numpy.random import MT19937, Generator
-from fcmaes.evaluator import Evaluator
+from fcmaes.evaluator import create_evaluator, BatchEvaluator, eval_parallel
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
 
@@ -37,7 +37,11 @@ def minimize(fun,
              runid=0,
              normalize = True,
              update_gap = None,
-             logger = None):       
+             logger = None,
+             vectorized = False,
+             timeout = None,
+             pool = None,
+             threaded = False):       
     """Minimization of a scalar function of one or more variables using CMA-ES.
      
     Parameters
@@ -84,6 +88,20 @@ def minimize(fun,
         logger for log output for tell_one, If None, logging
         is switched off. Default is a logger which logs both to stdout and
         appends to a file ``optimizer.log``.
+    vectorized : boolean, optional
+        If true, ``fun(X) -> ndarray`` maps a 2-D array with shape (m, n) to m function values
+        and is called for the whole population. If workers > 1, chunks of the
+        population are evaluated in parallel.
+    timeout : float, optional
+        Maximal wall clock time in seconds for a single parallel function evaluation.
+        Workers exceeding it are replaced and ``sys.float_info.max`` is used as function value.
+        Their number is returned as ``timeouts`` attribute of the result if workers > 1.
+    pool : fcmaes.pool.Pool or fcmaes.remote.Cluster, optional
+        If defined, its worker processes are used for parallel function evaluation if not vectorized
+        instead of spawning new ones. timeout is ignored in this case.
+    threaded : boolean, optional
+        If true, threads are used for parallel function evaluation instead of processes.
+        Useful if the objective function releases the GIL. timeout and pool are ignored in this case.
    
     Returns
     -------
@@ -94,6 +112,10 @@ def minimize(fun,
         ``nit`` the number of CMA-ES iterations, ``status`` the stopping critera and
         ``success`` a Boolean flag indicating if the optimizer exited successfully. """
   
+    if vectorized:
+        return _minimize_vectorized(fun, bounds, x0, input_sigma, popsize, 
+                        max_evaluations, max_iterations, workers, accuracy, stop_fitness, 
+                        is_terminate, rg, runid, normalize, update_gap, logger)
     if workers is None or workers <= 1:
         fun = serial(fun)        
     cmaes = Cmaes(bounds, x0, 
@@ -103,12 +125,39 @@ def minimize(fun,
                       is_terminate, rg, np.random.randn, runid, normalize, 
                       update_gap, fun, logger)        
     if workers and workers > 1:
-        x, val, evals, iterations, stop = cmaes.do_optimize_delayed_update(fun, workers=workers)
+        x, val, evals, iterations, stop = cmaes.do_optimize_delayed_update(fun, workers=workers, 
+                                                        timeout=timeout, pool=pool, threaded=threaded)
+        return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, 
+                              success=True, timeouts=cmaes.timeouts)
     else:      
         x, val, evals, iterations, stop = cmaes.doOptimize()
     return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, 
                           success=True)
 
+def _minimize_vectorized(fun, bounds, x0, input_sigma, popsize, max_evaluations, 
+                         max_iterations, workers, accuracy, stop_fitness, is_terminate, 
+                         rg, runid, normalize, update_gap, logger):
+    evaluator = None
+    if workers is None or workers <= 1:
+        fun = batch(fun)
+    else:
+        evaluator = BatchEvaluator(fun)
+        evaluator.start(workers)
+        fun = lambda xs : eval_parallel(xs, evaluator)
+    try:
+        cmaes = Cmaes(bounds, x0, 
+                      input_sigma, popsize, 
+                      max_evaluations, max_iterations, 
+                      accuracy, stop_fitness, 
+                      is_terminate, rg, np.random.randn, runid, normalize, 
+                      update_gap, fun, logger)        
+        x, val, evals, iterations, stop = cmaes.doOptimize()
+    finally:
+        if not evaluator is None:
+            evaluator.stop()
+    return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, 
+                          success=True)
+
 class Cmaes(object):
     """Implements the cma-es ask/tell interactive interface."""
     
@@ -358,33 +407,40 @@ class Cmaes(object):
         delta = (self.BD @ self.arz.transpose()) * self.sigma
         self.arx = self.fitfun.closestFeasible(self.xmean + delta.transpose())  
     
-    def do_optimize_delayed_update(self, fun, max_evals=None, workers=mp.cpu_count()):
+    def do_optimize_delayed_update(self, fun, max_evals=None, workers=mp.cpu_count(), timeout=None,
+                                   pool=None, threaded=False):
         if not max_evals is None: 
             self.max_evaluations =  max_evals
-        evaluator = Evaluator(fun)
+        evaluator = create_evaluator(fun, self.dim, timeout=timeout, pool=pool, threaded=threaded,
+                                     logger=getattr(self, 'logger', None))
         evaluator.start(workers)
-        evals_x = {}
-        self.evals = 0;
-        for _ in range(workers): # fill queue
-            x = self.ask_one()
-            evaluator.pipe[0].send((self.evals, x))
-            evals_x[self.evals] = x # store x
-            self.evals += 1
+        try:
+            evals_x = {}
+            self.evals = 0;
+            for _ in range(workers): # fill queue
+                x = self.ask_one()
+                evaluator.evaluate(self.evals, x)
+                evals_x[self.evals] = x # store x
+                self.evals += 1
             
-        while True: # read from pipe, tell es and create new x
-            evals, y = evaluator.pipe[0].recv()
+            while True: # read result, tell es and create new x
+                evals, y = evaluator.result()
             
-            x = evals_x[evals] # retrieve evaluated x
-            del evals_x[evals]
-            stop = self.tell_one(y, x) # tell evaluated x
-            if stop != 0 or self.evals >= self.max_evaluations:
-                break # shutdown worker if stop criteria met
+                x = evals_x[evals] # retrieve evaluated x
+                del evals_x[evals]
+                stop = self.tell_one(y, x) # tell evaluated x
+                if stop != 0 or self.evals >= self.max_evaluations:
+                    break # shutdown worker if stop criteria met
             
-            x = self.ask_one() # create new x
-            evaluator.pipe[0].send((self.evals, x))       
-            evals_x[self.evals] = x  # store x
-            self.evals += 1            
-        evaluator.stop()
+                x = self.ask_one() # create new x
+                evaluator.evaluate(self.evals, x)       
+                evals_x[self.evals] = x  # store x
+                self.evals += 1            
+        finally:
+            evaluator.stop()
+        self.timeouts = evaluator.timeouts # number of evaluations exceeding the timeout
+        if evaluator.timeouts > 0 and hasattr(self, 'logger'):
+            self.logger.info('{0} evaluations exceeded the timeout'.format(evaluator.timeouts))
         return self.best_x, self.best_value, evals, self.iterations, self.stop 
          
     def doOptimize(self):
@@ -605,6 +661,21 @@ def serial(fun):
   
     return lambda xs : [_tryfun(fun, x) for x in xs]
         
+def batch(fun):
+    """Convert a vectorized objective function for serial execution for cmaes.minimize.
+    
+    Parameters
+    ----------
+    fun : objective function mapping a 2-D array of float arguments to an array of float values
+
+    Returns
+    -------
+    out : function
+        A function mapping a list of lists of float arguments to a list of float values
+        by a single call of the input function."""
+  
+    return lambda xs : _tryfun_batch(fun, xs)
+
 def _func_serial(fun, num, pid, xs, ys):
     for i in range(pid, len(xs), num):
         ys[i] = _tryfun(fun, xs[i])
@@ -616,6 +687,14 @@ def _tryfun(fun, x):
     except Exception:
         return sys.float_info.max
                         
+def _tryfun_batch(fun, xs):
+    try:
+        ys = np.asarray(fun(np.asarray(xs)), dtype = np.float64).reshape(len(xs))
+        ys[~np.isfinite(ys)] = sys.float_info.max
+        return ys
+    except Exception:
+        return np.full(len(xs), sys.float_info.max)
+                        
 def _check_bounds(bounds, guess, rg):
     if bounds is None and guess is None:
         raise ValueError('either guess or bounds need to be defined')
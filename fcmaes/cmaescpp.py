@@ -16,7 +16,10 @@ import numpy as np
 from numpy.random import MT19937, Generator
 from scipy.optimize import OptimizeResult
 from fcmaes.cmaes import _check_bounds
-from fcmaes.decpp import mo_call_back_type, callback, libcmalib
+from fcmaes.decpp import mo_call_back_type, c_callbacks, libcmalib, \
+    call_back_par, callback_par, single, worker_fun, native_telemetry
+from fcmaes.evaluator import native_stats_size, native_stats
+from fcmaes.native import scalar_type
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
 
@@ -32,7 +35,10 @@ def minimize(fun,
              runid=0,
              workers = 1, 
              normalize = True,
-             update_gap = None):   
+             update_gap = None,
+             is_terminate = None,
+             parfun = None,
+             processes = False):   
     """Minimization of a scalar function of one or more variables using a 
     C++ CMA-ES implementation called via ctypes.
      
@@ -71,6 +77,19 @@ def minimize(fun,
         pheno -> if true geno transformation maps arguments to interval [-1,1] 
     update_gap : int, optional
         number of iterations without distribution update
+    is_terminate : callable, optional
+        Callback to be used if the caller of minimize wants to decide when to terminate.
+    parfun : callable, optional
+        Evaluates a whole population, ``parfun(xs) -> ys`` maps a 2-D array with shape 
+        (popsize, dim) to popsize function values, for instance a vectorized objective function 
+        or gcldecpp.parallel(fun, workers). If defined it replaces fun and workers, each generation 
+        is evaluated by a single call. is_terminate is then called with the population arguments 
+        and their function values after each generation.
+    processes : boolean, optional
+        If true and workers > 1, fun is evaluated by worker processes, see evaluator.ProcessFun.
+        Useful for Python objective functions holding the GIL. Otherwise the C++ evaluator 
+        threads call fun directly. A NativeFun is called directly without holding the GIL 
+        if is_terminate is None.
            
     Returns
     -------
@@ -81,7 +100,9 @@ def minimize(fun,
         ``nfev`` the number of function evaluations,
         ``nit`` the number of CMA-ES iterations, 
         ``status`` the stopping critera and
-        ``success`` a Boolean flag indicating if the optimizer exited successfully. """
+        ``success`` a Boolean flag indicating if the optimizer exited successfully.
+        If workers > 1 and the library provides it, ``stats`` contains the evaluator telemetry, 
+        see evaluator.Telemetry.stats. """
     
     lower, upper, guess = _check_bounds(bounds, x0, rg)      
     dim = guess.size   
@@ -97,23 +118,160 @@ def minimize(fun,
         input_sigma = [input_sigma] * dim
     if stop_fitness is None:
         stop_fitness = math.inf    
+    if not parfun is None and optimizeACMA_par_C is None:
+        fun, parfun = single(parfun), None # library built without population callback
     array_type = ct.c_double * dim 
-    c_callback = mo_call_back_type(callback(fun, dim))
-    res = np.empty(dim+4)
+    pfun = None
+    if parfun is None:
+        fun, pfun = worker_fun(fun, dim, 1, workers, processes)
+        c_callback, optimize, fit = c_callbacks(fun, dim, is_terminate, 
+                                                optimizeACMA_C, optimizeACMA_scalar_C)
+    else:
+        c_callback, fit = call_back_par(callback_par(fun, parfun, is_terminate)), None
+        workers = 1
+    res = np.zeros(dim + 4 + native_stats_size(workers))
     res_p = res.ctypes.data_as(ct.POINTER(ct.c_double))
     try:
-        optimizeACMA_C(runid, c_callback, dim, array_type(*guess), array_type(*lower), array_type(*upper), 
+        if parfun is None:
+            optimize(runid, c_callback, dim, array_type(*guess), array_type(*lower), array_type(*upper), 
                 array_type(*input_sigma), max_evaluations, stop_fitness, mu, 
                 popsize, accuracy, int(rg.uniform(0, 2**32 - 1)), normalize, -1 if update_gap is None else update_gap, 
                 workers, res_p)
+        else:
+            optimizeACMA_par_C(runid, c_callback, dim, array_type(*guess), array_type(*lower), array_type(*upper), 
+                array_type(*input_sigma), max_evaluations, stop_fitness, mu, 
+                popsize, accuracy, int(rg.uniform(0, 2**32 - 1)), normalize, -1 if update_gap is None else update_gap, 
+                res_p)
         x = res[:dim]
         val = res[dim]
+        if not fit is None:
+            x, val = fit.result(x, val)
         evals = int(res[dim+1])
         iterations = int(res[dim+2])
         stop = int(res[dim+3])
-        return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, success=True)
+        ret = OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, success=True)
+        if workers > 1 and native_telemetry:
+            ret.stats = native_stats(res[dim+4:], workers)
+        return ret
     except Exception as ex:
         return OptimizeResult(x=None, fun=sys.float_info.max, nfev=0, nit=0, status=-1, success=False)
+    finally:
+        if not pfun is None:
+            pfun.stop() # stop the evaluation processes
+
+class ACMA_C(object):
+    """ask/tell interface of the C++ CMA-ES. Function evaluation is left to the caller, 
+    for instance an asynchronous, distributed or pooled evaluation engine.
+    
+    Parameters
+    ----------
+    bounds : sequence or `Bounds`, optional
+        Bounds on variables. There are two ways to specify the bounds:
+            1. Instance of the `scipy.Bounds` class.
+            2. Sequence of ``(min, max)`` pairs for each element in `x`. None
+               is used to specify no bound.
+    x0 : ndarray, shape (dim,)
+        Initial guess. Array of real elements of size (dim,),
+        where 'dim' is the number of independent variables.  
+    input_sigma : ndarray, shape (dim,) or scalar
+        Initial step size for each dimension.
+    popsize = int, optional
+        CMA-ES population size.
+    max_evaluations : int, optional
+        Expected number of function evaluations, used for the step size damping.
+    accuracy : float, optional
+        values > 1.0 reduce the accuracy.
+    stop_fitness : float, optional 
+         Limit for fitness value. If reached tell returns a stop criteria != 0.
+    rg = numpy.random.Generator, optional
+        Random generator for creating random guesses.
+    runid : int, optional
+        id used to identify the run for debugging / logging. 
+    normalize : boolean, optional
+        pheno -> if true geno transformation maps arguments to interval [-1,1] 
+    update_gap : int, optional
+        number of iterations without distribution update"""
+    
+    def __init__(self, bounds=None, 
+                 x0=None, 
+                 input_sigma = 0.3, 
+                 popsize = 31, 
+                 max_evaluations = 100000, 
+                 accuracy = 1.0, 
+                 stop_fitness = None, 
+                 rg = Generator(MT19937()),
+                 runid=0,
+                 normalize = True,
+                 update_gap = None):
+        if initACMA_C is None:
+            raise ImportError('libacmalib was built without the ask/tell interface, rebuild _fcmaescpp')
+        lower, upper, guess = _check_bounds(bounds, x0, rg)      
+        self.dim = guess.size   
+        if lower is None:
+            lower = [0]*self.dim
+            upper = [0]*self.dim
+        mu = int(popsize/2)
+        if callable(input_sigma):
+            input_sigma=input_sigma()
+        if np.ndim(input_sigma) == 0:
+            input_sigma = [input_sigma] * self.dim
+        if stop_fitness is None:
+            stop_fitness = math.inf    
+        self.popsize = popsize
+        array_type = ct.c_double * self.dim 
+        self.ptr = initACMA_C(runid, self.dim, array_type(*guess), array_type(*lower), 
+                array_type(*upper), array_type(*input_sigma), max_evaluations, stop_fitness, mu, 
+                popsize, accuracy, int(rg.uniform(0, 2**32 - 1)), normalize, 
+                -1 if update_gap is None else update_gap)
+        self.xs = None
+    
+    def __del__(self):
+        if not getattr(self, 'ptr', None) is None:
+            destroyACMA_C(self.ptr)
+            self.ptr = None
+        
+    def ask(self, n = None):
+        """ask for n new argument vectors, default is popsize.
+            
+        Returns
+        -------
+        xs : 2-D array with shape (n, dim)."""
+        
+        n = self.popsize if n is None else n
+        self.xs = np.empty((n, self.dim))
+        askACMA_C(self.ptr, n, self.xs.ctypes.data_as(ct.POINTER(ct.c_double)))
+        return self.xs
+        
+    def tell(self, ys, xs = None):
+        """tell function values for the argument vectors retrieved by ask().
+            The distribution is updated after each popsize values.
+    
+        Parameters
+        ----------
+        ys : list of function values
+        xs : list of dim sized argument vectors, optional
+            use only if you want to submit values for arguments not from ask()
+ 
+        Returns
+        -------
+        stop : int termination criteria, if != 0 loop should stop."""
+        
+        if xs is None:
+            if self.xs is None:
+                raise ValueError('either call ask before or define xs')
+            xs = self.xs
+        xs = np.ascontiguousarray(xs, dtype=np.float64)
+        ys = np.ascontiguousarray(ys, dtype=np.float64)
+        return tellACMA_C(self.ptr, len(ys), ys.ctypes.data_as(ct.POINTER(ct.c_double)), 
+                          xs.ctypes.data_as(ct.POINTER(ct.c_double)))
+    
+    def result(self):
+        """best solution so far as ``OptimizeResult``."""
+        res = np.empty(self.dim + 4)
+        stateACMA_C(self.ptr, res.ctypes.data_as(ct.POINTER(ct.c_double)))
+        dim = self.dim
+        return OptimizeResult(x=res[:dim], fun=res[dim], nfev=int(res[dim+1]), 
+                              nit=int(res[dim+2]), status=int(res[dim+3]), success=True)
 
 optimizeACMA_C = libcmalib.optimizeACMA_C
 optimizeACMA_C.argtypes = [ct.c_long, mo_call_back_type, ct.c_int, \
@@ -122,4 +280,46 @@ optimizeACMA_C.argtypes = [ct.c_long, mo_call_back_type, ct.c_int, \
             ct.c_double, ct.c_long, ct.c_bool, ct.c_int, 
             ct.c_int, ct.POINTER(ct.c_double)]
 
+try:
+    optimizeACMA_par_C = libcmalib.optimizeACMA_par_C
+    optimizeACMA_par_C.argtypes = [ct.c_long, call_back_par, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), \
+            ct.POINTER(ct.c_double), ct.c_int, ct.c_double, ct.c_int, ct.c_int, \
+            ct.c_double, ct.c_long, ct.c_bool, ct.c_int, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before the population callback was added
+    optimizeACMA_par_C = None
+
+try:
+    optimizeACMA_scalar_C = libcmalib.optimizeACMA_scalar_C
+    optimizeACMA_scalar_C.argtypes = [ct.c_long, scalar_type, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), \
+            ct.POINTER(ct.c_double), ct.c_int, ct.c_double, ct.c_int, ct.c_int, \
+            ct.c_double, ct.c_long, ct.c_bool, ct.c_int, 
+            ct.c_int, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before scalar native functions were supported
+    optimizeACMA_scalar_C = None
+
+try:
+    initACMA_C = libcmalib.initACMA_C
+    initACMA_C.argtypes = [ct.c_long, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), \
+            ct.POINTER(ct.c_double), ct.c_int, ct.c_double, ct.c_int, ct.c_int, \
+            ct.c_double, ct.c_long, ct.c_bool, ct.c_int]
+    initACMA_C.restype = ct.c_void_p
+    destroyACMA_C = libcmalib.destroyACMA_C
+    destroyACMA_C.argtypes = [ct.c_void_p]
+    askACMA_C = libcmalib.askACMA_C
+    askACMA_C.argtypes = [ct.c_void_p, ct.c_int, ct.POINTER(ct.c_double)]
+    tellACMA_C = libcmalib.tellACMA_C
+    tellACMA_C.argtypes = [ct.c_void_p, ct.c_int, ct.POINTER(ct.c_double), ct.POINTER(ct.c_double)]
+    stateACMA_C = libcmalib.stateACMA_C
+    stateACMA_C.argtypes = [ct.c_void_p, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before the ask/tell interface was added
+    initACMA_C = None
+
+try:
+    terminateWorkersACMA_C = libcmalib.terminateWorkersACMA_C
+except AttributeError: # library built before the workers loop checked is_terminate
+    terminateWorkersACMA_C = None
 
+native_terminate_workers = not terminateWorkersACMA_C is None # is_terminate checked if workers > 1
@@ -16,7 +16,8 @@ import numpy as np
 from numpy.random import MT19937, Generator
 from scipy.optimize import OptimizeResult
 from fcmaes.cmaes import _check_bounds
-from fcmaes.decpp import mo_call_back_type, callback, libcmalib
+from fcmaes.decpp import mo_call_back_type, c_callbacks, libcmalib
+from fcmaes.native import scalar_type
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
 
@@ -28,7 +29,8 @@ def minimize(fun,
              max_evaluations = 100000, 
              stop_fitness = None, 
              rg = Generator(MT19937()),
-             runid=0):
+             runid=0,
+             is_terminate = None):
        
     """Minimization of a scalar function of one or more variables using a 
     C++ SCMA implementation called via ctypes.
@@ -59,6 +61,8 @@ def minimize(fun,
         Random generator for creating random guesses.
     runid : int, optional
         id used to identify the run for debugging / logging. 
+    is_terminate : callable, optional
+        Callback to be used if the caller of minimize wants to decide when to terminate.
            
     Returns
     -------
@@ -83,15 +87,18 @@ def minimize(fun,
     if stop_fitness is None:
         stop_fitness = -math.inf   
     array_type = ct.c_double * dim 
-    c_callback = mo_call_back_type(callback(fun, dim))
+    c_callback, optimize, fit = c_callbacks(fun, dim, is_terminate, 
+                                            optimizeCsma_C, optimizeCsma_scalar_C)
     res = np.empty(dim+4)
     res_p = res.ctypes.data_as(ct.POINTER(ct.c_double))
     try:
-        optimizeCsma_C(runid, c_callback, dim, int(rg.uniform(0, 2**32 - 1)), 
+        optimize(runid, c_callback, dim, int(rg.uniform(0, 2**32 - 1)), 
                 array_type(*guess), array_type(*lower), array_type(*upper), 
                 array_type(*input_sigma), max_evaluations, stop_fitness, popsize, res_p)
         x = res[:dim]
         val = res[dim]
+        if not fit is None:
+            x, val = fit.result(x, val)
         evals = int(res[dim+1])
         iterations = int(res[dim+2])
         stop = int(res[dim+3])
@@ -103,4 +110,19 @@ optimizeCsma_C = libcmalib.optimizeCsma_C
 optimizeCsma_C.argtypes = [ct.c_long, mo_call_back_type, ct.c_int, ct.c_int, \
             ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), \
             ct.POINTER(ct.c_double), ct.c_int, ct.c_double, ct.c_int, ct.POINTER(ct.c_double)]
+
+try:
+    optimizeCsma_scalar_C = libcmalib.optimizeCsma_scalar_C
+    optimizeCsma_scalar_C.argtypes = [ct.c_long, scalar_type, ct.c_int, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), \
+            ct.POINTER(ct.c_double), ct.c_int, ct.c_double, ct.c_int, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before scalar native functions were supported
+    optimizeCsma_scalar_C = None
+
+try:
+    terminateCsma_C = libcmalib.terminateCsma_C
+except AttributeError: # library built before the optimizer checked is_terminate
+    terminateCsma_C = None
+
+native_terminate = not terminateCsma_C is None # is_terminate checked
         
@@ -17,6 +17,7 @@ from scipy.optimize import OptimizeResult
 from fcmaes.cmaes import _check_bounds
 from fcmaes.ldecpp import callback
 from fcmaes.decpp import libcmalib
+from fcmaes.native import NativeFun
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
 
@@ -70,7 +71,8 @@ def minimize(fun,
         lower = [0]*dim
         upper = [0]*dim
     array_type = ct.c_double * dim   
-    c_callback = call_back_type(callback(fun))
+    c_callback = fun.scalar_callback() if isinstance(fun, NativeFun) else \
+        call_back_type(callback(fun))
     seed = int(rg.uniform(0, 2**32 - 1))
     res = np.empty(dim+4)
     res_p = res.ctypes.data_as(ct.POINTER(ct.c_double))
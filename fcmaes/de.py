@@ -42,7 +42,7 @@ import ctypes as ct
 from fcmaes.testfun import Wrapper, Rosen, Rastrigin, Eggholder
 from numpy.random import Generator, MT19937
 from scipy.optimize import OptimizeResult
-from fcmaes.evaluator import Evaluator
+from fcmaes.evaluator import create_evaluator
 import multiprocessing as mp
 from collections import deque
 
@@ -60,7 +60,10 @@ def minimize(fun,
              filter = None,
              ints = None,
              modifier = None,
-             logger = None):    
+             logger = None,
+             timeout = None,
+             pool = None,
+             threaded = False):    
     """Minimization of a scalar function of one or more variables using
     Differential Evolution.
      
@@ -113,6 +116,16 @@ def minimize(fun,
         logger for log output for tell_one, If None, logging
         is switched off. Default is a logger which logs both to stdout and
         appends to a file ``optimizer.log``.
+    timeout : float, optional
+        Maximal wall clock time in seconds for a single parallel function evaluation.
+        Workers exceeding it are replaced and ``sys.float_info.max`` is used as function value.
+        Their number is returned as ``timeouts`` attribute of the result if workers > 1.
+    pool : fcmaes.pool.Pool or fcmaes.remote.Cluster, optional
+        If defined, its worker processes are used for parallel function evaluation
+        instead of spawning new ones. timeout is ignored in this case.
+    threaded : boolean, optional
+        If true, threads are used for parallel function evaluation instead of processes.
+        Useful if the objective function releases the GIL. timeout and pool are ignored in this case.
             
     Returns
     -------
@@ -128,7 +141,10 @@ def minimize(fun,
     de = DE(dim, bounds, popsize, stop_fitness, keep, f, cr, rg, filter, ints, modifier, logger)
     try:
         if workers and workers > 1:
-            x, val, evals, iterations, stop = de.do_optimize_delayed_update(fun, max_evaluations, workers)
+            x, val, evals, iterations, stop = de.do_optimize_delayed_update(fun, max_evaluations, workers, 
+                                                                        timeout, pool, threaded)
+            return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, 
+                                  success=True, timeouts=de.timeouts)
         else:      
             x, val, evals, iterations, stop = de.do_optimize(fun, max_evaluations)
         return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, 
@@ -340,40 +356,47 @@ class DE(object):
 
         return self.best_x, self.best_value, self.evals, self.iterations, self.stop
 
-    def do_optimize_delayed_update(self, fun, max_evals, workers=mp.cpu_count()):
+    def do_optimize_delayed_update(self, fun, max_evals, workers=mp.cpu_count(), timeout=None,
+                                   pool=None, threaded=False):
         self.fun = fun
         self.max_evals = max_evals    
-        evaluator = Evaluator(self.fun)
+        evaluator = create_evaluator(self.fun, self.dim, timeout=timeout, pool=pool, 
+                                     threaded=threaded, logger=getattr(self, 'logger', None))
         evaluator.start(workers)
-        evals_x = {}
-        self.iterations = 0
-        self.evals = 0
-        self.p = 0
-        self.improves = deque()
-        for _ in range(workers): # fill queue with initial population
-            p, x = self.ask_one()
-            evaluator.pipe[0].send((self.evals, x))
-            evals_x[self.evals] = p, x # store x
-            self.evals += 1
+        try:
+            evals_x = {}
+            self.iterations = 0
+            self.evals = 0
+            self.p = 0
+            self.improves = deque()
+            for _ in range(workers): # fill queue with initial population
+                p, x = self.ask_one()
+                evaluator.evaluate(self.evals, x)
+                evals_x[self.evals] = p, x # store x
+                self.evals += 1
             
-        while True: # read from pipe, tell de and create new x
-            evals, y = evaluator.pipe[0].recv()            
-            p, x = evals_x[evals] # retrieve evaluated x
-            del evals_x[evals]
-            self.tell_one(p, y, x) # tell evaluated x
-            if self.stop != 0 or self.evals >= self.max_evals:
-                break # shutdown worker if stop criteria met
+            while True: # read result, tell de and create new x
+                evals, y = evaluator.result()            
+                p, x = evals_x[evals] # retrieve evaluated x
+                del evals_x[evals]
+                self.tell_one(p, y, x) # tell evaluated x
+                if self.stop != 0 or self.evals >= self.max_evals:
+                    break # shutdown worker if stop criteria met
             
-            for _ in range(workers):
-                p, x = self.ask_one() # create new x          
-                if self.filter is None or \
-                    self.filter.is_improve(x, self.x[p], self.y[p]):
-                        break
-            evaluator.pipe[0].send((self.evals, x))       
-            evals_x[self.evals] = p, x  # store x
-            self.evals += 1
+                for _ in range(workers):
+                    p, x = self.ask_one() # create new x          
+                    if self.filter is None or \
+                        self.filter.is_improve(x, self.x[p], self.y[p]):
+                            break
+                evaluator.evaluate(self.evals, x)       
+                evals_x[self.evals] = p, x  # store x
+                self.evals += 1
             
-        evaluator.stop()
+        finally:
+            evaluator.stop()
+        self.timeouts = evaluator.timeouts # number of evaluations exceeding the timeout
+        if evaluator.timeouts > 0 and hasattr(self, 'logger'):
+            self.logger.info('{0} evaluations exceeded the timeout'.format(evaluator.timeouts))
         return self.best_x, self.best_value, self.evals, self.iterations, self.stop
        
     def _next_x(self, p):
@@ -24,6 +24,8 @@ import numpy as np
 from numpy.random import MT19937, Generator
 from scipy.optimize import OptimizeResult
 from fcmaes import de
+from fcmaes.evaluator import native_stats_size, native_stats, ProcessFun
+from fcmaes.native import NativeFun, scalar_type
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
 
@@ -40,7 +42,9 @@ def minimize(fun,
              ints = None,
              workers = 1,
              is_terminate = None,
-             runid=0):  
+             runid=0,
+             parfun = None,
+             processes = False):  
      
     """Minimization of a scalar function of one or more variables using a 
     C++ Differential Evolution implementation called via ctypes.
@@ -85,6 +89,17 @@ def minimize(fun,
         Callback to be used if the caller of minimize wants to decide when to terminate.
     runid : int, optional
         id used to identify the run for debugging / logging. 
+    parfun : callable, optional
+        Evaluates a whole population, ``parfun(xs) -> ys`` maps a 2-D array with shape 
+        (popsize, dim) to popsize function values, for instance a vectorized objective function 
+        or gcldecpp.parallel(fun, workers). If defined it replaces fun and workers, each generation 
+        is evaluated by a single call. is_terminate is then called with the population arguments 
+        and their function values after each generation.
+    processes : boolean, optional
+        If true and workers > 1, fun is evaluated by worker processes, see evaluator.ProcessFun.
+        Useful for Python objective functions holding the GIL. Otherwise the C++ evaluator 
+        threads call fun directly. A NativeFun is called directly without holding the GIL 
+        if is_terminate is None.
             
     Returns
     -------
@@ -94,7 +109,9 @@ def minimize(fun,
         ``fun`` the best function value, 
         ``nfev`` the number of function evaluations,
         ``nit`` the number of iterations,
-        ``success`` a Boolean flag indicating if the optimizer exited successfully. """
+        ``success`` a Boolean flag indicating if the optimizer exited successfully.
+        If workers > 1 and the library provides it, ``stats`` contains the evaluator telemetry, 
+        see evaluator.Telemetry.stats. """
     
     dim, lower, upper = de._check_bounds(bounds, dim)
     if popsize is None:
@@ -108,25 +125,184 @@ def minimize(fun,
         workers = 0
     if stop_fitness is None:
         stop_fitness = math.inf   
+    if not parfun is None and optimizeDE_par_C is None:
+        fun, parfun = single(parfun), None # library built without population callback
     array_type = ct.c_double * dim   
     bool_array_type = ct.c_bool * dim 
-    c_callback = mo_call_back_type(callback(fun, dim, is_terminate))
+    workers = min(workers, popsize) # as limited by the C++ delayed update
+    pfun = None
+    if parfun is None:
+        fun, pfun = worker_fun(fun, dim, 1, workers, processes)
+        c_callback, optimize, fit = c_callbacks(fun, dim, is_terminate, 
+                                                optimizeDE_C, optimizeDE_scalar_C)
+    else:
+        c_callback, fit = call_back_par(callback_par(fun, parfun, is_terminate)), None
+        workers = 1
     seed = int(rg.uniform(0, 2**32 - 1))
-    res = np.empty(dim+4)
+    res = np.zeros(dim + 4 + native_stats_size(workers))
     res_p = res.ctypes.data_as(ct.POINTER(ct.c_double))
     try:
-        optimizeDE_C(runid, c_callback, dim, seed,
+        if parfun is None:
+            optimize(runid, c_callback, dim, seed,
                            array_type(*lower), array_type(*upper), bool_array_type(*ints),
                            max_evaluations, keep, stop_fitness,  
                            popsize, f, cr, workers, res_p)
+        else:
+            optimizeDE_par_C(runid, c_callback, dim, seed,
+                           array_type(*lower), array_type(*upper), bool_array_type(*ints),
+                           max_evaluations, keep, stop_fitness,  
+                           popsize, f, cr, res_p)
         x = res[:dim]
         val = res[dim]
+        if not fit is None:
+            x, val = fit.result(x, val)
         evals = int(res[dim+1])
         iterations = int(res[dim+2])
         stop = int(res[dim+3])
-        return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, success=True)
+        ret = OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, success=True)
+        if workers > 1 and native_telemetry:
+            ret.stats = native_stats(res[dim+4:], workers)
+        return ret
     except Exception as ex:
         return OptimizeResult(x=None, fun=sys.float_info.max, nfev=0, nit=0, status=-1, success=False)  
+    finally:
+        if not pfun is None:
+            pfun.stop() # stop the evaluation processes
+
+class DE_C(object):
+    """ask/tell interface of the C++ differential evolution. Function evaluation is left 
+    to the caller, for instance an asynchronous, distributed or pooled evaluation engine.
+    
+    Parameters
+    ----------
+    dim : int
+        dimension of the argument of the objective function
+    bounds : sequence or `Bounds`, optional
+        Bounds on variables. There are two ways to specify the bounds:
+            1. Instance of the `scipy.Bounds` class.
+            2. Sequence of ``(min, max)`` pairs for each element in `x`. None
+               is used to specify no bound.
+    popsize : int, optional
+        Population size.
+    stop_fitness : float, optional 
+         Limit for fitness value. If reached tell returns a stop criteria != 0.
+    keep = float, optional
+        changes the reinitialization probability of individuals based on their age. Higher value
+        means lower probablity of reinitialization.
+    f = float, optional
+        The mutation constant. In the literature this is also known as differential weight, 
+        being denoted by F. Should be in the range [0, 2].
+    cr = float, optional
+        The recombination constant. Should be in the range [0, 1]. 
+        In the literature this is also known as the crossover probability.     
+    rg = numpy.random.Generator, optional
+        Random generator for creating random guesses.
+    ints = list or array of bool, optional
+        indicating which parameters are discrete integer values. 
+    runid : int, optional
+        id used to identify the run for debugging / logging."""
+    
+    def __init__(self,
+                 dim = None,
+                 bounds = None, 
+                 popsize = None, 
+                 stop_fitness = None, 
+                 keep = 200,
+                 f = 0.5,
+                 cr = 0.9,
+                 rg = Generator(MT19937()),
+                 ints = None,
+                 runid=0):
+        if initDE_C is None:
+            raise ImportError('libacmalib was built without the ask/tell interface, rebuild _fcmaescpp')
+        dim, lower, upper = de._check_bounds(bounds, dim)
+        if popsize is None:
+            popsize = 31
+        if lower is None:
+            lower = [0]*dim
+            upper = [0]*dim
+        if ints is None:
+            ints = [False]*dim
+        if stop_fitness is None:
+            stop_fitness = math.inf   
+        self.dim = dim
+        self.popsize = popsize
+        array_type = ct.c_double * dim   
+        bool_array_type = ct.c_bool * dim 
+        self.ptr = initDE_C(runid, dim, int(rg.uniform(0, 2**32 - 1)), 
+                    array_type(*lower), array_type(*upper), bool_array_type(*ints),
+                    0, keep, stop_fitness, popsize, f, cr)
+        self.xs = None
+        self.ps = None
+    
+    def __del__(self):
+        if not getattr(self, 'ptr', None) is None:
+            destroyDE_C(self.ptr)
+            self.ptr = None
+        
+    def ask(self, n = None):
+        """ask for n new argument vectors, default is popsize.
+            
+        Returns
+        -------
+        xs : 2-D array with shape (n, dim)."""
+        
+        n = self.popsize if n is None else n
+        self.xs = np.empty((n, self.dim))
+        self.ps = np.empty(n, dtype=np.intc) # population indices
+        askDE_C(self.ptr, n, self.xs.ctypes.data_as(ct.POINTER(ct.c_double)),
+                self.ps.ctypes.data_as(ct.POINTER(ct.c_int)))
+        return self.xs
+        
+    def tell(self, ys, xs = None):
+        """tell function values for the argument vectors retrieved by the last ask().
+    
+        Parameters
+        ----------
+        ys : list of function values
+        xs : list of dim sized argument vectors, optional
+            modified argument vectors, the order needs to be the same as returned by ask()
+ 
+        Returns
+        -------
+        stop : int termination criteria, if != 0 loop should stop."""
+        
+        if self.ps is None:
+            raise ValueError('call ask before tell')
+        xs = np.ascontiguousarray(self.xs if xs is None else xs, dtype=np.float64)
+        ys = np.ascontiguousarray(ys, dtype=np.float64)
+        return tellDE_C(self.ptr, len(ys), ys.ctypes.data_as(ct.POINTER(ct.c_double)), 
+                        xs.ctypes.data_as(ct.POINTER(ct.c_double)),
+                        self.ps.ctypes.data_as(ct.POINTER(ct.c_int)))
+    
+    def result(self):
+        """best solution so far as ``OptimizeResult``."""
+        res = np.empty(self.dim + 4)
+        stateDE_C(self.ptr, res.ctypes.data_as(ct.POINTER(ct.c_double)))
+        dim = self.dim
+        return OptimizeResult(x=res[:dim], fun=res[dim], nfev=int(res[dim+1]), 
+                              nit=int(res[dim+2]), status=int(res[dim+3]), success=True)
+
+def worker_fun(fun, dim, nobj, workers, processes = False):
+    """objective function called by the C++ evaluator threads and the ProcessFun
+    evaluating it, which is None if fun is called directly."""
+    if workers <= 1 or not processes or isinstance(fun, NativeFun):
+        return fun, None
+    pfun = ProcessFun(fun, dim, nobj).start(workers)
+    return pfun, pfun
+
+def c_callbacks(fun, dim, is_terminate = None, optimize = None, optimize_scalar = None):
+    """callback passed to the C++ optimizer, the optimizer entry point to call with it 
+    and the Python callback object, which is None if fun is a NativeFun called directly 
+    by the optimizer. A scalar NativeFun is passed to optimize_scalar if the library 
+    provides it. If is_terminate is defined, a NativeFun is called by the Python callback 
+    checking it."""
+    if isinstance(fun, NativeFun) and is_terminate is None:
+        if fun.scalar and not optimize_scalar is None:
+            return fun.cfun(), optimize_scalar, None
+        return fun.vector_callback(), optimize, None
+    fit = callback(fun, dim, is_terminate)
+    return mo_call_back_type(fit), optimize, fit
 
 class callback(object):
     
@@ -135,6 +311,9 @@ class callback(object):
         self.dim = dim
         self.nobj = 1
         self.is_terminate = is_terminate
+        self.terminated = False
+        self.best_y = math.inf
+        self.best_x = None
     
     def __call__(self, dim, x, y):
         try:
@@ -146,10 +325,23 @@ class callback(object):
             ybuf = np.frombuffer(arrTypeY.from_address(yaddr))  
             fit = self.fun(xbuf)
             ybuf[0] = fit if math.isfinite(fit) else sys.float_info.max
-            return False if self.is_terminate is None else self.is_terminate(xbuf, ybuf) 
+            if self.is_terminate is None:
+                return False
+            if ybuf[0] < self.best_y: # tracked for results of terminated runs
+                self.best_y = ybuf[0]
+                self.best_x = xbuf.copy()
+            self.terminated = self.terminated or self.is_terminate(xbuf, ybuf)
+            return self.terminated
         except Exception as ex:
             print (ex)
             return False
+        
+    def result(self, x, val):
+        """best evaluated x, y if the run was terminated. Evaluations skipped by the 
+        native optimizer after termination may corrupt its result."""
+        if self.terminated and not self.best_x is None:
+            return self.best_x, self.best_y
+        return x, val
 
 
 class callback_mo(object):
@@ -174,6 +366,39 @@ class callback_mo(object):
             print (ex)
             return False
 
+class callback_par(object):
+    
+    def __init__(self, fun, parfun, is_terminate = None, nobj = 1):
+        self.fun = fun
+        self.parfun = parfun
+        self.is_terminate = is_terminate
+        self.nobj = nobj
+    
+    def __call__(self, popsize, n, xs_, ys_):
+        try:
+            arrType = ct.c_double*(popsize*n)
+            addr = ct.addressof(xs_.contents)
+            xall = np.frombuffer(arrType.from_address(addr))
+            arrTypeY = ct.c_double*(popsize*self.nobj)
+            yaddr = ct.addressof(ys_.contents)   
+            yall = np.frombuffer(arrTypeY.from_address(yaddr)).reshape(popsize, self.nobj)
+            
+            if self.parfun is None:
+                for p in range(popsize):
+                    yall[p] = self.fun(xall[p*n : (p+1)*n])
+            else:    
+                ys = self.parfun(xall.reshape(popsize, n))
+                yall[:] = np.reshape(ys, (popsize, self.nobj))
+            return False if self.is_terminate is None else \
+                self.is_terminate(xall.reshape(popsize, n), 
+                                  ys_[:popsize] if self.nobj == 1 else yall) 
+        except Exception as ex:
+            print (ex)
+            return False
+
+def single(parfun):
+    """objective function evaluating a single argument vector by a population function."""
+    return lambda x: parfun(np.array([x]))[0]
 
 mo_call_back_type = ct.CFUNCTYPE(ct.c_bool, ct.c_int, ct.POINTER(ct.c_double), ct.POINTER(ct.c_double))  
 
@@ -181,10 +406,7 @@ basepath = os.path.dirname(os.path.abspath(__file__))
 
 if sys.platform.startswith('linux'):
     libcmalib = ct.cdll.LoadLibrary(basepath + '/lib/libacmalib.so')  
-master
-
 elif 'mac' in sys.platform or 'darwin' in sys.platform:
-master
     libcmalib = ct.cdll.LoadLibrary(basepath + '/lib/libacmalib.dylib')  
 else:
     os.environ['PATH'] = (basepath + '/lib') + os.pathsep + os.environ['PATH']
@@ -195,4 +417,51 @@ optimizeDE_C.argtypes = [ct.c_long, mo_call_back_type, ct.c_int, ct.c_int, \
             ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_bool), \
             ct.c_int, ct.c_double, ct.c_double, ct.c_int, \
             ct.c_double, ct.c_double, ct.c_int, ct.POINTER(ct.c_double)]
+
+call_back_par = ct.CFUNCTYPE(ct.c_bool, ct.c_int, ct.c_int, \
+                                  ct.POINTER(ct.c_double), ct.POINTER(ct.c_double))  
+
+try:
+    optimizeDE_par_C = libcmalib.optimizeDE_par_C
+    optimizeDE_par_C.argtypes = [ct.c_long, call_back_par, ct.c_int, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_bool), \
+            ct.c_int, ct.c_double, ct.c_double, ct.c_int, \
+            ct.c_double, ct.c_double, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before the population callback was added
+    optimizeDE_par_C = None
+
+try:
+    optimizeDE_scalar_C = libcmalib.optimizeDE_scalar_C
+    optimizeDE_scalar_C.argtypes = [ct.c_long, scalar_type, ct.c_int, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_bool), \
+            ct.c_int, ct.c_double, ct.c_double, ct.c_int, \
+            ct.c_double, ct.c_double, ct.c_int, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before scalar native functions were supported
+    optimizeDE_scalar_C = None
+
+try:
+    evalStatsSize_C = libcmalib.evalStatsSize_C
+    evalStatsSize_C.restype = ct.c_int
+except AttributeError: # library built before the telemetry was added
+    evalStatsSize_C = None
+
+native_telemetry = not evalStatsSize_C is None # optimizers append the telemetry to the result
+
+try:
+    initDE_C = libcmalib.initDE_C
+    initDE_C.argtypes = [ct.c_long, ct.c_int, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_bool), \
+            ct.c_int, ct.c_double, ct.c_double, ct.c_int, ct.c_double, ct.c_double]
+    initDE_C.restype = ct.c_void_p
+    destroyDE_C = libcmalib.destroyDE_C
+    destroyDE_C.argtypes = [ct.c_void_p]
+    askDE_C = libcmalib.askDE_C
+    askDE_C.argtypes = [ct.c_void_p, ct.c_int, ct.POINTER(ct.c_double), ct.POINTER(ct.c_int)]
+    tellDE_C = libcmalib.tellDE_C
+    tellDE_C.argtypes = [ct.c_void_p, ct.c_int, ct.POINTER(ct.c_double), \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_int)]
+    stateDE_C = libcmalib.stateDE_C
+    stateDE_C.argtypes = [ct.c_void_p, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before the ask/tell interface was added
+    initDE_C = None
     
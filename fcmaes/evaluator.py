@@ -8,15 +8,49 @@
     the objective function is distributed once to all processes and
     reused for all eval_parallel calls. Evaluator(fun) needs to be stopped after the
     whole optimization is finished to avoid a resource leak.
+
+    SharedEvaluator(fun) avoids pickling argument vectors and function values:
+    They are exchanged via shared memory slots owned by the worker processes,
+    only the slot index is sent over the worker pipe.
+
+    Both evaluators provide evaluate(i, x) to request the evaluation of x identified
+    by i and result() returning the next (i, y) pair evaluated.
+
+    ThreadEvaluator(fun) uses threads instead of processes. No arguments are pickled,
+    useful for objective functions releasing the GIL like ctypes calls, 
+    numba nogil kernels or numpy heavy code.
+
+    ProcessFun(fun) is a callable evaluating fun in worker processes. It is used by 
+    the C++ optimizers if workers > 1: Their evaluator threads call it concurrently, 
+    the GIL is released while waiting for the worker, so pure Python objective functions
+    are evaluated in parallel.
+
+    BatchEvaluator(fun) supports vectorized objective functions fun(X) -> ndarray.
+    eval_parallel sends contiguous chunks of the population to its workers,
+    the chunk size adapts to the measured cost of a single evaluation.
+
+    SharedEvaluator.stats() shows whether a run is limited by the objective function,
+    by the worker communication or by the optimizer: It reports worker busy / idle times,
+    the request queue depth, an evaluation latency histogram, the time the driver
+    spends between receiving a result and sending its next request and the time
+    it waits for results.
 """
 
 from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
 import multiprocessing as mp
+import ctypes as ct
 import numpy as np
+from collections import deque
 import sys 
 import math   
+import time
+import threading
+import queue
 
 def eval_parallel(xs, evaluator):
+    if isinstance(evaluator, BatchEvaluator):
+        return evaluator.eval_batch(xs)
     popsize = len(xs)
     ys = np.empty(popsize)
     pipe_limit = 256
@@ -46,6 +80,12 @@ class Evaluator(object):
                 self.pipe, self.read_mutex, self.write_mutex)) for _ in range(workers)]
         [p.start() for p in self.proc]
         
+    def evaluate(self, i, x): # request evaluation of x identified by i
+        self.pipe[0].send((i, x))
+
+    def result(self): # blocks until the next (i, y) is available
+        return self.pipe[0].recv()
+
     def stop(self): # shutdown all workers 
         for _ in range(self.workers):
             self.pipe[0].send(None)
@@ -53,11 +93,535 @@ class Evaluator(object):
         for p in self.pipe:
             p.close()
 
+def create_evaluator(fun, dim = None, nobj = 1, timeout = None, pool = None, threaded = False,
+                     logger = None):
+    """Returns the evaluator used by the delayed update loops: A ThreadEvaluator if 
+    threaded is true, an evaluator using the pool workers if a pool or remote.Cluster is defined, 
+    else a SharedEvaluator logging its stats to logger."""
+    if threaded:
+        return ThreadEvaluator(fun)
+    if not pool is None:
+        return pool.evaluator(fun, nobj)
+    return SharedEvaluator(fun, dim, nobj, timeout = timeout, logger = logger)
+
+class Telemetry(object):
+    """Utilization and latency counters of an evaluator. Latency histogram bin k 
+    counts the evaluations taking [2^k, 2^(k+1)) microseconds."""
+
+    bins = 24
+
+    def __init__(self, workers, logger = None, log_period = 60):
+        self.logger = logger
+        self.log_period = log_period
+        self.t0 = time.perf_counter()
+        self.last_log = self.t0
+        self.evals = np.zeros(workers, dtype=np.int64) # per worker
+        self.busy = np.zeros(workers) # per worker evaluation time
+        self.hist = np.zeros(Telemetry.bins, dtype=np.int64)
+        self.queue_sum = 0
+        self.queue_samples = 0
+        self.queue_max = 0
+        self.driver = 0 # time between receiving a result and the next request
+        self.wait = 0 # time waiting for results
+        self.received = None
+    
+    def requested(self, queued): # called for each request, queued = waiting requests
+        if not self.received is None:
+            self.driver += time.perf_counter() - self.received
+            self.received = None
+        self.queue_sum += queued
+        self.queue_samples += 1
+        self.queue_max = max(self.queue_max, queued)
+
+    def evaluated(self, w, dt): # worker w needed dt seconds for an evaluation
+        self.evals[w] += 1
+        self.busy[w] += dt
+        self.hist[min(Telemetry.bins - 1, max(0, int(math.log2(max(1, dt*1E6)))))] += 1
+
+    def returned(self, t_wait): # result returned after waiting since t_wait
+        self.received = time.perf_counter()
+        self.wait += self.received - t_wait
+        if not self.logger is None and self.received - self.last_log >= self.log_period:
+            self.last_log = self.received
+            self.log()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.t0
+        return {'time': elapsed,
+                'evaluations': int(np.sum(self.evals)),
+                'worker_evaluations': self.evals.copy(),
+                'worker_busy': self.busy.copy(),
+                'worker_idle': np.maximum(0, elapsed - self.busy),
+                'utilization': float(np.sum(self.busy)) / (elapsed * len(self.busy)) if elapsed > 0 else 0,
+                'queue_mean': self.queue_sum / self.queue_samples if self.queue_samples > 0 else 0,
+                'queue_max': self.queue_max,
+                'driver': self.driver,
+                'wait': self.wait,
+                'latency_hist': self.hist.copy()}
+        
+    def log(self):
+        s = self.stats()
+        self.logger.info('evals {0} utilization {1:.3f} queue {2:.1f} driver {3:.2f}s wait {4:.2f}s'
+                         .format(s['evaluations'], s['utilization'], s['queue_mean'], 
+                                 s['driver'], s['wait']))
+
+def native_stats_size(workers):
+    """Size of the telemetry buffer filled by the C++ evaluator, see evaluator.h."""
+    return 8 + Telemetry.bins + 2*workers
+
+def native_stats(buf, workers):
+    """Converts the telemetry buffer filled by the C++ evaluator into the 
+    Telemetry.stats format."""
+    elapsed = float(buf[0])
+    off = 8 + Telemetry.bins
+    busy = np.array(buf[off:off + workers])
+    return {'time': elapsed,
+            'evaluations': int(buf[1]),
+            'worker_evaluations': np.array(buf[off + workers:off + 2*workers], dtype=np.int64),
+            'worker_busy': busy,
+            'worker_idle': np.maximum(0, elapsed - busy),
+            'utilization': float(buf[2]) / (elapsed * workers) if elapsed > 0 else 0,
+            'queue_mean': float(buf[4]),
+            'queue_max': int(buf[5]),
+            'driver': float(buf[6]),
+            'wait': float(buf[7]),
+            'latency_hist': np.array(buf[8:off], dtype=np.int64)}
+
+class ThreadEvaluator(object):
+    """Parallel objective function evaluator using threads of the calling process.
+    Provides the same interface as Evaluator, useful if the objective function 
+    releases the GIL."""
+
+    def __init__(self,
+                 fun, # objective function
+                ):
+        self.fun = fun
+        self.timeouts = 0
+
+    def start(self, workers=mp.cpu_count()):
+        self.workers = workers
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.threads = [threading.Thread(target=_evaluate_thread, 
+                    args=(self.fun, self.requests, self.results), daemon=True) 
+                    for _ in range(workers)]
+        [t.start() for t in self.threads]
+
+    def evaluate(self, i, x): # request evaluation of x identified by i
+        self.requests.put((i, x))
+
+    def result(self): # blocks until the next (i, y) is available
+        return self.results.get()
+
+    def stop(self): # shutdown all threads
+        for _ in range(self.workers):
+            self.requests.put(None)
+        [t.join() for t in self.threads]
+
+class ProcessFun(object):
+    """Objective function evaluated by worker processes, can be called from multiple 
+    threads concurrently. Each worker owns a shared memory slot for the argument vector 
+    and its function values, only the slot index crosses the process boundary. A calling 
+    thread holds the GIL only to copy the argument, it waits for the result in a blocking
+    pipe read. Calls exceeding the number of workers wait for a free worker. A dead worker 
+    is replaced, ``penalty`` is returned for the request it was evaluating. 
+    stop needs to be called to avoid a resource leak."""
+
+    def __init__(self,
+                 fun, # objective function
+                 dim, # argument vector size
+                 nobj = 1, # number of values returned by fun
+                 penalty = sys.float_info.max, # result of a failed request
+                ):
+        self.fun = fun
+        self.dim = dim
+        self.nobj = nobj
+        self.penalty = penalty
+        self.proc = None
+
+    def start(self, workers=mp.cpu_count()):
+        self.workers = workers
+        self.xs_buf = mp.RawArray(ct.c_double, workers * self.dim)
+        self.ys_buf = mp.RawArray(ct.c_double, workers * self.nobj)
+        self.dts_buf = mp.RawArray(ct.c_double, workers) # evaluation times
+        self.xs = np.frombuffer(self.xs_buf).reshape(workers, self.dim)
+        self.ys = np.frombuffer(self.ys_buf).reshape(workers, self.nobj)
+        self.conns = [None] * workers
+        self.proc = [None] * workers
+        self.free = queue.Queue() # idle workers
+        for w in range(workers):
+            self._start_worker(w)
+            self.free.put(w)
+        return self
+
+    def __call__(self, x):
+        w = self.free.get()
+        try:
+            self.xs[w] = x
+            self.conns[w].send_bytes(_to_token(w))
+            self.conns[w].recv_bytes() # releases the GIL until the worker is finished
+            return float(self.ys[w, 0]) if self.nobj == 1 else self.ys[w].copy()
+        except (EOFError, OSError): # worker died
+            self.conns[w].close()
+            self.proc[w].join()
+            self._start_worker(w)
+            return self.penalty if self.nobj == 1 else np.full(self.nobj, self.penalty)
+        finally:
+            self.free.put(w)
+
+    def stop(self): # shutdown all workers
+        if self.proc is None:
+            return
+        for conn in self.conns:
+            try:
+                conn.send_bytes(_to_token(-1))
+            except OSError:
+                pass # worker already dead
+        [p.join() for p in self.proc]
+        for conn in self.conns:
+            conn.close()
+        self.proc = None
+
+    def _start_worker(self, w):
+        conn, worker_conn = Pipe()
+        p = Process(target=_evaluate_shared, args=(self.fun,
+                worker_conn, self.xs_buf, self.ys_buf, self.dts_buf, self.dim, self.nobj))
+        p.start()
+        worker_conn.close()
+        self.conns[w] = conn
+        self.proc[w] = p
+
+class SharedEvaluator(object):
+    """Parallel objective function evaluator using shared memory to exchange
+    argument vectors and function values. Each worker owns ``depth`` slots of the
+    shared argument / value arrays, only the slot index crosses the process boundary.
+    Requests exceeding the free slots are queued in the calling process,
+    so evaluate never blocks.
+    
+    If a worker process dies - for instance because the objective function crashed 
+    inside a C extension - it is replaced by a new one. Its queued requests are reissued,
+    the request it was evaluating is retried ``retries`` times before the 
+    ``penalty`` value is returned as its result.
+    
+    If ``timeout`` is defined, a worker exceeding ``timeout`` seconds for a single 
+    evaluation is killed and replaced, ``penalty`` is returned for the request.
+    ``timeouts`` counts these events.
+    
+    stats() returns the Telemetry counters, if ``logger`` is defined they are logged
+    every ``log_period`` seconds and when the evaluator is stopped."""
+
+    def __init__(self,
+                 fun, # objective function
+                 dim = None, # argument vector size, if None determined by the first request
+                 nobj = 1, # number of values returned by fun
+                 depth = 2, # number of requests queued for each worker
+                 retries = 0, # number of retries for a request killing its worker
+                 penalty = sys.float_info.max, # result of a failed request
+                 timeout = None, # maximal wall clock time for an evaluation in seconds
+                 logger = None, # logger for the telemetry counters
+                 log_period = 60, # telemetry logging period in seconds
+                ):
+        self.fun = fun
+        self.dim = dim
+        self.nobj = nobj
+        self.depth = depth
+        self.retries = retries
+        self.penalty = penalty
+        self.timeout = timeout
+        self.crashes = 0 # number of replaced crashed worker processes
+        self.timeouts = 0 # number of killed worker processes exceeding the timeout
+        self.logger = logger
+        self.log_period = log_period
+        self.proc = None
+
+    def start(self, workers=mp.cpu_count()):
+        self.workers = workers
+        self.pending = deque() # requests waiting for a free slot
+        self.telemetry = Telemetry(workers, self.logger, self.log_period)
+        if not self.dim is None:
+            self._start_workers()
+
+    def evaluate(self, i, x): # request evaluation of x identified by i
+        if self.proc is None:
+            self.dim = len(x)
+            self._start_workers()
+        self.telemetry.requested(len(self.pending))
+        if len(self.idle) > 0:
+            self._send(self.idle.popleft(), i, x)
+        else:
+            self.pending.append((i, x))
+
+    def result(self): # blocks until the next (i, y) is available
+        t_wait = time.perf_counter()
+        while len(self.done) == 0:
+            if len(self.ready) == 0:
+                self.ready.extend(wait(self.conns + [p.sentinel for p in self.proc], 
+                                       self._wait_time()))
+                if len(self.ready) == 0: # timeout
+                    self._kill_expired()
+                    continue
+            r = self.ready.popleft()
+            w = self.owner.get(r)
+            if w is None:
+                continue # handle of a replaced worker
+            if r is self.conns[w]:
+                try:
+                    s = _from_token(r.recv_bytes())
+                except (EOFError, OSError):
+                    self._restart(w) # worker died
+                    continue
+                self._received(w, s)
+            elif not self.proc[w].is_alive():
+                self._restart(w)
+        self.telemetry.returned(t_wait)
+        return self.done.popleft()
+
+    def stats(self): # telemetry counters, see Telemetry.stats
+        return self.telemetry.stats()
+
+    def stop(self): # shutdown all workers
+        if not self.logger is None and hasattr(self, 'telemetry'):
+            self.telemetry.log()
+        if self.proc is None:
+            return
+        for conn in self.conns:
+            try:
+                conn.send_bytes(_to_token(-1))
+            except OSError:
+                pass # worker already dead
+        for w, p in enumerate(self.proc):
+            if not self.timeout is None and len(self.sent[w]) > 0:
+                p.join(self.timeout) # don't wait for a hanging evaluation
+                if p.is_alive():
+                    p.kill()
+            p.join()
+        for conn in self.conns:
+            conn.close()
+        self.proc = None
+
+    def _send(self, w, i, x):
+        s = self.free[w].pop()
+        self.xs[s] = x
+        self.ids[s] = i
+        self.tries[s] = 0
+        self._send_slot(w, s)
+
+    def _send_slot(self, w, s):
+        if len(self.sent[w]) == 0:
+            self.started[w] = time.perf_counter()
+        self.sent[w].append(s)
+        try:
+            self.conns[w].send_bytes(_to_token(s))
+        except OSError:
+            pass # worker died, slot is reissued after its restart
+
+    def _received(self, w, s):
+        self.sent[w].remove(s)
+        self.started[w] = time.perf_counter() # worker starts its next slot
+        self.telemetry.evaluated(w, self.dts[s])
+        y = float(self.ys[s, 0]) if self.nobj == 1 else self.ys[s].copy()
+        self._finished(w, s, y)
+
+    def _finished(self, w, s, y):
+        self.done.append((self.ids[s], y))
+        self.free[w].append(s)
+        if len(self.pending) > 0:
+            self._send(w, *self.pending.popleft())
+        else:
+            self.idle.append(w)
+
+    def _wait_time(self):
+        if self.timeout is None:
+            return None
+        busy = [self.started[w] for w in range(self.workers) if len(self.sent[w]) > 0]
+        if len(busy) == 0:
+            return None
+        return max(0, min(busy) + self.timeout - time.perf_counter())
+
+    def _kill_expired(self):
+        now = time.perf_counter()
+        for w in range(self.workers):
+            if len(self.sent[w]) > 0 and now - self.started[w] >= self.timeout:
+                self.proc[w].kill()
+                self._restart(w, killed = True)
+
+    def _restart(self, w, killed = False):
+        conn = self.conns[w]
+        del self.owner[conn]
+        del self.owner[self.proc[w].sentinel]
+        received = 0
+        try:
+            while conn.poll(): # collect results sent before the worker died
+                self._received(w, _from_token(conn.recv_bytes()))
+                received += 1
+        except (EOFError, OSError):
+            pass
+        # if results were received, the expired evaluation finished before the kill
+        expired = killed and received == 0
+        conn.close()
+        self.proc[w].join()
+        if expired:
+            self.timeouts += 1
+        elif not killed:
+            self.crashes += 1
+        self._start_worker(w)
+        sent = self.sent[w]
+        self.sent[w] = deque()
+        if len(sent) > 0 and (expired or not killed): # the worker died evaluating its first slot
+            s = sent.popleft()
+            self.tries[s] += 1
+            if expired or self.tries[s] > self.retries:
+                self._finished(w, s, self.penalty if self.nobj == 1 
+                               else np.full(self.nobj, self.penalty))
+            else:
+                sent.appendleft(s)
+        for s in sent:
+            self._send_slot(w, s)
+
+    def _start_workers(self):
+        slots = self.workers * self.depth
+        self.xs_buf = mp.RawArray(ct.c_double, slots * self.dim)
+        self.ys_buf = mp.RawArray(ct.c_double, slots * self.nobj)
+        self.dts_buf = mp.RawArray(ct.c_double, slots) # evaluation times
+        self.xs = np.frombuffer(self.xs_buf).reshape(slots, self.dim)
+        self.ys = np.frombuffer(self.ys_buf).reshape(slots, self.nobj)
+        self.dts = np.frombuffer(self.dts_buf)
+        self.ids = [None] * slots
+        self.tries = [0] * slots
+        self.free = [list(range(w*self.depth, (w+1)*self.depth))
+                     for w in range(self.workers)]
+        self.sent = [deque() for _ in range(self.workers)] # slots in evaluation order
+        self.started = [0] * self.workers # start time of the current evaluation
+        # first fill one slot of each worker
+        self.idle = deque([w for _ in range(self.depth) for w in range(self.workers)])
+        self.ready = deque()
+        self.done = deque()
+        self.owner = {} # maps pipes and process sentinels to workers
+        self.conns = [None] * self.workers
+        self.proc = [None] * self.workers
+        for w in range(self.workers):
+            self._start_worker(w)
+
+    def _start_worker(self, w):
+        conn, worker_conn = Pipe()
+        p = Process(target=_evaluate_shared, args=(self.fun,
+                worker_conn, self.xs_buf, self.ys_buf, self.dts_buf, self.dim, self.nobj))
+        p.start()
+        worker_conn.close()
+        self.conns[w] = conn
+        self.proc[w] = p
+        self.owner[conn] = w
+        self.owner[p.sentinel] = w
+
+class BatchEvaluator(object):
+    """Parallel evaluator for vectorized objective functions mapping a (n, dim) array
+    of arguments to n function values. Each worker receives a contiguous chunk of the
+    population. Chunks are sized so that their evaluation takes at least ``min_chunk_time``
+    seconds, but do not exceed popsize / workers. So cheap objectives get one large chunk
+    per worker, expensive ones are balanced dynamically over many small chunks.
+    
+    A dead worker is replaced, the chunk it was evaluating is split in halves which 
+    are reissued. A single argument vector killing its worker gets the ``penalty`` value."""
+
+    def __init__(self,
+                 fun, # vectorized objective function
+                 min_chunk_time = 0.01, # minimal evaluation time for a chunk in seconds
+                 penalty = sys.float_info.max, # result of a failed evaluation
+                ):
+        self.fun = fun
+        self.min_chunk_time = min_chunk_time
+        self.penalty = penalty
+        self.eval_time = None # measured time for a single evaluation
+        self.crashes = 0 # number of replaced worker processes
+
+    def start(self, workers=mp.cpu_count()):
+        self.workers = workers
+        self.conns = [None] * workers
+        self.proc = [None] * workers
+        for w in range(workers):
+            self._start_worker(w)
+
+    def chunk_size(self, popsize):
+        max_size = math.ceil(popsize / self.workers)
+        if not self.eval_time: # not measured yet
+            return max_size
+        return max(1, min(max_size, math.ceil(self.min_chunk_time / self.eval_time)))
+
+    def eval_batch(self, xs):
+        xs = np.asarray(xs, dtype = np.float64)
+        popsize = len(xs)
+        ys = np.empty(popsize)
+        size = self.chunk_size(popsize)
+        chunks = deque((i, min(popsize, i + size)) for i in range(0, popsize, size))
+        busy = {} # chunk evaluated by each busy worker
+        eval_time = 0
+        evals = 0
+        while True:
+            for w in range(self.workers):
+                if len(chunks) == 0:
+                    break
+                if not w in busy:
+                    busy[w] = chunks.popleft()
+                    self._send(w, xs, *busy[w])
+            if len(busy) == 0:
+                break
+            ready = wait([self.conns[w] for w in busy] + [self.proc[w].sentinel for w in busy])
+            for w in list(busy.keys()):
+                if not (self.conns[w] in ready or self.proc[w].sentinel in ready):
+                    continue
+                i0, i1 = busy.pop(w)
+                try:
+                    y, dt = self.conns[w].recv()
+                    ys[i0:i1] = y
+                    eval_time += dt
+                    evals += i1 - i0
+                except (EOFError, OSError): # worker died
+                    self._restart(w)
+                    if i1 - i0 > 1: # bisect to isolate the failing argument
+                        im = (i0 + i1) // 2
+                        chunks.extendleft([(im, i1), (i0, im)])
+                    else:
+                        ys[i0] = self.penalty
+        if evals > 0:
+            self.eval_time = eval_time / evals if self.eval_time is None else \
+                0.5*(self.eval_time + eval_time / evals)
+        return ys
+
+    def stop(self): # shutdown all workers
+        for conn in self.conns:
+            try:
+                conn.send(None)
+            except OSError:
+                pass # worker already dead
+        [p.join() for p in self.proc]
+        for conn in self.conns:
+            conn.close()
+
+    def _send(self, w, xs, i0, i1):
+        try:
+            self.conns[w].send(xs[i0:i1])
+        except OSError:
+            pass # worker died, detected by eval_batch
+
+    def _restart(self, w):
+        self.conns[w].close()
+        self.proc[w].join()
+        self.crashes += 1
+        self._start_worker(w)
+
+    def _start_worker(self, w):
+        conn, worker_conn = Pipe()
+        p = Process(target=_evaluate_batch, args=(self.fun, worker_conn))
+        p.start()
+        worker_conn.close()
+        self.conns[w] = conn
+        self.proc[w] = p
+
 def _eval_parallel_segment(xs, ys, i0, i1, evaluator):
     for i in range(i0, i1):
-        evaluator.pipe[0].send((i, xs[i]))
+        evaluator.evaluate(i, xs[i])
     for _ in range(i0, i1):        
-        i, y = evaluator.pipe[0].recv()
+        i, y = evaluator.result()
         ys[i] = y
     return ys
 
@@ -74,3 +638,51 @@ def _evaluate(fun, pipe, read_mutex, write_mutex): # worker
             y =  sys.float_info.max
         with write_mutex:            
             pipe[1].send((i, y)) # Send result
+
+def _evaluate_thread(fun, requests, results): # worker thread
+    while True:
+        msg = requests.get()
+        if msg is None:
+            break # shutdown thread
+        i, x = msg
+        try:
+            y = fun(x)
+        except Exception as ex:
+            y = sys.float_info.max
+        results.put((i, y))
+
+def _evaluate_shared(fun, conn, xs_buf, ys_buf, dts_buf, dim, nobj): # worker
+    xs = np.frombuffer(xs_buf).reshape(-1, dim)
+    ys = np.frombuffer(ys_buf).reshape(-1, nobj)
+    dts = np.frombuffer(dts_buf)
+    while True:
+        s = _from_token(conn.recv_bytes()) # Read slot index from the worker pipe
+        if s < 0:
+            break # shutdown worker
+        t0 = time.perf_counter()
+        try:
+            ys[s] = fun(xs[s].copy())
+        except Exception as ex:
+            ys[s] = sys.float_info.max
+        dts[s] = time.perf_counter() - t0
+        conn.send_bytes(_to_token(s)) # Signal result
+
+def _evaluate_batch(fun, conn): # worker
+    while True:
+        msg = conn.recv() # Read chunk from the worker pipe
+        if msg is None:
+            break # shutdown worker
+        xs = msg
+        t0 = time.perf_counter()
+        try:
+            ys = np.asarray(fun(xs), dtype = np.float64).reshape(len(xs))
+            ys[~np.isfinite(ys)] = sys.float_info.max
+        except Exception as ex:
+            ys = np.full(len(xs), sys.float_info.max)
+        conn.send((ys, time.perf_counter() - t0)) # Send results
+
+def _to_token(s):
+    return s.to_bytes(4, 'little', signed=True)
+
+def _from_token(token):
+    return int.from_bytes(token, 'little', signed=True)
@@ -19,7 +19,8 @@ from scipy.optimize import OptimizeResult
 from fcmaes.ldecpp import callback_par, call_back_par
 from fcmaes.decpp import libcmalib
 from fcmaes import de
-from fcmaes.evaluator import Evaluator, eval_parallel
+from fcmaes.cmaes import batch
+from fcmaes.evaluator import create_evaluator, BatchEvaluator, eval_parallel
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
 
@@ -34,7 +35,11 @@ def minimize(fun,
              cr0 = 0.0,
              rg = Generator(MT19937()),
              runid=0,
-             workers = None):  
+             workers = None,
+             vectorized = False,
+             pool = None,
+             threaded = False,
+             is_terminate = None):  
      
     """Minimization of a scalar function of one or more variables using a 
     C++ GCL Differential Evolution implementation called via ctypes.
@@ -72,7 +77,19 @@ def minimize(fun,
     workers : int or None, optional
         If not workers is None, function evaluation is performed in parallel for the whole population. 
         Useful for costly objective functions but is deactivated for parallel retry.      
- 
+    vectorized : boolean, optional
+        If true, ``fun(X) -> ndarray`` maps a 2-D array with shape (m, dim) to m function values
+        and is called for the whole population. If not workers is None, chunks of the
+        population are evaluated in parallel.
+    pool : fcmaes.pool.Pool or fcmaes.remote.Cluster, optional
+        If defined and not vectorized, its worker processes are used for parallel function 
+        evaluation instead of spawning new ones.
+    threaded : boolean, optional
+        If true and not vectorized, threads are used for parallel function evaluation 
+        instead of processes. Useful if the objective function releases the GIL.
+    is_terminate : callable, optional
+        Callback to be used if the caller of minimize wants to decide when to terminate.
+        Called with the population arguments and their function values after each generation.
            
     Returns
     -------
@@ -92,9 +109,12 @@ def minimize(fun,
         upper = [0]*dim
     if stop_fitness is None:
         stop_fitness = math.inf   
-    parfun = None if workers is None else parallel(fun, workers)
+    if workers is None:
+        parfun = batch(fun) if vectorized else None
+    else:
+        parfun = parallel(fun, workers, vectorized, pool, threaded)
     array_type = ct.c_double * dim   
-    c_callback_par = call_back_par(callback_par(fun, parfun))
+    c_callback_par = call_back_par(callback_par(fun, parfun, is_terminate))
     seed = int(rg.uniform(0, 2**32 - 1))
     res = np.empty(dim+4)
     res_p = res.ctypes.data_as(ct.POINTER(ct.c_double))
@@ -108,12 +128,12 @@ def minimize(fun,
         evals = int(res[dim+1])
         iterations = int(res[dim+2])
         stop = int(res[dim+3])
-        if not parfun is None:
+        if not workers is None:
             parfun.stop() # stop all parallel evaluation processes
         return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, success=True)
     except Exception as ex:
         if not workers is None:
-            fun.stop() # stop all parallel evaluation processes
+            parfun.stop() # stop all parallel evaluation processes
         return OptimizeResult(x=None, fun=sys.float_info.max, nfev=0, nit=0, status=-1, success=False)  
 
 class parallel(object):
@@ -122,13 +142,26 @@ class parallel(object):
     Parameters
     ----------
     fun : objective function mapping a list of float arguments to a float value.
+    workers : int, optional
+        number of parallel processes.
+    vectorized : boolean, optional
+        If true, fun maps a 2-D array of arguments to an array of float values
+        and is applied to chunks of the population.
+    pool : fcmaes.pool.Pool or fcmaes.remote.Cluster, optional
+        If defined and not vectorized, its worker processes are used instead of spawning new ones.
+    threaded : boolean, optional
+        If true and not vectorized, threads are used instead of processes.
    
     represents a function mapping a list of lists of float arguments to a list of float values
     by applying the input function using parallel processes. stop needs to be called to avoid
     a resource leak"""
         
-    def __init__(self, fun, workers = mp.cpu_count()):
-        self.evaluator = Evaluator(fun)
+    def __init__(self, fun, workers = mp.cpu_count(), vectorized = False, pool = None, 
+                 threaded = False):
+        if vectorized:
+            self.evaluator = BatchEvaluator(fun)
+        else:
+            self.evaluator = create_evaluator(fun, pool = pool, threaded = threaded)
         self.evaluator.start(workers)
     
     def __call__(self, xs):
@@ -136,7 +169,7 @@ class parallel(object):
 
     def stop(self):
         self.evaluator.stop()
-      
+
 optimizeGCLDE_C = libcmalib.optimizeGCLDE_C
 optimizeGCLDE_C.argtypes = [ct.c_long, call_back_par, ct.c_int, ct.c_int, \
             ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), \
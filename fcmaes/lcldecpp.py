@@ -36,7 +36,8 @@ def minimize(fun,
              cr0 = 0.0,
              rg = Generator(MT19937()),
              runid=0,
-             workers = None):  
+             workers = None,
+             is_terminate = None):  
      
     """Minimization of a scalar function of one or more variables using a 
     C++ LCL Differential Evolution implementation called via ctypes.
@@ -77,7 +78,9 @@ def minimize(fun,
     workers : int or None, optional
         If not workers is None, function evaluation is performed in parallel for the whole population. 
         Useful for costly objective functions but is deactivated for parallel retry.      
- 
+    is_terminate : callable, optional
+        Callback to be used if the caller of minimize wants to decide when to terminate.
+        Called with the population arguments and their function values after each generation.
            
     Returns
     -------
@@ -104,7 +107,7 @@ def minimize(fun,
         stop_fitness = math.inf   
     parfun = None if workers is None else parallel(fun, workers)
     array_type = ct.c_double * dim   
-    c_callback_par = call_back_par(callback_par(fun, parfun))
+    c_callback_par = call_back_par(callback_par(fun, parfun, is_terminate))
     seed = int(rg.uniform(0, 2**32 - 1))
     res = np.empty(dim+4)
     res_p = res.ctypes.data_as(ct.POINTER(ct.c_double))
@@ -123,8 +126,8 @@ def minimize(fun,
             parfun.stop() # stop all parallel evaluation processes
         return OptimizeResult(x=x, fun=val, nfev=evals, nit=iterations, status=stop, success=True)
     except Exception as ex:
-        if not workers is None:
-            fun.stop() # stop all parallel evaluation processes
+        if not parfun is None:
+            parfun.stop() # stop all parallel evaluation processes
         return OptimizeResult(x=None, fun=sys.float_info.max, nfev=0, nit=0, status=-1, success=False)  
       
 optimizeLCLDE_C = libcmalib.optimizeLCLDE_C
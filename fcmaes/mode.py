@@ -44,12 +44,17 @@
 import numpy as np
 import os
 import time
+import warnings
 import ctypes as ct
 from numpy.random import Generator, MT19937
-from fcmaes.evaluator import Evaluator
+from fcmaes.evaluator import create_evaluator
 from fcmaes import moretry
 import multiprocessing as mp
 from fcmaes.optimizer import logger
+from fcmaes.monitor import LiveFile
+from fcmaes.stop import Stop
+from fcmaes.budget import Budget
+from fcmaes.pool import Lock
 from fcmaes import moretry
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
@@ -70,7 +75,10 @@ def minimize(mofun,
              rg = Generator(MT19937()),
              logger = None,
              plot_name = None,
-             store = None):  
+             store = None,
+             timeout = None,
+             pool = None,
+             threaded = False):  
       
     """Minimization of a multi objjective function of one or more variables using
     Differential Evolution.
@@ -126,6 +134,16 @@ def minimize(mofun,
     store : result store, optional
         if defined the optimization results are added to the result store. For multi threaded execution.
         use workers=1 if you call minimize from multiple threads
+    timeout : float, optional
+        Maximal wall clock time in seconds for a single parallel function evaluation.
+        Workers exceeding it are replaced and ``sys.float_info.max`` is used for all function values.
+        Their number is logged, or issued as warning if logger is None.
+    pool : fcmaes.pool.Pool or fcmaes.remote.Cluster, optional
+        If defined, its worker processes are used for parallel function evaluation
+        instead of spawning new ones. timeout is ignored in this case.
+    threaded : boolean, optional
+        If true, threads are used for parallel function evaluation instead of processes.
+        Useful if the objective function releases the GIL. timeout and pool are ignored in this case.
             
     Returns
     -------
@@ -135,7 +153,10 @@ def minimize(mofun,
             f, cr, nsga_update, pareto_update, rg, ints, modifier, logger, plot_name)
     try:
         if workers and workers > 1:
-            x, y, evals, iterations, stop = mode.do_optimize_delayed_update(mofun, max_evaluations, workers)
+            x, y, evals, iterations, stop = mode.do_optimize_delayed_update(mofun, max_evaluations, workers, 
+                                                                           timeout, pool, threaded)
+            if mode.timeouts > 0 and logger is None:
+                warnings.warn('{0} evaluations exceeded the timeout'.format(mode.timeouts))
         else:      
             x, y, evals, iterations, stop = mode.do_optimize(mofun, max_evaluations)
         if not store is None:
@@ -158,20 +179,60 @@ class store():
         number of objectives
     capacity : int, optional
         capacity of the result store.
+    livefile : string, optional
+        if defined the results are kept in this memory mapped file to monitor
+        the optimization, see fcmaes.monitor.
     """
     
-    def __init__(self, dim, nobj, capacity = mp.cpu_count()*512):    
+    def __init__(self, dim, nobj, capacity = mp.cpu_count()*512, livefile = None):    
         self.dim = dim
         self.nobj = nobj
         self.capacity = capacity
-        self.add_mutex = mp.Lock()    
-        self.xs = mp.RawArray(ct.c_double, self.capacity * self.dim)
-        self.ys = mp.RawArray(ct.c_double, self.capacity * self.nobj)  
+        self.add_mutex = Lock()    
+        if livefile is None:
+            self.live = None
+            self.xs = mp.RawArray(ct.c_double, self.capacity * self.dim)
+            self.ys = mp.RawArray(ct.c_double, self.capacity * self.nobj)  
+        else:
+            self.live = LiveFile(livefile, dim, nobj, capacity)
+            self.xs = self.live.xs
+            self.ys = self.live.ys
         self.num_stored = mp.RawValue(ct.c_int, 0) 
         self.num_added = mp.RawValue(ct.c_int, 0) 
+        self.stop = Stop() # shared stop condition checked by the optimizers
+        self.budget = Budget() # cores shared by the optimization runs
+
+    def __getstate__(self): # views of the live file are recreated after unpickling
+        state = self.__dict__.copy()
+        if not self.live is None:
+            del state['xs']
+            del state['ys']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if not self.live is None:
+            self.xs = self.live.xs
+            self.ys = self.live.ys
+
+    def clear(self):
+        with self.add_mutex:
+            self._begin()
+            self.num_stored.value = 0
+            self.num_added.value = 0
+            self._end()
+
+    def _begin(self):
+        if not self.live is None:
+            self.live.begin()
+
+    def _end(self):
+        if not self.live is None:
+            self.live.end(self.num_stored.value, 0, self.num_added.value)
 
     def add_results(self, xs, ys):
         with self.add_mutex:
+            self._begin()
             self.num_added.value += 1
             i = self.num_stored.value
             for j in range(len(xs)):
@@ -189,6 +250,7 @@ class store():
                     if i == self.capacity:
                         break
             self.num_stored.value = i
+            self._end()
                       
     def get_front(self):
         return moretry.pareto(self.get_xs(), self.get_ys())
@@ -346,35 +408,42 @@ class MODE(object):
         x, y = filter(self.x, self.y)
         return x, y, self.evals, self.iterations, self.stop
 
-    def do_optimize_delayed_update(self, fun, max_evals, workers=mp.cpu_count()):
+    def do_optimize_delayed_update(self, fun, max_evals, workers=mp.cpu_count(), timeout=None,
+                                   pool=None, threaded=False):
         self.fun = fun
         self.max_evals = max_evals    
-        evaluator = Evaluator(self.fun)
+        evaluator = create_evaluator(self.fun, self.dim, self.nobj + self.ncon, timeout=timeout, 
+                                     pool=pool, threaded=threaded, logger=getattr(self, 'logger', None))
         evaluator.start(workers)
-        evals_x = {}
-        self.iterations = 0
-        self.evals = 0
-        self.p = 0
-        for _ in range(workers): # fill queue with initial population
-            p, x = self.ask()
-            evaluator.pipe[0].send((self.evals, x))
-            evals_x[self.evals] = p, x # store x
-            self.evals += 1
+        try:
+            evals_x = {}
+            self.iterations = 0
+            self.evals = 0
+            self.p = 0
+            for _ in range(workers): # fill queue with initial population
+                p, x = self.ask()
+                evaluator.evaluate(self.evals, x)
+                evals_x[self.evals] = p, x # store x
+                self.evals += 1
             
-        while True: # read from pipe, tell de and create new x
-            evals, y = evaluator.pipe[0].recv()            
-            p, x = evals_x[evals] # retrieve evaluated x
-            del evals_x[evals]
-            self.tell(p, y, x) # tell evaluated x
-            if self.stop != 0 or self.evals >= self.max_evals:
-                break # shutdown worker if stop criteria met
+            while True: # read result, tell de and create new x
+                evals, y = evaluator.result()            
+                p, x = evals_x[evals] # retrieve evaluated x
+                del evals_x[evals]
+                self.tell(p, y, x) # tell evaluated x
+                if self.stop != 0 or self.evals >= self.max_evals:
+                    break # shutdown worker if stop criteria met
             
-            p, x = self.ask() # create new x          
-            evaluator.pipe[0].send((self.evals, x))       
-            evals_x[self.evals] = p, x  # store x
-            self.evals += 1
+                p, x = self.ask() # create new x          
+                evaluator.evaluate(self.evals, x)       
+                evals_x[self.evals] = p, x  # store x
+                self.evals += 1
             
-        evaluator.stop()
+        finally:
+            evaluator.stop()
+        self.timeouts = evaluator.timeouts # number of evaluations exceeding the timeout
+        if evaluator.timeouts > 0 and hasattr(self, 'logger'):
+            self.logger.info('{0} evaluations exceeded the timeout'.format(evaluator.timeouts))
         x, y = filter(self.x, self.y)
         return x, y, self.evals, self.iterations, self.stop
 
@@ -51,7 +51,9 @@ import multiprocessing as mp
 from multiprocessing import Process
 import numpy as np
 from numpy.random import MT19937, Generator
-from fcmaes.decpp import mo_call_back_type, callback_mo, libcmalib
+from fcmaes.decpp import mo_call_back_type, callback_mo, libcmalib, \
+    call_back_par, callback_par, single, worker_fun
+from fcmaes.native import NativeFun
 from fcmaes import de, mode, moretry
 from fcmaes.mode import filter
 from numpy.random import Generator, MT19937, SeedSequence
@@ -80,7 +82,9 @@ def minimize(mofun,
              plot_name = None,
              store = None,
              is_terminate = None,
-             runid=0):  
+             runid=0,
+             parfun = None,
+             processes = False):  
      
     """Minimization of a multi objjective function of one or more variables using
     Differential Evolution.
@@ -139,6 +143,17 @@ def minimize(mofun,
         Callback to be used if the caller of minimize wants to decide when to terminate.
     runid : int, optional
         id used to identify the run for debugging / logging. 
+    parfun : callable, optional
+        Evaluates a whole population, ``parfun(xs) -> ys`` maps a 2-D array with shape 
+        (popsize, dim) to a 2-D array with shape (popsize, nobj + ncon), for instance a 
+        vectorized objective function. If defined it replaces mofun and workers, each generation 
+        is evaluated by a single call. is_terminate is then called with the population arguments 
+        and their function values after each generation.
+    processes : boolean, optional
+        If true and workers > 1, mofun is evaluated by worker processes, see evaluator.ProcessFun.
+        Useful for Python objective functions holding the GIL. Otherwise the C++ evaluator 
+        threads call mofun directly. A NativeFun is called directly without holding the GIL 
+        if is_terminate is None.
 
     Returns
     -------
@@ -156,29 +171,52 @@ def minimize(mofun,
         ints = [False]*dim
     if workers is None:
         workers = 0        
+    if not parfun is None and optimizeMODE_par_C is None:
+        mofun, parfun = single(parfun), None # library built without population callback
     array_type = ct.c_double * dim   
     bool_array_type = ct.c_bool * dim 
-    c_callback = mo_call_back_type(callback_mo(mofun, dim, nobj + ncon, is_terminate))
+    pfun = None
+    if not parfun is None:
+        c_callback = call_back_par(callback_par(mofun, parfun, is_terminate, nobj + ncon))
+    elif isinstance(mofun, NativeFun) and is_terminate is None: 
+        # called directly, nobj of mofun needs to be nobj + ncon
+        c_callback = mofun.vector_callback()
+    else:
+        fun, pfun = worker_fun(mofun, dim, nobj + ncon, min(workers, popsize), processes)
+        c_callback = mo_call_back_type(callback_mo(fun, dim, nobj + ncon, is_terminate))
     c_log = mo_call_back_type(log_mo(plot_name, dim, nobj, ncon))
     seed = int(rg.uniform(0, 2**32 - 1))
     res = np.empty(2*dim*popsize) # stores the resulting pareto front parameters
     res_p = res.ctypes.data_as(ct.POINTER(ct.c_double))
     try:
-        optimizeMODE_C(runid, c_callback, c_log, dim, nobj, ncon, seed,
+        if parfun is None:
+            optimizeMODE_C(runid, c_callback, c_log, dim, nobj, ncon, seed,
                            array_type(*lower), array_type(*upper), bool_array_type(*ints), 
                            max_evaluations, popsize, workers, f, cr, 
                            pro_c, dis_c, pro_m, dis_m,
                            nsga_update, pareto_update, log_period, res_p)
+        else:
+            optimizeMODE_par_C(runid, c_callback, c_log, dim, nobj, ncon, seed,
+                           array_type(*lower), array_type(*upper), bool_array_type(*ints), 
+                           max_evaluations, popsize, f, cr, 
+                           pro_c, dis_c, pro_m, dis_m,
+                           nsga_update, pareto_update, log_period, res_p)
         x = np.empty((2*popsize,dim))
         for p in range(2*popsize):
             x[p] = res[p*dim : (p+1)*dim]
-        y = np.array([mofun(xi) for xi in x])
+        if parfun is None:
+            y = np.array([mofun(xi) for xi in x])
+        else:
+            y = np.reshape(parfun(x), (2*popsize, nobj + ncon))
         x, y = filter(x, y)
         if not store is None:
             store.add_results(x, y)
         return x, y
     except Exception as ex:
         return None, None
+    finally:
+        if not pfun is None:
+            pfun.stop() # stop the evaluation processes
   
 def retry(mofun, 
             nobj, 
@@ -191,7 +229,12 @@ def retry(mofun,
             nsga_update = True,
             ints = None,
             logger = None,
-            is_terminate = None):
+            is_terminate = None,
+            pool = None,
+            store = None,
+            max_time = None,
+            eval_workers = 1,
+            livefile = None):
     """Minimization of a multi objjective function of one or more variables using parallel 
      optimization retry.
      
@@ -228,18 +271,44 @@ def retry(mofun,
         is switched off. Default is a logger which logs both to stdout and
         appends to a file ``optimizer.log``.
     is_terminate : callable, optional
-        Callback to be used if the caller of minimize wants to decide when to terminate. """
+        Callback to be used if the caller of minimize wants to decide when to terminate. 
+    pool : fcmaes.pool.Pool, optional
+        If defined, its worker processes are used instead of spawning new ones.
+    store : mode.store, optional
+        Result store, cleared before use. If None, a new store is created. 
+        The store is sent to the pool workers with each task.
+    max_time : float, optional
+        wall clock time limit in seconds. Running optimizations are terminated
+        when it is reached. 
+    eval_workers : int, optional
+        number of parallel function evaluations of each optimization run. 
+        workers // eval_workers runs are executed in parallel, runs started when 
+        fewer runs remain get more evaluation workers, see fcmaes.budget. 
+    livefile : string, optional
+        if defined and store is None, the store is kept in this memory mapped file to 
+        monitor the optimization, see fcmaes.monitor. """
     
     dim, _, _ = de._check_bounds(bounds, None)
-    store = mode.store(dim, nobj + ncon, 100*popsize*2)
+    if store is None:
+        store = mode.store(dim, nobj + ncon, 100*popsize*2, livefile = livefile)
+    else:
+        store.clear()
+    store.stop.clear()
+    store.stop.set_max_time(max_time)
+    store.budget.set(workers, eval_workers)
+    retries = store.budget.retries() if pool is None else min(store.budget.retries(), pool.workers)
     sg = SeedSequence()
-    rgs = [Generator(MT19937(s)) for s in sg.spawn(workers)]
-    proc=[Process(target=_retry_loop,
-           args=(num_retries, pid, rgs, mofun, nobj, ncon, bounds, popsize, 
-                 max_evaluations, workers, nsga_update, is_terminate, store, logger, ints))
-                for pid in range(workers)]
-    [p.start() for p in proc]
-    [p.join() for p in proc]
+    rgs = [Generator(MT19937(s)) for s in sg.spawn(retries)]
+    args = [(num_retries, pid, rgs, mofun, nobj, ncon, bounds, popsize, 
+            max_evaluations, retries, nsga_update, is_terminate, store, logger, ints)
+                for pid in range(retries)]
+    with store.stop.on_signals(): # SIGTERM stops all workers
+        if pool is None:
+            proc=[Process(target=_retry_loop, args=arg) for arg in args]
+            [p.start() for p in proc]
+            [p.join() for p in proc]
+        else: # reuse the pool workers, store is sent with the tasks
+            pool.map(_retry_loop, args)
     xs, ys = store.get_front()   
     if not logger is None:
         logger.info(str([tuple(y) for y in ys]))            
@@ -249,16 +318,138 @@ def _retry_loop(num_retries, pid, rgs, mofun, nobj, ncon, bounds, popsize,
                 max_evaluations, workers, nsga_update, is_terminate, store, logger, ints):
     t0 = time.perf_counter()
     num = max(1, num_retries - workers)
-    while store.num_added.value < num: 
+    while store.num_added.value < num and not store.stop.is_set(): 
         if not is_terminate is None and hasattr(is_terminate, 'reinit'):
             is_terminate.reinit()
-        minimize(mofun, nobj, ncon, bounds, popsize,
-                    max_evaluations = max_evaluations, nsga_update=nsga_update,
-                    workers = 1, rg = rgs[pid], store = store, is_terminate=is_terminate, ints=ints) 
+        # runs are counted when finished
+        share = store.budget.acquire(num - store.num_added.value - store.budget.running.value - 1)
+        try:
+            minimize(mofun, nobj, ncon, bounds, popsize,
+                        max_evaluations = max_evaluations, nsga_update=nsga_update,
+                        workers = share, rg = rgs[pid], store = store, 
+                        is_terminate=store.stop.wrap(is_terminate), ints=ints) 
+        finally:
+            store.budget.release(share)
         if not logger is None:
             logger.info("retries = {0}: time = {1:.1f} i = {2}"
                         .format(store.num_added.value, dtime(t0), store.num_stored.value))
 
+class MODE_C(object):
+    """ask/tell interface of the C++ multi objective differential evolution. Function 
+    evaluation is left to the caller, for instance an asynchronous, distributed or pooled 
+    evaluation engine. The population is updated after popsize told values.
+    
+    Parameters
+    ----------
+    nobj : int
+        number of objectives
+    ncon : int
+        number of constraints, told function values are vectors of size nobj + ncon
+    bounds : sequence or `Bounds`
+        Bounds on variables. There are two ways to specify the bounds:
+            1. Instance of the `scipy.Bounds` class.
+            2. Sequence of ``(min, max)`` pairs for each element in `x`. None
+               is used to specify no bound.
+    popsize : int, optional
+        Population size.
+    f, cr, pro_c, dis_c, pro_m, dis_m, nsga_update, pareto_update : optional
+        see minimize
+    rg = numpy.random.Generator, optional
+        Random generator for creating random guesses.
+    ints = list or array of bool, optional
+        indicating which parameters are discrete integer values.
+    runid : int, optional
+        id used to identify the run for debugging / logging."""
+    
+    def __init__(self,
+                 nobj, 
+                 ncon,
+                 bounds,
+                 popsize = 64, 
+                 f = 0.5, 
+                 cr = 0.9, 
+                 pro_c = 1.0,
+                 dis_c = 20.0,
+                 pro_m = 1.0,
+                 dis_m = 20.0,
+                 nsga_update = False,
+                 pareto_update = 0,
+                 ints = None,
+                 rg = Generator(MT19937()),
+                 runid=0):
+        if initMODE_C is None:
+            raise ImportError('libacmalib was built without the ask/tell interface, rebuild _fcmaescpp')
+        dim, lower, upper = de._check_bounds(bounds, None)
+        if popsize is None:
+            popsize = 64
+        if popsize % 2 == 1 and nsga_update: # nsga update requires even popsize
+            popsize += 1
+        if lower is None:
+            lower = [0]*dim
+            upper = [0]*dim  
+        if ints is None:
+            ints = [False]*dim
+        self.dim = dim
+        self.nobj = nobj
+        self.ncon = ncon
+        self.popsize = popsize
+        array_type = ct.c_double * dim   
+        bool_array_type = ct.c_bool * dim 
+        self.ptr = initMODE_C(runid, dim, nobj, ncon, int(rg.uniform(0, 2**32 - 1)),
+                           array_type(*lower), array_type(*upper), bool_array_type(*ints), 
+                           popsize, f, cr, pro_c, dis_c, pro_m, dis_m,
+                           nsga_update, pareto_update)
+        self.xs = None
+        self.ps = None
+    
+    def __del__(self):
+        if not getattr(self, 'ptr', None) is None:
+            destroyMODE_C(self.ptr)
+            self.ptr = None
+        
+    def ask(self, n = None):
+        """ask for n new argument vectors, default is popsize.
+            
+        Returns
+        -------
+        xs : 2-D array with shape (n, dim)."""
+        
+        n = self.popsize if n is None else n
+        self.xs = np.empty((n, self.dim))
+        self.ps = np.empty(n, dtype=np.intc) # population indices
+        askMODE_C(self.ptr, n, self.xs.ctypes.data_as(ct.POINTER(ct.c_double)),
+                  self.ps.ctypes.data_as(ct.POINTER(ct.c_int)))
+        return self.xs
+        
+    def tell(self, ys, xs = None):
+        """tell function values for the argument vectors retrieved by the last ask().
+    
+        Parameters
+        ----------
+        ys : list of function value vectors of size nobj + ncon
+        xs : list of dim sized argument vectors, optional
+            modified argument vectors, the order needs to be the same as returned by ask()
+ 
+        Returns
+        -------
+        stop : int termination criteria, if != 0 loop should stop."""
+        
+        if self.ps is None:
+            raise ValueError('call ask before tell')
+        xs = np.ascontiguousarray(self.xs if xs is None else xs, dtype=np.float64)
+        ys = np.ascontiguousarray(ys, dtype=np.float64)
+        return tellMODE_C(self.ptr, len(ys), ys.ctypes.data_as(ct.POINTER(ct.c_double)), 
+                          xs.ctypes.data_as(ct.POINTER(ct.c_double)),
+                          self.ps.ctypes.data_as(ct.POINTER(ct.c_int)))
+    
+    def population(self):
+        """argument vectors and function values of the current population."""
+        xs = np.empty((2*self.popsize, self.dim))
+        ys = np.empty((2*self.popsize, self.nobj + self.ncon))
+        populationMODE_C(self.ptr, xs.ctypes.data_as(ct.POINTER(ct.c_double)),
+                         ys.ctypes.data_as(ct.POINTER(ct.c_double)))
+        return xs[:self.popsize], ys[:self.popsize]
+
 class log_mo(object):
     
     def __init__(self, name, dim, nobj, ncon):
@@ -302,3 +493,32 @@ optimizeMODE_C.argtypes = [ct.c_long, mo_call_back_type, mo_call_back_type, ct.c
             ct.c_double, ct.c_double, ct.c_double, ct.c_double, ct.c_double, ct.c_double, 
             ct.c_bool, ct.c_double, ct.c_int, ct.POINTER(ct.c_double)]
 
+try:
+    optimizeMODE_par_C = libcmalib.optimizeMODE_par_C
+    optimizeMODE_par_C.argtypes = [ct.c_long, call_back_par, mo_call_back_type, ct.c_int, ct.c_int, \
+            ct.c_int, ct.c_int, ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_bool), \
+            ct.c_int, ct.c_int, \
+            ct.c_double, ct.c_double, ct.c_double, ct.c_double, ct.c_double, ct.c_double, 
+            ct.c_bool, ct.c_double, ct.c_int, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before the population callback was added
+    optimizeMODE_par_C = None
+
+try:
+    initMODE_C = libcmalib.initMODE_C
+    initMODE_C.argtypes = [ct.c_long, ct.c_int, ct.c_int, ct.c_int, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.POINTER(ct.c_bool), \
+            ct.c_int, ct.c_double, ct.c_double, \
+            ct.c_double, ct.c_double, ct.c_double, ct.c_double, ct.c_bool, ct.c_double]
+    initMODE_C.restype = ct.c_void_p
+    destroyMODE_C = libcmalib.destroyMODE_C
+    destroyMODE_C.argtypes = [ct.c_void_p]
+    askMODE_C = libcmalib.askMODE_C
+    askMODE_C.argtypes = [ct.c_void_p, ct.c_int, ct.POINTER(ct.c_double), ct.POINTER(ct.c_int)]
+    tellMODE_C = libcmalib.tellMODE_C
+    tellMODE_C.argtypes = [ct.c_void_p, ct.c_int, ct.POINTER(ct.c_double), \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_int)]
+    populationMODE_C = libcmalib.populationMODE_C
+    populationMODE_C.argtypes = [ct.c_void_p, ct.POINTER(ct.c_double), ct.POINTER(ct.c_double)]
+except AttributeError: # library built before the ask/tell interface was added
+    initMODE_C = None
+
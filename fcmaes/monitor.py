@@ -0,0 +1,187 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Live store file for external monitoring of running optimizations.
+
+    retry.Store, advretry.Store and mode.store keep their entries in a memory mapped
+    file if created with the ``livefile`` parameter. Other processes read the current
+    state without affecting the optimization:
+
+        fcmaes-monitor opt.live --top 5 --follow 10
+
+    or in Python:
+
+        state = LiveFile.open('opt.live').read(top = 5)
+
+    The file starts with a versioned header. Writers increment the sequence counter
+    before and after each change, readers retry if it is odd or changed while
+    reading (seqlock). All writes are done holding the store lock.
+"""
+
+import sys
+import time
+import mmap
+import argparse
+import numpy as np
+
+MAGIC = 0x4556494c534d4346 # 'FCMSLIVE'
+VERSION = 1
+
+# int64 header fields
+_MAGIC, _VERSION, _SEQ, _DIM, _NOBJ, _CAPACITY, _NUM_STORED, _COUNT_EVALS, _COUNT_RUNS = range(9)
+_INTS = 16
+# float64 header fields
+_T_START, _T_UPDATE, _BEST_Y = range(3)
+_FLOATS = 8
+
+class LiveFile(object):
+    """Memory mapped store file: header, best x, ys (capacity * nobj), xs (capacity * dim).
+
+    Parameters
+    ----------
+    name : string
+        file name.
+    dim : int
+        number of variables.
+    nobj : int
+        number of function values of an entry.
+    capacity : int
+        number of entries."""
+
+    def __init__(self, name, dim, nobj, capacity):
+        self.name = name
+        self.dim = dim
+        self.nobj = nobj
+        self.capacity = capacity
+        self.readonly = False
+        with open(name, 'wb') as f:
+            f.truncate(_size(dim, nobj, capacity))
+        self._map()
+        self.ints[:] = 0
+        self.ints[[_MAGIC, _VERSION, _DIM, _NOBJ, _CAPACITY]] = [MAGIC, VERSION, dim, nobj, capacity]
+        self.floats[:] = np.nan
+        self.floats[_T_START] = self.floats[_T_UPDATE] = time.time()
+        self.depth = 0
+
+    @classmethod
+    def open(cls, name, readonly = True):
+        """maps an existing live file."""
+        live = cls.__new__(cls)
+        live.name = name
+        live.readonly = readonly
+        with open(name, 'rb') as f:
+            ints = np.frombuffer(f.read(8 * _INTS), dtype=np.int64)
+        if len(ints) < _INTS or ints[_MAGIC] != MAGIC:
+            raise ValueError(name + ' is no fcmaes live file')
+        if ints[_VERSION] != VERSION:
+            raise ValueError(name + ' has unsupported version ' + str(ints[_VERSION]))
+        live.dim, live.nobj, live.capacity = [int(i) for i in ints[[_DIM, _NOBJ, _CAPACITY]]]
+        live._map()
+        live.depth = 0
+        return live
+
+    def __getstate__(self): # the file is mapped again after unpickling
+        return {k: self.__dict__[k] for k in ('name', 'dim', 'nobj', 'capacity', 'readonly')}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._map()
+        self.depth = 0
+
+    def _map(self):
+        with open(self.name, 'rb' if self.readonly else 'r+b') as f:
+            self.mm = mmap.mmap(f.fileno(), 0,
+                    access = mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE)
+        buf = memoryview(self.mm)
+        self.ints = np.frombuffer(buf, dtype=np.int64, count=_INTS)
+        offset = 8 * _INTS
+        self.floats = np.frombuffer(buf, count=_FLOATS, offset=offset)
+        offset += 8 * _FLOATS
+        self.best_x = np.frombuffer(buf, count=self.dim, offset=offset)
+        offset += 8 * self.dim
+        self.ys = np.frombuffer(buf, count=self.capacity*self.nobj, offset=offset)
+        offset += 8 * self.capacity * self.nobj
+        self.xs = np.frombuffer(buf, count=self.capacity*self.dim, offset=offset)
+
+    def begin(self):
+        """starts a change, calls may be nested."""
+        if self.depth == 0:
+            self.ints[_SEQ] += 1 # odd, change in progress
+        self.depth += 1
+
+    def end(self, num_stored, count_evals, count_runs, best_y = np.nan, best_x = None):
+        """finishes a change, updates the header."""
+        self.depth -= 1
+        if self.depth > 0:
+            return
+        self.ints[_NUM_STORED] = num_stored
+        self.ints[_COUNT_EVALS] = count_evals
+        self.ints[_COUNT_RUNS] = count_runs
+        self.floats[_BEST_Y] = best_y
+        if not best_x is None:
+            self.best_x[:] = best_x
+        self.floats[_T_UPDATE] = time.time()
+        self.ints[_SEQ] += 1 # even, consistent
+
+    def read(self, top = 10, timeout = 1):
+        """consistent copy of the header, the best x and the first top entries,
+        sorted by the first function value. Returns a dictionary."""
+        t0 = time.perf_counter()
+        while True:
+            seq = self.ints[_SEQ]
+            if seq % 2 == 0:
+                ints = self.ints.copy()
+                floats = self.floats.copy()
+                best_x = self.best_x.copy()
+                n = min(int(ints[_NUM_STORED]), self.capacity)
+                ys = self.ys[:n*self.nobj].reshape(n, self.nobj).copy()
+                xs = self.xs[:n*self.dim].reshape(n, self.dim).copy()
+                if self.ints[_SEQ] == seq:
+                    break
+            if time.perf_counter() - t0 > timeout:
+                raise TimeoutError('live file ' + self.name + ' is not updated consistently')
+            time.sleep(0.0001)
+        idx = np.argsort(ys[:,0], kind='stable')[:top]
+        return {'seq': int(seq), 'dim': self.dim, 'nobj': self.nobj,
+                'num_stored': n, 'count_evals': int(ints[_COUNT_EVALS]),
+                'count_runs': int(ints[_COUNT_RUNS]),
+                't_start': floats[_T_START], 't_update': floats[_T_UPDATE],
+                'best_y': floats[_BEST_Y], 'best_x': best_x,
+                'ys': ys[idx], 'xs': xs[idx]}
+
+def _size(dim, nobj, capacity):
+    return 8 * (_INTS + _FLOATS + dim + capacity * (nobj + dim))
+
+def _print(state, out = sys.stdout):
+    dt = state['t_update'] - state['t_start']
+    print('{0:.1f}s evals {1} runs {2} stored {3} best {4}'.format(
+        dt, state['count_evals'], state['count_runs'], state['num_stored'],
+        state['best_y']), file=out)
+    if not np.isnan(state['best_y']):
+        print('best x ' + str(state['best_x'].tolist()), file=out)
+    for y, x in zip(state['ys'], state['xs']):
+        print(str(y.tolist()) + ' ' + str(x.tolist()), file=out)
+    out.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description='show the state of a running fcmaes optimization')
+    parser.add_argument('file', help='live file passed as livefile to the store')
+    parser.add_argument('--top', type=int, default=10, help='number of entries shown')
+    parser.add_argument('--follow', type=float, default=None,
+                        help='repeat after the given number of seconds')
+    args = parser.parse_args()
+    live = LiveFile.open(args.file)
+    seq = None
+    while True:
+        state = live.read(args.top)
+        if state['seq'] != seq:
+            _print(state)
+            seq = state['seq']
+        if args.follow is None:
+            break
+        time.sleep(args.follow)
+
+if __name__ == '__main__':
+    main()
@@ -28,7 +28,8 @@ def minimize(fun,
              capacity = None,
              optimizer = None,
              statistic_num = 0,
-             plot_name = None
+             plot_name = None,
+             max_time = None
               ):   
     """Minimization of a multi objective function of one or more variables using parallel 
      optimization retry.
@@ -74,6 +75,9 @@ def minimize(fun,
         optimizer to use. Default is a sequence of differential evolution and CMA-ES.
     plot_name : plot_name, optional
         if defined the pareto front is plotted during the optimization to monitor progress
+    max_time : float, optional
+        wall clock time limit in seconds. Running optimizations are terminated
+        when it is reached, the best result found so far is returned. 
      
     Returns
     -------
@@ -85,6 +89,8 @@ def minimize(fun,
         capacity = num_retries
     store = retry.Store(fun, bounds, capacity = capacity, logger = logger, 
                         statistic_num = statistic_num, plot_name = plot_name)
+    if not max_time is None:
+        store.stop.set_max_time(max_time)
     xs = np.array(mo_retry(fun, weight_bounds, ncon, value_exp, 
                            store, optimizer.minimize, num_retries, value_limits, workers))
     ys = np.array([fun(x) for x in xs])
@@ -97,8 +103,9 @@ def mo_retry(fun, weight_bounds, ncon, y_exp, store, optimize, num_retries, valu
     proc=[Process(target=_retry_loop,
             args=(pid, rgs, fun, weight_bounds, ncon, y_exp, 
                   store, optimize, num_retries, value_limits)) for pid in range(workers)]
-    [p.start() for p in proc]
-    [p.join() for p in proc]
+    with store.stop.on_signals(): # SIGTERM stops all workers
+        [p.start() for p in proc]
+        [p.join() for p in proc]
     store.sort()
     store.dump()
     return store.get_xs()
@@ -111,7 +118,7 @@ def _retry_loop(pid, rgs, fun, weight_bounds, ncon, y_exp,
     lower = store.lower
     wlb = np.array(weight_bounds.lb)
     wub = np.array(weight_bounds.ub)
-    while store.get_runs_compare_incr(num_retries):      
+    while store.get_runs_compare_incr(num_retries) and not store.stop.is_set():      
         try:       
             rg = rgs[pid]
             w = rg.uniform(size=len(wub))          
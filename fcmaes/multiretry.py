@@ -5,16 +5,21 @@
 
 # parallel optimization retry of a list of problems. 
 
+import math
+import ctypes as ct
 import numpy as np
-import _pickle as cPickle
-import bz2
 import multiprocessing as mp
+from numpy.random import Generator, MT19937, SeedSequence
 from scipy.optimize import OptimizeResult
 from fcmaes.optimizer import logger, de_cma, eprint
-from fcmaes import advretry
+from fcmaes import advretry, checkpoint
+from fcmaes.stop import Stop
+from fcmaes.pool import Pool, Lock
 
 def minimize(problems, ids=None, num_retries = min(256, 8*mp.cpu_count()), 
-             keep = 0.7, optimizer = de_cma(1500), logger = None, datafile = None):
+             keep = 0.7, optimizer = de_cma(1500), logger = None, datafile = None, 
+             workers = mp.cpu_count(), pool = None, max_time = None, 
+             scheduler = None):
       
     """Minimization of a list of optimization problems by first applying parallel retry
     to filter the best ones and then applying coordinated retry to evaluate these further. 
@@ -52,6 +57,24 @@ def minimize(problems, ids=None, num_retries = min(256, 8*mp.cpu_count()),
         
     datafile, optional
         file to persist / retrieve the internal state of the optimizations. 
+        Written in the background after each round. 
+    
+    workers:  int, optional
+        number of parallel processes used. Ignored if pool is defined.
+    
+    pool:  fcmaes.pool.Pool, optional
+        worker processes used for all retries. If None, a pool is created 
+        and shared by all problems and iterations.
+
+    max_time:  float, optional
+        wall clock time limit in seconds. Running optimizations are terminated
+        when it is reached, the problems are ranked by the results found so far.
+
+    scheduler:  string, optional
+        None optimizes the problems one after another and removes the worst 
+        after each round. 'halving' or 'ucb' optimize all remaining problems 
+        at once, see Scheduler. Problems are removed continuously as soon as 
+        their share of the retries is executed.
      
     Returns
     -------
@@ -70,24 +93,161 @@ def minimize(problems, ids=None, num_retries = min(256, 8*mp.cpu_count()),
     
     if not datafile is None:
         solver.load(datafile)
-        
-    while solver.size() > 1:    
-        solver.retry(optimizer)
-        to_remove = int(round((1.0 - keep) * solver.size()))
-        if to_remove == 0 and keep < 1.0:
-            to_remove = 1
-        solver.remove_worst(to_remove)
-        solver.dump()
-        if not datafile is None:
-            solver.save(datafile)
+    
+    stores = [ps.store for ps in solver.all_stats]
+    stop = Stop(max_time) # shared by all problems
+    for store in stores:
+        store.stop = Stop(parent = stop) # set when the problem is removed
+    if not scheduler is None:
+        sched = Scheduler(stores, num_retries, keep, scheduler, stop, logger, 
+                          [ps.id for ps in solver.all_stats])
+    run_pool = Pool(workers) if pool is None else pool
+    writer = checkpoint.Writer()
+    try:
+        if scheduler is None:
+            while solver.size() > 1 and not stop.is_set():    
+                solver.retry(optimizer, run_pool)
+                to_remove = int(round((1.0 - keep) * solver.size()))
+                if to_remove == 0 and keep < 1.0:
+                    to_remove = 1
+                solver.remove_worst(to_remove)
+                solver.dump()
+                if not datafile is None:
+                    writer.submit(datafile, solver.get_data())
+        else:
+            checkpoints = None if datafile is None else \
+                checkpoint.Periodic(lambda: writer.submit(datafile, solver.get_data()))
+            try:
+                solver.schedule(sched, optimizer, run_pool)
+            finally:
+                if not checkpoints is None:
+                    checkpoints.stop()
+            solver.dump()
+    finally:
+        writer.close()
+        if pool is None:
+            run_pool.stop()
             
     idx = solver.values_all().argsort()
     return list(np.asarray(solver.all_stats)[idx])
         
+class Scheduler(object):
+    """Distributes the optimization runs of the worker processes among the remaining
+    problems. 'halving' assigns each run to the problem having the fewest runs started,
+    'ucb' to the problem maximizing the upper confidence bound of its normalized best
+    value. After each problem received num_retries runs on average, the 
+    100*(1 - keep) % worst problems are removed one by one at evenly spaced numbers 
+    of finished runs, the optimizations of a removed problem are stopped. 
+    No problem is removed before all remaining problems finished a run.
+
+    Parameters
+    ----------
+    stores : list
+        advretry.Store of each problem.
+    num_retries : int
+        average number of runs of each problem between removing the worst ones.
+    keep : float
+        rate of the problems kept after num_retries runs each.
+    policy : string
+        'halving' or 'ucb'.
+    stop : stop.Stop, optional
+        terminates the optimization of all problems.
+    logger, optional
+        logs removed problems.
+    ids : list, optional
+        problem identifiers used in logging.
+    exploration : float, optional
+        weight of the confidence term of the 'ucb' policy."""
+
+    def __init__(self, stores, num_retries, keep = 0.7, policy = 'halving', 
+                 stop = None, logger = None, ids = None, exploration = 1.0):
+        if not policy in ('halving', 'ucb'):
+            raise ValueError('unknown scheduler policy ' + str(policy))
+        n = len(stores)
+        self.stores = stores
+        self.num_retries = num_retries
+        self.keep = keep
+        self.policy = policy
+        self.stop = Stop() if stop is None else stop
+        self.logger = logger
+        self.ids = [str(i+1) for i in range(n)] if ids is None else ids
+        self.exploration = exploration
+        self.mutex = Lock()
+        self.active = mp.RawArray(ct.c_bool, [True]*n)
+        self.started = mp.RawArray(ct.c_long, n) # number of runs started of each problem
+        self.runs = mp.RawArray(ct.c_long, n) # number of runs finished of each problem
+        self.count_runs = mp.RawValue(ct.c_long, 0)
+        self.next_remove = mp.RawValue(ct.c_double, self._interval(n))
+
+    def choose(self, rg):
+        """index of the problem to optimize next, -1 if at most one problem remains."""
+        with self.mutex:
+            idx = self.remaining()
+            if len(idx) <= 1:
+                return -1
+            started = np.array([self.started[i] for i in idx])
+            if self.policy == 'ucb' and np.all(started > 0):
+                ys = np.array([self.stores[i].best_y.value for i in idx])
+                finite = np.isfinite(ys)
+                reward = np.zeros(len(idx))
+                if np.any(finite):
+                    ymin, ymax = np.amin(ys[finite]), np.amax(ys[finite])
+                    reward[finite] = 1 if ymax == ymin else (ymax - ys[finite]) / (ymax - ymin)
+                score = reward + self.exploration * \
+                    np.sqrt(np.log(np.sum(started)) / started)
+                candidates = np.flatnonzero(score == np.amax(score))
+            else:
+                candidates = np.flatnonzero(started == np.amin(started))
+            i = idx[candidates[rg.integers(len(candidates))]]
+            self.started[i] += 1
+            return i
+
+    def done(self, i):
+        """registers a finished run of problem i, removes the worst problem if due."""
+        with self.mutex:
+            self.runs[i] += 1
+            self.count_runs.value += 1
+            if self.count_runs.value >= self.next_remove.value:
+                self._remove_worst()
+
+    def remaining(self):
+        return [i for i in range(len(self.stores)) if self.active[i]]
+
+    def _interval(self, n): # finished runs between removing problems
+        to_remove = int(round((1.0 - self.keep) * n))
+        if to_remove == 0 and self.keep < 1.0:
+            to_remove = 1
+        return math.inf if to_remove == 0 else self.num_retries * n / to_remove
+
+    def _remove_worst(self):
+        idx = self.remaining()
+        if len(idx) <= 1 or any(self.runs[i] == 0 for i in idx):
+            return
+        worst = max(idx, key = lambda i: self.stores[i].best_y.value)
+        self.active[worst] = False
+        self.stores[worst].stop.set() # terminates the running optimizations of the problem
+        self.next_remove.value = self.count_runs.value + self._interval(len(idx) - 1)
+        if not self.logger is None:
+            self.logger.info('removed problem ' + str(self.ids[worst]) + ' ' + 
+                             str(self.stores[worst].best_y.value) + ' runs ' + 
+                             str(self.runs[worst]))
+
+def _schedule_loop(pid, rgs, scheduler, optimize):
+    rg = rgs[pid]
+    while not scheduler.stop.is_set():
+        i = scheduler.choose(rg)
+        if i < 0:
+            break
+        store = scheduler.stores[i]
+        fun = store.wrapper if store.statistic_num > 0 else store.fun
+        store.get_runs_compare_incr(math.inf)
+        advretry._retry_run(fun, store, optimize, rg, pid)
+        scheduler.done(i)
+
 class problem_stats:
 
     def __init__(self, prob, id, index, num_retries = 64, logger = None):
-        self.store = advretry.Store(prob.bounds, logger = logger, num_retries=num_retries)
+        self.store = advretry.Store(prob.fun, prob.bounds, logger = logger, num_retries=num_retries)
         self.prob = prob
         self.name = prob.name
         self.fun = prob.fun
@@ -98,9 +258,11 @@ class problem_stats:
         self.index = index
         self.ret = None
 
-    def retry(self, optimizer):
+    def retry(self, optimizer, pool = None):
         self.retries += self.num_retries
-        self.ret = advretry.retry(self.fun, self.store, optimizer.minimize)
+        self.ret = advretry.retry(self.store, optimizer.minimize, pool = pool, 
+                                  workers = mp.cpu_count() if pool is None else pool.workers,
+                                  num_retries = self.retries)
         self.value = self.store.get_y_best()
  
 class multiretry:
@@ -114,12 +276,31 @@ class multiretry:
         self.problem_stats.append(stats)
         self.all_stats.append(stats)
     
-    def retry(self, optimizer):
+    def retry(self, optimizer, pool = None):
         for ps in self.problem_stats:
             if not self.logger is None:
                 self.logger.info("problem " + ps.prob.name + ' ' + str(ps.id))
-            ps.retry(optimizer)
+            ps.retry(optimizer, pool)
     
+    def schedule(self, scheduler, optimizer, pool):
+        """optimizes all problems at once using the pool workers until 
+        the scheduler removed all but one problem or its stop is set."""
+        rgs = [Generator(MT19937(s)) for s in SeedSequence().spawn(pool.workers)]
+        args = [(pid, rgs, scheduler, optimizer.minimize) for pid in range(pool.workers)]
+        with scheduler.stop.on_signals(): # SIGTERM stops all workers
+            pool.map(_schedule_loop, args)
+        remaining = scheduler.remaining()
+        for i, ps in enumerate(self.all_stats):
+            ps.store.merge()
+            ps.store.sort()
+            ps.retries = scheduler.runs[i]
+            ps.value = ps.store.get_y_best()
+            ps.ret = OptimizeResult(x=ps.store.get_x_best(), fun=ps.value, 
+                        nfev=ps.store.get_count_evals(), success=True)
+        self.problem_stats = [self.all_stats[i] for i in remaining]
+        idx = self.values().argsort()
+        self.problem_stats = list(np.asarray(self.problem_stats)[idx])
+
     def values(self):
         return np.array([ps.value for ps in self.problem_stats])
      
@@ -163,15 +344,13 @@ class multiretry:
     # persist all stats
     def save(self, name):
         try:
-            with bz2.BZ2File(name + '.pbz2', 'w') as f: 
-                cPickle.dump(self.get_data(), f)
+            checkpoint.save(name, self.get_data())
         except Exception as ex:
             eprint('error writing data file ' + name + '.pbz2 ' + str(ex))
 
     def load(self, name):
         try:
-            data = cPickle.load(bz2.BZ2File(name + '.pbz2', 'rb'))
-            self.set_data(data)
+            self.set_data(checkpoint.load(name))
         except Exception as ex:
             eprint('error reading data file ' + name + '.pbz2 ' + str(ex))
   
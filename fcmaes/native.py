@@ -0,0 +1,118 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Objective functions implemented in C.
+
+    The C++ optimizers call Python objective functions through a ctypes callback.
+    A NativeFun passed as objective function is called directly by the optimizer
+    if it has the signature expected by the optimizer:
+
+        bool fun(int dim, const double* x, double* y) // cmaescpp, decpp, bitecpp, csmacpp, modecpp
+        double fun(int dim, const double* x)          // cmaescpp, decpp, bitecpp, csmacpp, ldecpp, dacpp
+
+    The vector form writes the function values to y and returns True to terminate
+    the optimization. Other combinations use a thin adapter forwarding the pointers.
+    Non finite values are handled by the optimizers.
+    If the is_terminate callback of an optimizer is defined, as done by the retries 
+    checking their stop condition, the NativeFun is called by the Python callback 
+    checking is_terminate after each evaluation. 
+    With workers > 1 the C++ evaluator threads call a directly called NativeFun in parallel
+    without holding the GIL, adapters and the Python callback need the GIL.
+
+    The function address is valid in processes forked from the creating process,
+    as used by the parallel retry on Linux.
+
+    Usage:
+
+        # ctypes symbol of a shared library
+        fun = NativeFun(lib.fitness, scalar = True)
+        # numba
+        fun = NativeFun(numba.cfunc('boolean(intc, CPointer(float64), CPointer(float64))')(f))
+        # cffi
+        fun = NativeFun(int(ffi.cast('uintptr_t', callback)))
+
+        ret = cmaescpp.minimize(fun, bounds)
+"""
+
+import ctypes as ct
+import numpy as np
+
+vector_type = ct.CFUNCTYPE(ct.c_bool, ct.c_int, ct.POINTER(ct.c_double), ct.POINTER(ct.c_double))
+scalar_type = ct.CFUNCTYPE(ct.c_double, ct.c_int, ct.POINTER(ct.c_double))
+
+class NativeFun(object):
+    """C objective function, can be called from Python as well.
+
+    Parameters
+    ----------
+    fun : ctypes function, object with an int ``address`` attribute like numba.cfunc or int
+        the C function.
+    scalar : bool, optional
+        True for the form ``double fun(int dim, const double* x)``. If None, it is
+        derived from the restype of ctypes functions and numba.cfunc.
+    nobj : int, optional
+        number of function values of the vector form."""
+
+    def __init__(self, fun, scalar = None, nobj = 1):
+        if scalar is None:
+            cfun = getattr(fun, 'ctypes', fun) # numba.cfunc provides a ctypes function
+            scalar = getattr(cfun, 'restype', None) is ct.c_double
+        self.address = address(fun)
+        self.scalar = scalar
+        self.nobj = nobj
+        self._fun = None
+
+    def __getstate__(self): # ctypes function pointers cannot be pickled
+        state = self.__dict__.copy()
+        state['_fun'] = None
+        return state
+
+    def cfun(self):
+        """ctypes function calling the C function."""
+        if self._fun is None:
+            self._fun = (scalar_type if self.scalar else vector_type)(self.address)
+        return self._fun
+
+    def vector_callback(self):
+        """callback of type vector_type, an adapter if the function has the scalar form."""
+        if not self.scalar:
+            return self.cfun()
+        fun = self.cfun()
+        def adapter(dim, x, y):
+            y[0] = fun(dim, x)
+            return False
+        return vector_type(adapter)
+
+    def scalar_callback(self):
+        """callback of type scalar_type, an adapter if the function has the vector form."""
+        if self.scalar:
+            return self.cfun()
+        fun = self.cfun()
+        y = (ct.c_double * self.nobj)()
+        def adapter(dim, x):
+            fun(dim, x, y)
+            return y[0]
+        return scalar_type(adapter)
+
+    def __call__(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        xp = x.ctypes.data_as(ct.POINTER(ct.c_double))
+        if self.scalar:
+            return float(self.cfun()(len(x), xp))
+        y = np.empty(self.nobj)
+        self.cfun()(len(x), xp, y.ctypes.data_as(ct.POINTER(ct.c_double)))
+        return y[0] if self.nobj == 1 else y
+
+def address(fun):
+    """address of a C function given as ctypes function, object with an int
+    ``address`` attribute or int."""
+    if isinstance(fun, int):
+        return fun
+    if isinstance(fun, ct._CFuncPtr):
+        return ct.cast(fun, ct.c_void_p).value
+    addr = getattr(fun, 'address', None)
+    if isinstance(addr, int):
+        return addr
+    raise TypeError('no C function: ' + str(fun))
@@ -97,6 +97,23 @@ class Optimizer(object):
     def max_eval_num(self, store=None):
         return self.max_evaluations if store is None else \
                 store.eval_num(self.max_evaluations)
+
+    def terminate(self, store=None):
+        """is_terminate callback checking the stop condition of the store."""
+        return getattr(store, 'stop', None)
+
+    def eval_workers(self, store=None, workers=None):
+        """number of parallel function evaluations: workers if defined, else the 
+        share of the core budget of the store acquired by the current run if the 
+        retry requested parallel evaluation, else the workers setting of the optimizer 
+        or 1 for a run of a retry."""
+        if not workers is None:
+            return workers
+        budget = getattr(store, 'budget', None)
+        own = getattr(self, 'workers', None)
+        if not budget is None and (budget.eval_workers.value > 1 or own is None):
+            return budget.current
+        return own
                 
     def get_count_runs(self, store=None):
         return 0 if store is None else \
@@ -229,15 +246,17 @@ class Cma_python(Optimizer):
     
     def __init__(self, max_evaluations=50000,
                  popsize = 31, guess=None, stop_fitness = None,
-                 update_gap = None, sdevs = None):        
+                 update_gap = None, sdevs = None, workers = None):        
         Optimizer.__init__(self, max_evaluations, 'cma py')
         self.popsize = popsize
         self.stop_fitness = stop_fitness
         self.update_gap = update_gap
         self.guess = guess
         self.sdevs = sdevs
+        self.workers = workers
 
-    def minimize(self, fun, bounds, guess=None, sdevs=0.3, rg=Generator(MT19937()), store=None):
+    def minimize(self, fun, bounds, guess=None, sdevs=0.3, rg=Generator(MT19937()), 
+                 store=None, workers=None):
         ret = cmaes.minimize(fun, bounds, 
                 self.guess if not self.guess is None else guess,
                 input_sigma= self.sdevs if not self.sdevs is None else sdevs,
@@ -245,7 +264,9 @@ class Cma_python(Optimizer):
                 popsize=self.popsize, 
                 stop_fitness = self.stop_fitness,
                 rg=rg, runid=self.get_count_runs(store),
-                update_gap = self.update_gap)     
+                update_gap = self.update_gap,
+                workers = self.eval_workers(store, workers),
+                is_terminate = self.terminate(store))     
         return ret.x, ret.fun, ret.nfev
 
 class Cma_cpp(Optimizer):
@@ -272,7 +293,8 @@ class Cma_cpp(Optimizer):
                 stop_fitness=self.stop_fitness,
                 rg=rg, runid=self.get_count_runs(store),
 		              update_gap=self.update_gap,
-                workers=self.workers if workers is None else workers)     
+                workers=self.eval_workers(store, workers),
+                is_terminate=self.terminate(store))     
         return ret.x, ret.fun, ret.nfev
 
 class Cma_orig(Optimizer):
@@ -324,7 +346,7 @@ class De_cpp(Optimizer):
     
     def __init__(self, max_evaluations=50000,
                  popsize = None, stop_fitness = None, 
-                 keep = 200, f = 0.5, cr = 0.9, ints = None):        
+                 keep = 200, f = 0.5, cr = 0.9, ints = None, workers = None):        
         Optimizer.__init__(self, max_evaluations, 'de cpp')
         self.popsize = popsize
         self.stop_fitness = stop_fitness
@@ -332,14 +354,18 @@ class De_cpp(Optimizer):
         self.f = f
         self.cr = cr
         self.ints = ints
+        self.workers = workers
 
-    def minimize(self, fun, bounds, guess=None, sdevs=None, rg=Generator(MT19937()), store=None):
+    def minimize(self, fun, bounds, guess=None, sdevs=None, rg=Generator(MT19937()), 
+                 store=None, workers = None):
         ret = decpp.minimize(fun, None, bounds, 
                 popsize=self.popsize, 
                 max_evaluations = self.max_eval_num(store), 
                 stop_fitness = self.stop_fitness,
                 keep = self.keep, f = self.f, cr = self.cr, ints=self.ints,
-                rg=rg, runid = self.get_count_runs(store))
+                rg=rg, runid = self.get_count_runs(store),
+                workers = self.eval_workers(store, workers),
+                is_terminate = self.terminate(store))
         return ret.x, ret.fun, ret.nfev
 
 class De_python(Optimizer):
@@ -382,12 +408,13 @@ class Cma_ask_tell(Optimizer):
                 rg = rg)       
         iters = self.max_eval_num(store) // self.popsize
         evals = 0
+        terminate = self.terminate(store)
         for j in range(iters):
             xs = es.ask()
             ys = [fun(x) for x in xs]
             evals += len(xs)
             stop = es.tell(ys)
-            if stop != 0:
+            if stop != 0 or (not terminate is None and terminate()):
                 break 
         return es.best_x, es.best_value, evals
 
@@ -410,11 +437,12 @@ class De_ask_tell(Optimizer):
         es = de.DE(dim, bounds, popsize = popsize, rg = rg, keep = self.keep, F = self.f, Cr = self.cr)  
         es.fun = fun  #remove
         max_evals = self.max_eval_num(store)
+        terminate = self.terminate(store)
         while es.evals < max_evals:
             xs = es.ask()
             ys = [fun(x) for x in xs]
             stop = es.tell(ys, xs)
-            if stop != 0:
+            if stop != 0 or (not terminate is None and terminate()):
                 break 
         return es.best_x, es.best_value, es.evals
 
@@ -481,13 +509,17 @@ class GCLDE_cpp(Optimizer):
 
     def minimize(self, fun, bounds, guess=None, sdevs=None, rg=Generator(MT19937()), 
                  store=None, workers = None):
+        workers = self.eval_workers(store, workers)
+        if workers == 1: # a single evaluation process would only add overhead
+            workers = None
         ret = gcldecpp.minimize(fun, None, bounds, 
                 popsize=self.popsize, 
                 max_evaluations = self.max_eval_num(store), 
                 stop_fitness = self.stop_fitness,
                 pbest = self.pbest, f0 = self.f0, cr0 = self.cr0,
                 rg=rg, runid = self.get_count_runs(store),
-                workers = self.workers if workers is None else workers)
+                workers = workers,
+                is_terminate = self.terminate(store))
         return ret.x, ret.fun, ret.nfev
 
 class LCLDE_cpp(Optimizer):
@@ -508,6 +540,9 @@ class LCLDE_cpp(Optimizer):
 
     def minimize(self, fun, bounds, guess=None, sdevs=0.3, rg=Generator(MT19937()), 
                  store=None, workers = None):
+        workers = self.eval_workers(store, workers)
+        if workers == 1: # a single evaluation process would only add overhead
+            workers = None
         ret = lcldecpp.minimize(fun, bounds, 
                 self.guess if not self.guess is None else guess, 
                 self.sdevs if not self.sdevs is None else sdevs,
@@ -516,7 +551,8 @@ class LCLDE_cpp(Optimizer):
                 stop_fitness = self.stop_fitness,
                 pbest = self.pbest, f0 = self.f0, cr0 = self.cr0,
                 rg=rg, runid = self.get_count_runs(store),
-                workers = self.workers if workers is None else workers)
+                workers = workers,
+                is_terminate = self.terminate(store))
 
         return ret.x, ret.fun, ret.nfev
     
@@ -557,7 +593,8 @@ class Csma_cpp(Optimizer):
                 self.sdevs if not self.sdevs is None else sdevs,
                 max_evaluations = self.max_eval_num(store), 
                 stop_fitness = self.stop_fitness,
-                rg=rg, runid = self.get_count_runs(store))     
+                rg=rg, runid = self.get_count_runs(store),
+                is_terminate = self.terminate(store))     
         return ret.x, ret.fun, ret.nfev
 
 class Bite_cpp(Optimizer):
@@ -580,7 +617,8 @@ class Bite_cpp(Optimizer):
                 max_evaluations = self.max_eval_num(store), 
                 stop_fitness = self.stop_fitness, M = self.M, 
                 stall_iterations = self.stall_iterations,
-                rg=rg, runid = self.get_count_runs(store))     
+                rg=rg, runid = self.get_count_runs(store),
+                is_terminate = self.terminate(store))     
         return ret.x, ret.fun, ret.nfev
         
 class Dual_annealing(Optimizer):
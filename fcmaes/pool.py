@@ -0,0 +1,435 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Persistent pool of worker processes.
+    Evaluators and parallel retries usually spawn new processes for each call.
+    A Pool is created once and can be passed to cmaes.minimize, de.minimize,
+    mode.minimize, gcldecpp.minimize, retry.retry, advretry.retry, modecpp.retry
+    and multiretry.minimize to reuse its worker processes. Objective functions
+    are cached in the workers by identity while an evaluator uses them, so they 
+    are sent only once to each worker. Stopping the evaluator releases them.
+
+    A dead worker is replaced. Its running map task is reissued ``retries`` times 
+    before map raises a ChildProcessError, see PoolEvaluator for evaluations.
+
+    Objects containing shared memory like result stores are sent to the workers 
+    with each task. Their shared ctypes values and arrays are replaced by handles 
+    of the shared memory arenas, the workers map the arenas again. Locks are 
+    attached by name, shared objects need to use Lock() instead of mp.Lock(), 
+    which creates locks without a name if processes are forked. The workers 
+    release the shared memory when the task is finished. Like the objective 
+    functions of evaluators, the objective function of a store needs to be picklable.
+    Sending shared memory relies on internals of the CPython multiprocessing 
+    implementation, it is checked at import, see shared_memory_error.
+
+    Usage:
+
+    with Pool(8) as pool:
+        for _ in range(100):
+            ret = cmaes.minimize(fun, bounds, workers = 8, pool = pool)
+"""
+
+import sys
+import io
+import os
+import mmap
+import platform
+import socket
+import pickle
+import ctypes as ct
+import multiprocessing as mp
+from multiprocessing import Process, Pipe, heap, reduction, synchronize
+from multiprocessing.connection import wait
+from collections import deque
+
+_lock_context = mp.get_context('spawn')
+
+def _check_shared_memory(): # error message if the internals used by _SharedPickler changed
+    if platform.python_implementation() != 'CPython' or sys.version_info < (3, 8):
+        return 'requires CPython 3.8 or later'
+    try:
+        wrapper = mp.RawValue(ct.c_int, 0)._wrapper
+        (arena, start, _), _ = wrapper._state
+        if not isinstance(wrapper, heap.BufferWrapper) or not isinstance(start, int):
+            return 'has an unexpected multiprocessing.heap.BufferWrapper'
+        if not hasattr(arena, 'name' if sys.platform == 'win32' else 'fd'):
+            return 'has an unexpected multiprocessing.heap.Arena'
+        lock = _lock_context.Lock()._semlock
+        [getattr(lock, a) for a in ('handle', 'kind', 'maxvalue', 'name')]
+        if not hasattr(synchronize.SemLock, '__setstate__'):
+            return 'has an unexpected multiprocessing.synchronize.SemLock'
+        if sys.platform != 'win32' and not hasattr(reduction, 'sendfds'):
+            return 'lacks multiprocessing.reduction.sendfds'
+    except Exception as ex:
+        return 'has unexpected multiprocessing internals: ' + repr(ex)
+    return None
+
+# None if shared ctypes objects and locks can be sent to the pool workers, 
+# otherwise the reason why not
+shared_memory_error = _check_shared_memory()
+
+def Lock():
+    """Process shared lock which can be sent to the pool workers."""
+    return _lock_context.Lock()
+
+class Pool(object):
+    """Long lived worker processes reused by evaluators and parallel retries.
+
+    Parameters
+    ----------
+    workers : int, optional
+        number of worker processes.
+    retries : int, optional
+        number of retries for a map task killing its worker."""
+
+    def __init__(self, workers = mp.cpu_count(), retries = 1):
+        self.workers = workers
+        self.retries = retries
+        self.funs = {} # cached objective functions and their number of users by identity
+        self.crashes = 0 # number of replaced worker processes
+        self.proc = None
+        self._start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def map(self, target, args_list):
+        """Call target(*args) for all args of args_list in parallel.
+        Returns the list of results, raises the first exception thrown by a call."""
+        results = [None] * len(args_list)
+        tries = [0] * len(args_list)
+        tasks = deque(range(len(args_list)))
+        busy = {} # task index processed by each busy worker
+        error = None
+        while True:
+            for w in range(self.workers):
+                if len(tasks) == 0:
+                    break
+                if not w in busy:
+                    i = tasks.popleft()
+                    try:
+                        self._send(w, ('run', target, args_list[i]))
+                        busy[w] = i
+                    except OSError: # worker died before, not caused by this task
+                        self._restart(w)
+                        tasks.appendleft(i)
+            if len(busy) == 0:
+                break
+            ready = wait([self.conns[w] for w in busy])
+            for w in list(busy.keys()):
+                if self.conns[w] in ready:
+                    i = busy.pop(w)
+                    try:
+                        ok, result = self.conns[w].recv()
+                    except (EOFError, OSError): # worker died executing task i
+                        self._restart(w)
+                        tries[i] += 1
+                        if tries[i] <= self.retries:
+                            tasks.appendleft(i)
+                        elif error is None:
+                            error = ChildProcessError('pool worker died executing task ' + str(i))
+                        continue
+                    if ok:
+                        results[i] = result
+                    elif error is None:
+                        error = result
+        if not error is None:
+            raise error
+        return results
+
+    def evaluator(self, fun, nobj = 1, depth = 2):
+        """Returns an evaluator for fun using the pool workers. nobj is not needed,
+        the results are pickled."""
+        return PoolEvaluator(self, fun, depth)
+
+    def stop(self): # shutdown all workers
+        if self.proc is None:
+            return
+        for w in range(self.workers):
+            try:
+                self._send(w, None)
+            except OSError:
+                pass # worker already dead
+        [p.join() for p in self.proc]
+        for conn in self.conns:
+            conn.close()
+        self.proc = None
+
+    def _acquire(self, fun): # registers a user of fun, returns its key
+        key = id(fun)
+        entry = self.funs.setdefault(key, [fun, 0]) # keeps fun alive, so its id stays unique
+        entry[1] += 1
+        return key
+
+    def _release(self, key): # removes fun from the cache if it has no users left
+        entry = self.funs[key]
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del self.funs[key]
+        for w in range(self.workers):
+            if key in self.known[w]:
+                self.known[w].discard(key)
+                try:
+                    self._send(w, ('drop', key))
+                except OSError:
+                    pass # worker already dead, replaced when used next time
+
+    def _send_eval(self, w, key, i, x): # sends fun to the worker if it is not cached there
+        if not key in self.known[w]:
+            self._send(w, ('fun', key, self.funs[key][0]))
+            self.known[w].add(key)
+        self._send(w, ('eval', key, i, x))
+
+    def _send(self, w, msg): # sends msg and the file descriptors of its shared memory
+        buf = io.BytesIO()
+        pickler = _SharedPickler(buf, self.proc[w].pid)
+        pickler.dump(msg)
+        arenas = pickler.arenas
+        self.conns[w].send_bytes(pickle.dumps(([a.size for a in arenas], buf.getvalue())))
+        if len(arenas) > 0 and sys.platform != 'win32':
+            with socket.fromfd(self.conns[w].fileno(), socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                reduction.sendfds(s, [a.fd for a in arenas])
+
+    def _start(self):
+        self.conns = []
+        self.proc = []
+        self.known = [set() for _ in range(self.workers)] # cached function keys of each worker
+        for _ in range(self.workers):
+            conn, p = self._spawn()
+            self.conns.append(conn)
+            self.proc.append(p)
+
+    def _spawn(self):
+        conn, worker_conn = Pipe()
+        p = Process(target=_work, args=(worker_conn,))
+        p.start()
+        worker_conn.close()
+        return conn, p
+
+    def _restart(self, w): # replaces a dead worker
+        self.conns[w].close()
+        if self.proc[w].is_alive():
+            self.proc[w].kill()
+        self.proc[w].join()
+        self.conns[w], self.proc[w] = self._spawn()
+        self.known[w] = set()
+        self.crashes += 1
+
+class PoolEvaluator(object):
+    """Evaluator using the workers of a pool, provides the same evaluate / result
+    interface as evaluator.SharedEvaluator. Stop waits for running evaluations and
+    releases fun from the worker caches, but doesn't stop the pool workers.
+
+    A dead worker is replaced and its queued requests are reissued, the request 
+    it was evaluating is retried ``retries`` times before the ``penalty`` value 
+    is returned as its result."""
+
+    def __init__(self, pool, fun, depth = 2, retries = 0, penalty = sys.float_info.max):
+        self.pool = pool
+        self.fun = fun
+        self.depth = depth
+        self.retries = retries
+        self.penalty = penalty
+        self.timeouts = 0
+        self.crashes = 0 # number of replaced crashed worker processes
+        self.key = None
+
+    def start(self, workers = None):
+        self.workers = self.pool.workers if workers is None \
+                            else max(1, min(workers, self.pool.workers))
+        self.key = self.pool._acquire(self.fun)
+        self.pending = deque() # requests waiting for a free worker
+        self.sent = [deque() for _ in range(self.workers)] # requests sent to each worker
+        self.tries = {} # number of crashes caused by a request
+        self.idle = deque([w for _ in range(self.depth) for w in range(self.workers)])
+        self.ready = deque()
+        self.done = deque() # failed requests
+
+    def evaluate(self, i, x): # request evaluation of x identified by i
+        if len(self.idle) > 0:
+            self._send(self.idle.popleft(), i, x)
+        else:
+            self.pending.append((i, x))
+
+    def result(self): # blocks until the next (i, y) is available
+        while len(self.done) == 0:
+            conns = self.pool.conns[:self.workers]
+            while len(self.ready) == 0:
+                self.ready.extend(wait(conns))
+            conn = self.ready.popleft()
+            if not conn in conns:
+                continue # connection of a replaced worker
+            w = conns.index(conn)
+            try:
+                i, y = conn.recv()
+            except (EOFError, OSError):
+                self._crashed(w)
+                continue
+            self.sent[w].popleft()
+            self.tries.pop(i, None)
+            self.done.append((i, y))
+            self._next(w)
+        return self.done.popleft()
+
+    def stop(self): # collect the results of running evaluations
+        self.pending.clear()
+        for w in range(self.workers):
+            try:
+                for _ in range(len(self.sent[w])):
+                    self.pool.conns[w].recv()
+            except (EOFError, OSError):
+                self.pool._restart(w)
+            self.sent[w].clear()
+        if not self.key is None:
+            self.pool._release(self.key)
+            self.key = None
+
+    def _next(self, w): # a request slot of worker w is free
+        if len(self.pending) > 0:
+            self._send(w, *self.pending.popleft())
+        else:
+            self.idle.append(w)
+
+    def _send(self, w, i, x):
+        self.sent[w].append((i, x))
+        try:
+            self.pool._send_eval(w, self.key, i, x)
+        except OSError: 
+            if len(self.sent[w]) == 1: # worker died while idle
+                self.sent[w].clear()
+                self.pool._restart(w)
+                self.crashes += 1
+                self._send(w, i, x)
+            # else the crash is detected by result
+
+    def _crashed(self, w): # replaces the dead worker w and reissues its requests
+        self.pool._restart(w)
+        self.crashes += 1
+        sent = self.sent[w]
+        self.sent[w] = deque()
+        if len(sent) > 0: # the worker died evaluating its first request
+            i, x = sent.popleft()
+            self.tries[i] = self.tries.get(i, 0) + 1
+            if self.tries[i] > self.retries:
+                del self.tries[i]
+                self.done.append((i, self.penalty))
+                self._next(w)
+            else:
+                sent.appendleft((i, x))
+        for i, x in sent:
+            self._send(w, i, x)
+
+class _SharedPickler(pickle.Pickler):
+    """Replaces shared ctypes objects by their position in a shared memory arena and 
+    locks by their name or a handle duplicated for the worker process pid."""
+
+    def __init__(self, file, pid):
+        super().__init__(file)
+        self.pid = pid
+        self.arenas = [] # arenas of the shared objects, sent with the message
+        self.index = {} # position of an arena by identity
+
+    def persistent_id(self, obj):
+        if isinstance(obj, (ct._SimpleCData, ct.Array)):
+            wrapper = getattr(obj, '_wrapper', None)
+            if isinstance(wrapper, heap.BufferWrapper): # created by mp.RawValue or mp.RawArray
+                _check_shared_memory_support()
+                (arena, start, _), _ = wrapper._state
+                key = id(arena)
+                if not key in self.index:
+                    self.index[key] = len(self.arenas)
+                    self.arenas.append(arena)
+                name = getattr(arena, 'name', None) # Windows arenas are mapped by name
+                return ('ctype', self.index[key], name, start, _ctype_of(type(obj)))
+        elif isinstance(obj, synchronize.SemLock):
+            _check_shared_memory_support()
+            lock = obj._semlock
+            if sys.platform == 'win32':
+                handle = reduction.DupHandle(lock.handle, _SEMAPHORE_ACCESS, self.pid)
+            elif lock.name is None:
+                raise pickle.PicklingError('locks sent to pool workers need a name, ' +
+                                           'use fcmaes.pool.Lock() instead of mp.Lock()')
+            else:
+                handle = lock.handle
+            return ('lock', type(obj), handle, lock.kind, lock.maxvalue, lock.name)
+        return None
+
+class _SharedUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, sizes, buffers):
+        super().__init__(file)
+        self.sizes = sizes
+        self.buffers = buffers # mapped arenas
+
+    def persistent_load(self, pid):
+        if pid[0] == 'ctype':
+            _, i, name, start, ctype = pid
+            if self.buffers[i] is None: # Windows
+                self.buffers[i] = mmap.mmap(-1, self.sizes[i], tagname=name)
+            return _type_of(ctype).from_buffer(self.buffers[i], start)
+        _, cls, handle, kind, maxvalue, name = pid
+        if sys.platform == 'win32':
+            handle = handle.detach()
+        lock = cls.__new__(cls)
+        lock.__setstate__((handle, kind, maxvalue, name))
+        return lock
+
+_SEMAPHORE_ACCESS = 0x1F0003
+
+def _check_shared_memory_support():
+    if not shared_memory_error is None:
+        raise pickle.PicklingError('shared memory cannot be sent to pool workers using ' + 
+                platform.python_implementation() + ' ' + platform.python_version() + 
+                ', it ' + shared_memory_error + '. Use the retry without pool.')
+
+def _ctype_of(typ): # picklable description of a ctypes type
+    if issubclass(typ, ct.Array):
+        return (_ctype_of(typ._type_), typ._length_)
+    return typ
+
+def _type_of(ctype):
+    if isinstance(ctype, tuple):
+        return _type_of(ctype[0]) * ctype[1]
+    return ctype
+
+def _receive(conn): # receives a message and maps its shared memory
+    sizes, data = pickle.loads(conn.recv_bytes())
+    if len(sizes) > 0 and sys.platform != 'win32':
+        with socket.fromfd(conn.fileno(), socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            fds = reduction.recvfds(s, len(sizes))
+        buffers = []
+        for fd, size in zip(fds, sizes):
+            buffers.append(mmap.mmap(fd, size))
+            os.close(fd)
+    else:
+        buffers = [None] * len(sizes)
+    return _SharedUnpickler(io.BytesIO(data), sizes, buffers).load()
+
+def _work(conn): # worker
+    funs = {}
+    while True:
+        msg = _receive(conn)
+        if msg is None:
+            break # shutdown worker
+        if msg[0] == 'eval':
+            _, key, i, x = msg
+            try:
+                y = funs[key](x)
+            except Exception as ex:
+                y = sys.float_info.max
+            conn.send((i, y))
+        elif msg[0] == 'fun':
+            funs[msg[1]] = msg[2]
+        elif msg[0] == 'drop':
+            funs.pop(msg[1], None)
+        else:
+            try:
+                conn.send((True, msg[1](*msg[2])))
+            except Exception as ex:
+                conn.send((False, ex))
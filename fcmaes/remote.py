@@ -0,0 +1,287 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Parallel function evaluation using worker daemons on several hosts.
+
+    Start a worker daemon on each node:
+
+        fcmaes-worker --host node1 --port 5000 --workers 32 --authkey secret
+
+    and pass a Cluster as pool to cmaes.minimize, de.minimize, mode.minimize
+    or gcldecpp.minimize:
+
+        cluster = Cluster([('node1', 5000), ('node2', 5000)], authkey = b'secret')
+        ret = de.minimize(fun, dim, bounds, workers = 64, pool = cluster)
+
+    The coordinator streams (id, x) requests to the daemons and collects the results.
+    Each daemon evaluates them using a local evaluator.SharedEvaluator and returns
+    its number of evaluations exceeding the timeout with each result. Requests of a
+    daemon dropping its connection are reissued to the other daemons, the coordinator
+    tries to reconnect periodically.
+
+    The objective function is pickled by reference, its module needs to be importable
+    by the daemons. Messages are pickled and authenticated using a shared authkey,
+    use only in trusted networks: Everyone knowing the authkey can execute code on the 
+    daemon hosts. The authkey is passed explicitly or set as environment variable 
+    FCMAES_AUTHKEY, there is no default. Daemons listen to 127.0.0.1 if no host is given.
+"""
+
+import sys
+import os
+import time
+import socket
+import threading
+import signal
+import argparse
+import multiprocessing as mp
+from multiprocessing.connection import Listener, Client, wait, AuthenticationError
+from collections import deque
+from fcmaes.evaluator import SharedEvaluator
+
+def authkey_of(authkey = None):
+    """authkey as bytes, if None the FCMAES_AUTHKEY environment variable is used.
+    Raises ValueError if neither is defined."""
+    if authkey is None:
+        authkey = os.environ.get('FCMAES_AUTHKEY')
+    if not authkey:
+        raise ValueError('no authkey, pass it explicitly or set FCMAES_AUTHKEY')
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+class Cluster(object):
+    """Worker daemons reachable via TCP. Can be passed as pool parameter
+    for parallel function evaluation.
+
+    Parameters
+    ----------
+    addresses : list
+        (host, port) of the worker daemons.
+    authkey : bytes, optional
+        authentication key shared with the worker daemons, if None the FCMAES_AUTHKEY
+        environment variable is used.
+    reconnect_interval : float, optional
+        interval in seconds for reconnection attempts to dropped worker daemons.
+    connect_timeout : float, optional
+        maximal time in seconds without any connected worker daemon."""
+
+    def __init__(self, addresses, authkey = None, reconnect_interval = 10, 
+                 connect_timeout = 60):
+        self.addresses = [tuple(address) for address in addresses]
+        self.authkey = authkey_of(authkey)
+        self.reconnect_interval = reconnect_interval
+        self.connect_timeout = connect_timeout
+
+    def evaluator(self, fun, nobj = 1):
+        """Returns an evaluator for fun using the worker daemons."""
+        return RemoteEvaluator(fun, self.addresses, nobj, self.authkey, self.reconnect_interval,
+                               connect_timeout = self.connect_timeout)
+
+class RemoteEvaluator(object):
+    """Evaluator sending requests to worker daemons, provides the same evaluate / result
+    interface as evaluator.SharedEvaluator. Each daemon gets ``depth`` requests
+    for each of its workers. result raises ConnectionError if no daemon is connected
+    for ``connect_timeout`` seconds."""
+
+    def __init__(self, fun, addresses, nobj = 1, authkey = None,
+                 reconnect_interval = 10, depth = 2, connect_timeout = 60):
+        self.fun = fun
+        self.addresses = addresses
+        self.nobj = nobj
+        self.authkey = authkey_of(authkey)
+        self.reconnect_interval = reconnect_interval
+        self.depth = depth
+        self.connect_timeout = connect_timeout
+        self.timeouts = 0 # number of evaluations exceeding the timeout of the daemons
+        self.reconnects = 0 # number of dropped daemon connections
+
+    def start(self, workers = None): # workers is determined by the daemons
+        n = len(self.addresses)
+        self.conns = [None] * n
+        self.capacity = [0] * n
+        self.sent = [{} for _ in range(n)] # requests in flight for each daemon
+        self.daemon_timeouts = [0] * n # timeouts reported by each daemon connection
+        self.last_try = [-self.reconnect_interval] * n
+        self.pending = deque() # requests waiting for a free daemon
+        self.done = deque()
+        self.unconnected = None # time since no daemon is connected
+        for d in range(n):
+            self._connect(d)
+
+    def evaluate(self, i, x): # request evaluation of x identified by i
+        self.pending.append((i, x))
+        self._dispatch()
+
+    def result(self): # blocks until the next (i, y) is available
+        while len(self.done) == 0:
+            self._reconnect()
+            self._dispatch()
+            live = [conn for conn in self.conns if not conn is None]
+            if len(live) == 0: # wait for reconnection
+                now = time.perf_counter()
+                if self.unconnected is None:
+                    self.unconnected = now
+                elif now - self.unconnected >= self.connect_timeout:
+                    raise ConnectionError('no worker daemon reachable at ' + str(self.addresses))
+                time.sleep(min(1, self.reconnect_interval, self.connect_timeout))
+                continue
+            self.unconnected = None
+            for conn in wait(live, self.reconnect_interval):
+                d = self.conns.index(conn)
+                try:
+                    i, y, timeouts = conn.recv()
+                except (EOFError, OSError):
+                    self._disconnect(d)
+                    continue
+                self.timeouts += timeouts - self.daemon_timeouts[d]
+                self.daemon_timeouts[d] = timeouts
+                del self.sent[d][i]
+                self.done.append((i, y))
+        self._dispatch()
+        return self.done.popleft()
+
+    def stop(self): # close all daemon connections
+        for d in range(len(self.conns)):
+            if not self.conns[d] is None:
+                try:
+                    self.conns[d].send(None)
+                except OSError:
+                    pass
+                self.conns[d].close()
+                self.conns[d] = None
+
+    def _dispatch(self):
+        for d in range(len(self.conns)):
+            while len(self.pending) > 0 and not self.conns[d] is None \
+                        and len(self.sent[d]) < self.capacity[d]:
+                i, x = self.pending.popleft()
+                self.sent[d][i] = x
+                try:
+                    self.conns[d].send(('eval', i, x))
+                except OSError:
+                    self._disconnect(d)
+
+    def _connect(self, d):
+        self.last_try[d] = time.perf_counter()
+        try:
+            # fail fast for unreachable hosts
+            socket.create_connection(self.addresses[d], timeout = 5).close()
+            conn = Client(self.addresses[d], authkey = self.authkey)
+            conn.send(('fun', self.fun, self.nobj))
+            self.capacity[d] = self.depth * conn.recv()
+            self.daemon_timeouts[d] = 0 # counted by the new evaluator of the daemon
+            self.conns[d] = conn
+        except (OSError, EOFError, AuthenticationError):
+            self.conns[d] = None
+
+    def _disconnect(self, d):
+        self.conns[d].close()
+        self.conns[d] = None
+        self.reconnects += 1
+        # reissue lost requests
+        self.pending.extendleft(reversed(list(self.sent[d].items())))
+        self.sent[d] = {}
+
+    def _reconnect(self):
+        now = time.perf_counter()
+        for d in range(len(self.conns)):
+            if self.conns[d] is None and now - self.last_try[d] >= self.reconnect_interval:
+                self._connect(d)
+
+def serve(address = ('127.0.0.1', 5000), workers = mp.cpu_count(), authkey = None,
+          timeout = None):
+    """Worker daemon evaluating the requests of remote evaluators.
+    Each coordinator connection is served by its own thread using a SharedEvaluator
+    with ``workers`` processes.
+
+    Parameters
+    ----------
+    address : (host, port), optional
+        address the daemon listens to.
+    workers : int, optional
+        number of parallel processes used for each connection.
+    authkey : bytes, optional
+        authentication key shared with the coordinators, if None the FCMAES_AUTHKEY
+        environment variable is used. Raises ValueError if neither is defined.
+    timeout : float, optional
+        maximal wall clock time in seconds for a single function evaluation."""
+
+    authkey = authkey_of(authkey)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    served = []
+    try:
+        with Listener(address, authkey = authkey) as listener:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError, AuthenticationError):
+                    continue
+                thread = threading.Thread(target=_serve_connection,
+                                 args=(conn, workers, timeout), daemon=True)
+                thread.start()
+                served = [(t, c) for t, c in served if t.is_alive()] + [(thread, conn)]
+    finally:
+        # the worker processes inherited the coordinator sockets, shutdown
+        # signals the dropped connection to the coordinators and the serving threads
+        for thread, conn in served:
+            try:
+                with socket.socket(fileno = os.dup(conn.fileno())) as s:
+                    s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass # already closed
+        for thread, conn in served: # wait until the workers are stopped
+            thread.join()
+
+def _serve_connection(conn, workers, timeout):
+    evaluator = None
+    running = 0
+    try:
+        _, fun, nobj = conn.recv()
+        evaluator = SharedEvaluator(fun, nobj = nobj, timeout = timeout)
+        evaluator.start(workers)
+        conn.send(workers)
+        while True:
+            while running == 0 or conn.poll(): # read all available requests
+                msg = conn.recv()
+                if msg is None:
+                    return # coordinator finished
+                _, i, x = msg
+                evaluator.evaluate(i, x)
+                running += 1
+            i, y = evaluator.result()
+            conn.send((i, y, evaluator.timeouts))
+            running -= 1
+    except (EOFError, OSError):
+        pass # coordinator disconnected
+    except Exception as ex:
+        print('fcmaes-worker: ' + str(ex), file=sys.stderr)
+    finally:
+        conn.close()
+        if not evaluator is None:
+            evaluator.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description='fcmaes worker daemon')
+    parser.add_argument('--host', default='127.0.0.1', 
+                        help="interface to listen to, default 127.0.0.1, '' for all")
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=mp.cpu_count(),
+                        help='number of evaluation processes')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='maximal time in seconds for a single evaluation')
+    parser.add_argument('--path', default=None,
+                        help='directory added to sys.path to import objective functions')
+    parser.add_argument('--authkey', default=None,
+                        help='authentication key shared with the coordinators, default FCMAES_AUTHKEY')
+    args = parser.parse_args()
+    try:
+        authkey = authkey_of(args.authkey)
+    except ValueError as ex:
+        parser.error(str(ex))
+    if not args.path is None:
+        sys.path.insert(0, args.path)
+    serve((args.host, args.port), args.workers, authkey, args.timeout)
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,10 @@ from scipy.optimize import OptimizeResult, Bounds
 import multiprocessing as mp
 from multiprocessing import Process
 from fcmaes.optimizer import de_cma, dtime, logger
+from fcmaes.monitor import LiveFile
+from fcmaes.stop import Stop
+from fcmaes.budget import Budget
+from fcmaes.pool import Lock
 
 
 os.environ['MKL_DEBUG_CPU_TYPE'] = '5'
@@ -34,7 +38,11 @@ def minimize(fun,
              stop_fitness = -math.inf,
              optimizer = None,
              statistic_num = 0,
-             plot_name = None
+             plot_name = None,
+             livefile = None,
+             max_time = None,
+             time_scaled = False,
+             eval_workers = 1
              ):   
     """Minimization of a scalar function of one or more variables using parallel 
      optimization retry.
@@ -79,7 +87,20 @@ def minimize(fun,
     plot_name : String, optional
         if defined plots are generated during the optimization to monitor progress.
         Requires statistic_num > 100.
-
+    livefile : string, optional
+        if defined the store is kept in this memory mapped file to monitor
+        the optimization, see fcmaes.monitor.
+    max_time : float, optional
+        wall clock time limit in seconds. Running optimizations are terminated
+        when it is reached, the best result found so far is returned. 
+    time_scaled : bool, optional
+        if True the evaluation budget of a run is scaled by the remaining
+        fraction of max_time. 
+    eval_workers : int, optional
+        number of parallel function evaluations of each optimization run. 
+        workers // eval_workers runs are executed in parallel, runs started when 
+        fewer runs remain get more evaluation workers, see fcmaes.budget. 
+        Only used by optimizers supporting parallel function evaluation. 
      
     Returns
     -------
@@ -92,17 +113,29 @@ def minimize(fun,
     if optimizer is None:
         optimizer = de_cma(max_evaluations, popsize, stop_fitness)        
     store = Store(fun, bounds, capacity = capacity, logger = logger, statistic_num = statistic_num, 
-                  plot_name = plot_name)
-    return retry(store, optimizer.minimize, num_retries, value_limit, workers, stop_fitness)
+                  plot_name = plot_name, livefile = livefile, time_scaled = time_scaled)
+    return retry(store, optimizer.minimize, num_retries, value_limit, workers, stop_fitness,
+                 max_time = max_time, eval_workers = eval_workers)
                  
 def retry(store, optimize, num_retries, value_limit = math.inf, 
-          workers=mp.cpu_count(), stop_fitness = -math.inf):
+          workers=mp.cpu_count(), stop_fitness = -math.inf, pool = None, max_time = None,
+          eval_workers = 1):
+    if not max_time is None:
+        store.stop.set_max_time(max_time)
+    store.budget.set(workers, eval_workers)
+    retries = store.budget.retries() if pool is None else min(store.budget.retries(), pool.workers)
     sg = SeedSequence()
-    rgs = [Generator(MT19937(s)) for s in sg.spawn(workers)]
-    proc=[Process(target=_retry_loop,
-            args=(pid, rgs, store, optimize, num_retries, value_limit, stop_fitness)) for pid in range(workers)]
-    [p.start() for p in proc]
-    [p.join() for p in proc]
+    rgs = [Generator(MT19937(s)) for s in sg.spawn(retries)]
+    args = [(pid, rgs, store, optimize, num_retries, value_limit, stop_fitness) 
+            for pid in range(retries)]
+    with store.stop.on_signals(): # SIGTERM stops all workers
+        if pool is None:
+            proc=[Process(target=_retry_loop, args=arg) for arg in args]
+            [p.start() for p in proc]
+            [p.join() for p in proc]
+        else: # reuse the pool workers, store is sent with the tasks
+            pool.map(_retry_loop, args)
+    store.merge()
     store.sort()
     store.dump()
     return OptimizeResult(x=store.get_x_best(), fun=store.get_y_best(), 
@@ -174,8 +207,63 @@ def plot3(front, fname, label=r'$\chi$',
     fig.savefig(fname, dpi=300)
     pl.close('all')
  
+class Staging(object):
+    """Per worker shared memory rings buffering results until a store merges them.
+    Each ring has a single writer, so adding a result needs no lock."""
+
+    def __init__(self, workers, dim, size = 64):
+        self.workers = workers
+        self.dim = dim
+        self.size = size
+        self.xs_buf = mp.RawArray(ct.c_double, workers * size * dim)
+        self.ys_buf = mp.RawArray(ct.c_double, workers * size)
+        self.evals_buf = mp.RawArray(ct.c_int64, workers * size)
+        self.written_buf = mp.RawArray(ct.c_int64, workers) # only incremented by the writer
+        self.merged_buf = mp.RawArray(ct.c_int64, workers) # only incremented by the merger
+        self._create_views()
+
+    def _create_views(self): # numpy views of the shared buffers
+        self.xs = np.frombuffer(self.xs_buf).reshape(self.workers, self.size, self.dim)
+        self.ys = np.frombuffer(self.ys_buf).reshape(self.workers, self.size)
+        self.evals = np.frombuffer(self.evals_buf, dtype=np.int64).reshape(self.workers, self.size)
+        self.written = np.frombuffer(self.written_buf, dtype=np.int64)
+        self.merged = np.frombuffer(self.merged_buf, dtype=np.int64)
+
+    def __getstate__(self): # views are recreated after unpickling
+        return {k: v for k, v in self.__dict__.items() if not isinstance(v, np.ndarray)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._create_views()
+
+    def put(self, w, y, xs, evals):
+        """append a result to the ring of worker w, returns False if the ring is full."""
+        n = self.written[w]
+        if n - self.merged[w] >= self.size:
+            return False
+        i = n % self.size
+        self.xs[w, i] = xs
+        self.ys[w, i] = y
+        self.evals[w, i] = evals
+        self.written[w] = n + 1 # publish the entry after it is written
+        return True
+
+    def drain(self):
+        """removes and returns all unmerged results, call only holding the merge lock."""
+        results = []
+        for w in range(self.workers):
+            n0, n1 = self.merged[w], self.written[w]
+            for n in range(n0, n1):
+                i = n % self.size
+                results.append((self.ys[w, i], self.xs[w, i].copy(), int(self.evals[w, i])))
+            self.merged[w] = n1
+        return results
+
 class Store(object):
-    """thread safe storage for optimization retry results."""
+    """thread safe storage for optimization retry results.
+    Retry workers add their results to per worker staging rings, the worker 
+    acquiring the store lock merges them. Workers not getting the lock don't wait, 
+    their results are merged later. The best result is updated immediately."""
        
     def __init__(self, 
                  fun, # fitness function
@@ -184,7 +272,10 @@ class Store(object):
                  capacity = 500, # capacity of the evaluation store
                  logger = None, # if None logging is switched off
                  statistic_num = 0,
-                 plot_name = None # requires statistic_num > 500
+                 plot_name = None, # requires statistic_num > 500
+                 staging = mp.cpu_count(), # number of staging rings, 0 disables staging
+                 livefile = None, # memory mapped file for monitoring, see fcmaes.monitor
+                 time_scaled = False # scale the evaluation budget by the remaining time
                 ):    
         self.fun = fun
         self.lower, self.upper = _convertBounds(bounds)
@@ -197,9 +288,17 @@ class Store(object):
             self.delta.append(self.upper[k] - self.lower[k])
         
         #shared between processes
-        self.add_mutex = mp.Lock()    
-        self.xs = mp.RawArray(ct.c_double, self.capacity * self.dim)
-        self.ys = mp.RawArray(ct.c_double, self.capacity)  
+        self.add_mutex = Lock()    
+        self.best_mutex = Lock()    
+        self.runs_mutex = Lock()    
+        self.staging = Staging(staging, self.dim) if staging > 0 else None
+        if livefile is None:
+            self.live = None
+            self.xs_buf = mp.RawArray(ct.c_double, self.capacity * self.dim)
+            self.ys_buf = mp.RawArray(ct.c_double, self.capacity)  
+        else:
+            self.live = LiveFile(livefile, self.dim, 1, self.capacity)
+        self._create_views()
         self.count_evals = mp.RawValue(ct.c_long, 0)   
         self.count_runs = mp.RawValue(ct.c_int, 0) 
         self.num_stored = mp.RawValue(ct.c_int, 0) 
@@ -210,6 +309,9 @@ class Store(object):
         self.qmean = mp.RawValue(ct.c_double, 0) 
         self.best_y = mp.RawValue(ct.c_double, math.inf) 
         self.best_x = mp.RawArray(ct.c_double, self.dim)
+        self.stop = Stop() # shared stop condition checked by the optimizers
+        self.budget = Budget() # cores shared by the optimization runs
+        self.time_scaled = time_scaled
         self.statistic_num = statistic_num
         self.plot_name = plot_name
         # statistics                            
@@ -221,6 +323,33 @@ class Store(object):
             self.sevals = mp.RawValue(ct.c_long, 0)
             self.bval = mp.RawValue(ct.c_double, math.inf)
 
+    def _create_views(self): # numpy views of the shared buffers
+        if self.live is None:
+            self.xs = np.frombuffer(self.xs_buf).reshape(self.capacity, self.dim)
+            self.ys = np.frombuffer(self.ys_buf)
+        else:
+            self.xs = self.live.xs.reshape(self.capacity, self.dim)
+            self.ys = self.live.ys
+
+    def _begin(self): # called holding add_mutex before changing the entries
+        if not self.live is None:
+            self.live.begin()
+
+    def _end(self): # publishes the changes to the live file
+        if not self.live is None:
+            self.live.end(self.num_stored.value, self.count_evals.value, 
+                          self.count_runs.value, self.best_y.value, self.best_x)
+
+    def __getstate__(self): # views are recreated after unpickling
+        state = self.__dict__.copy()
+        del state['xs']
+        del state['ys']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._create_views()
+
     # register improvement - time and value
     def wrapper(self, x):
         y = self.fun(x)
@@ -259,6 +388,8 @@ class Store(object):
         return conv
     
     def eval_num(self, max_evals):
+        if self.time_scaled:
+            return max(1, int(max_evals * self.stop.fraction_left()))
         return max_evals
                                              
     def replace(self, i, y, xs):
@@ -267,49 +398,74 @@ class Store(object):
              
     def sort(self): # sort all entries to make room for new ones, determine best and worst
         """sorts all store entries, keep only the 90% best to make room for new ones."""
+        self._begin()
         ns = self.num_stored.value
-        ys = np.asarray(self.ys[:ns])
-        yi = ys.argsort()
-        sortRuns = []
-        for i in range(len(yi)):
-            y = ys[yi[i]]
-            xs = self.get_x(yi[i])
-            sortRuns.append((y, xs))
-        numStored = min(len(sortRuns),int(0.9*self.capacity)) # keep 90% best 
-        for i in range(numStored):
-            self.replace(i, sortRuns[i][0], sortRuns[i][1])
+        numStored = min(ns, int(0.9*self.capacity)) # keep 90% best 
+        yi = self.ys[:ns].argsort()[:numStored]
+        self.ys[:numStored] = self.ys[yi] # fancy indexing copies before writing
+        self.xs[:numStored] = self.xs[yi]
         self.num_sorted.value = numStored  
         self.num_stored.value = numStored  
+        self._end()
         return numStored        
             
-    def add_result(self, y, xs, evals, limit=math.inf):
-        """registers an optimization result at the score."""
+    def add_result(self, y, xs, evals, limit=math.inf, pid=None):
+        """registers an optimization result at the score. If pid is defined, 
+        the result is staged in the ring of worker pid."""
+        if y < limit:
+            if y < self.best_y.value: # checked again holding the lock
+                with self.best_mutex:
+                    if y < self.best_y.value:
+                        self.best_x[:] = xs[:] # publish best_y after its x
+                        self.best_y.value = y
+                        self.dump()
+        else:
+            y = math.inf # only its evaluations are counted
+        if pid is None or self.staging is None or pid >= self.staging.workers \
+                or not self.staging.put(pid, y, xs, evals):
+            with self.add_mutex: 
+                self._merge()
+                self._add(y, xs, evals)
+        elif self.add_mutex.acquire(False): # elected to merge
+            try:
+                self._merge()
+            finally:
+                self.add_mutex.release()
+
+    def merge(self):
+        """merges all staged results."""
         with self.add_mutex:
-            self.incr_count_evals(evals)
-            if y < limit:  
-                self.count_stat_runs.value += 1
-                if y < self.best_y.value:
-                    self.best_y.value = y
-                    self.best_x[:] = xs[:]
-                    self.dump()
-                if self.num_stored.value >= self.capacity-1:
-                    self.sort()
-                cnt = self.count_stat_runs.value
-                diff = y - self.mean.value
-                self.qmean.value += (cnt - 1) * diff*diff / cnt;
-                self.mean.value += diff / cnt
-                ns = self.num_stored.value
-                self.num_stored.value = ns + 1
-                self.replace(ns, y, xs)
-            
+            self._merge()
+
+    def _merge(self):
+        if not self.staging is None:
+            for y, xs, evals in self.staging.drain():
+                self._add(y, xs, evals)
+
+    def _add(self, y, xs, evals):
+        self._begin()
+        self.incr_count_evals(evals)
+        if y < math.inf:  
+            self.count_stat_runs.value += 1
+            if self.num_stored.value >= self.capacity-1:
+                self.sort()
+            cnt = self.count_stat_runs.value
+            diff = y - self.mean.value
+            self.qmean.value += (cnt - 1) * diff*diff / cnt;
+            self.mean.value += diff / cnt
+            ns = self.num_stored.value
+            self.num_stored.value = ns + 1
+            self.replace(ns, y, xs)
+        self._end()
+        
     def get_x(self, pid):
-        return self.xs[pid*self.dim:(pid+1)*self.dim]
+        return self.xs[pid].copy()
 
     def get_x_best(self):
         return np.array(self.best_x[:])
     
     def get_xs(self):
-        return np.array([self.get_x(i) for i in range(self.num_stored.value)])
+        return self.xs[:self.num_stored.value].copy()
     
     def get_y(self, pid):
         return self.ys[pid]
@@ -318,7 +474,7 @@ class Store(object):
         return self.best_y.value
     
     def get_ys(self):
-        return np.array(self.ys[:self.num_stored.value])
+        return self.ys[:self.num_stored.value].copy()
              
     def get_y_mean(self):
         return self.mean.value
@@ -334,13 +490,13 @@ class Store(object):
         return self.count_runs.value
  
     def set_x(self, pid, xs):
-        self.xs[pid*self.dim:(pid+1)*self.dim] = xs[:]
+        self.xs[pid] = xs
        
     def set_y(self, pid, y):
         self.ys[pid] = y    
  
     def get_runs_compare_incr(self, limit):
-        with self.add_mutex:
+        with self.runs_mutex:
             if self.count_runs.value < limit:
                 self.count_runs.value += 1
                 return True
@@ -356,10 +512,7 @@ class Store(object):
         """logs the current status of the store if logger defined."""
         if self.logger is None:
             return
-        Ys = self.get_ys()
-        vals = []
-        for i in range(min(20, len(Ys))):
-            vals.append(round(Ys[i],2))     
+        vals = np.round(self.ys[:min(20, self.num_stored.value)], 2).tolist()
         dt = dtime(self.t0)   
                  
         message = '{0} {1} {2} {3} {4:.6f} {5:.2f} {6:.2f} {7!s} {8!s}'.format(
@@ -375,12 +528,17 @@ def _retry_loop(pid, rgs, store, optimize, num_retries, value_limit, stop_fitnes
         store.logger = logger()
         
     lower = store.lower
-    while store.get_runs_compare_incr(num_retries) and store.best_y.value > stop_fitness:      
+    while store.get_runs_compare_incr(num_retries) and store.best_y.value > stop_fitness \
+            and not store.stop.is_set():      
         try:       
             rg = rgs[pid]
-            sol, y, evals = optimize(fun, Bounds(store.lower, store.upper), None, 
-                                     [rg.uniform(0.05, 0.1)]*len(lower), rg, store)
-            store.add_result(y, sol, evals, value_limit)   
+            share = store.budget.acquire(num_retries - store.get_count_runs())
+            try:
+                sol, y, evals = optimize(fun, Bounds(store.lower, store.upper), None, 
+                                         [rg.uniform(0.05, 0.1)]*len(lower), rg, store)
+            finally:
+                store.budget.release(share)
+            store.add_result(y, sol, evals, value_limit, pid)   
             if not store.plot_name is None: 
                 name = store.plot_name + "_retry_" + str(store.get_count_evals())
                 xs = np.array(store.get_xs())
@@ -389,6 +547,8 @@ def _retry_loop(pid, rgs, store, optimize, num_retries, value_limit, stop_fitnes
                 plot(y, name, interp=False)    
         except Exception as ex:
             print(str(ex))
+    if store.best_y.value <= stop_fitness: # stop the running optimizations of the other workers
+        store.stop.set()
 #        if pid == 0:
 #            store.dump()
 
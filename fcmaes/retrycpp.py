@@ -0,0 +1,125 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Native parallel retry, see _fcmaescpp/retry.cpp.
+
+    Executes DE -> CMA-ES sequences like advretry.minimize with the default
+    de_cma optimizer, but the retry loop, the result store and the crossover
+    are implemented in C++. The optimization runs are executed by threads of
+    the calling process.
+
+    Intended for objective functions implemented in C, see fcmaes.native,
+    which are called without any interpreter overhead, for instance:
+
+        ret = retrycpp.minimize(Cassini1().native, Cassini1().bounds)
+
+    The native objective function is called in parallel and has to be
+    thread safe. Python objective functions are supported, but are
+    evaluated holding the GIL, use advretry.minimize for them.
+"""
+
+import sys
+import math
+import ctypes as ct
+import multiprocessing as mp
+import numpy as np
+from numpy.random import MT19937, Generator
+from scipy.optimize import OptimizeResult
+from fcmaes import de
+from fcmaes.decpp import libcmalib, mo_call_back_type, c_callbacks
+from fcmaes.native import NativeFun, scalar_type
+
+def minimize(fun,
+             bounds,
+             value_limit = math.inf,
+             num_retries = 5000,
+             workers = mp.cpu_count(),
+             popsize = 31,
+             min_evaluations = 1500,
+             max_eval_fac = None,
+             check_interval = 100,
+             capacity = 500,
+             stop_fitness = -math.inf,
+             max_time = None,
+             rg = Generator(MT19937())):
+    """Minimization of a scalar function of one or more variables using
+    a native coordinated parallel retry of DE -> CMA-ES sequences.
+
+    Parameters
+    ----------
+    fun : NativeFun or callable
+        The objective function to be minimized, preferably a NativeFun.
+            ``fun(x) -> float``
+        where ``x`` is an 1-D array with shape (dim,)
+    bounds : `Bounds`
+        Bounds on variables, instance of the `scipy.Bounds` class.
+    value_limit : float, optional
+        Upper limit for optimized function values to be stored.
+    num_retries : int, optional
+        Number of optimization retries.
+    workers : int, optional
+        number of threads executing optimization runs in parallel.
+    popsize : int, optional
+        Population size of DE and CMA-ES.
+    min_evaluations : int, optional
+        Initial limit of the number of function evaluations of a run.
+    max_eval_fac : float, optional
+        Final limit of the number of function evaluations = max_eval_fac*min_evaluations
+    check_interval : int, optional
+        After check_interval runs the store is sorted and the evaluation limit is incremented.
+    capacity : int, optional
+        capacity of the result store.
+    stop_fitness : float, optional
+         Limit for fitness value. If reached the retry terminates.
+    max_time : float, optional
+        wall clock time limit in seconds, running optimizations are terminated.
+    rg = numpy.random.Generator, optional
+        Random generator for the seed of the threads.
+
+    Returns
+    -------
+    res : scipy.OptimizeResult
+        The optimization result is represented as an ``OptimizeResult`` object.
+        Important attributes are: ``x`` the solution array,
+        ``fun`` the best function value,
+        ``nfev`` the number of function evaluations,
+        ``nit`` the number of optimization runs,
+        ``success`` a Boolean flag indicating if the optimizer exited successfully."""
+
+    if optimizeRetry_C is None:
+        raise ImportError('libacmalib was built without the native retry, rebuild _fcmaescpp')
+    dim, lower, upper = de._check_bounds(bounds, None)
+    if lower is None:
+        raise ValueError('the native retry requires bounds')
+    if max_eval_fac is None:
+        max_eval_fac = min(50, 1 + num_retries // check_interval)
+    if isinstance(fun, NativeFun) and fun.scalar:
+        c_callback, c_scalar = mo_call_back_type(), fun.cfun() # null callback
+    else:
+        c_callback, c_scalar = c_callbacks(fun, dim)[0], scalar_type()
+    array_type = ct.c_double * dim
+    seed = int(rg.uniform(0, 2**32 - 1))
+    res = np.zeros(dim + 4)
+    try:
+        optimizeRetry_C(c_callback, c_scalar, dim,
+                        array_type(*lower), array_type(*upper), value_limit,
+                        num_retries, workers, popsize, min_evaluations, max_eval_fac,
+                        check_interval, capacity, stop_fitness,
+                        -1 if max_time is None else max_time,
+                        seed, res.ctypes.data_as(ct.POINTER(ct.c_double)))
+        return OptimizeResult(x=res[:dim], fun=res[dim], nfev=int(res[dim+1]),
+                              nit=int(res[dim+2]), success=True)
+    except Exception as ex:
+        return OptimizeResult(x=None, fun=sys.float_info.max, nfev=0, nit=0, success=False)
+
+try:
+    optimizeRetry_C = libcmalib.optimizeRetry_C
+    optimizeRetry_C.argtypes = [mo_call_back_type, scalar_type, ct.c_int, \
+            ct.POINTER(ct.c_double), ct.POINTER(ct.c_double), ct.c_double, \
+            ct.c_int, ct.c_int, ct.c_int, ct.c_int, ct.c_double, \
+            ct.c_int, ct.c_int, ct.c_double, ct.c_double, \
+            ct.c_long, ct.POINTER(ct.c_double)]
+except AttributeError: # library built before the native retry was added
+    optimizeRetry_C = None
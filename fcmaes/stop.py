@@ -0,0 +1,90 @@
+# Copyright (c) Dietmar Wolz.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory.
+
+""" Stop condition shared by parallel optimization workers.
+
+    The retry stores own a Stop instance. Retry loops check it before starting a run,
+    optimizers check it as ``is_terminate`` callback for each function evaluation
+    (C++ optimizers) or iteration (Python optimizers) so that running optimizations
+    return their best result as soon as the deadline is reached or any worker 
+    sets the stop flag, for instance after reaching stop_fitness or receiving SIGTERM.
+"""
+
+import time
+import math
+import signal
+import threading
+import ctypes as ct
+import multiprocessing as mp
+from contextlib import contextmanager
+
+class Stop(object):
+    """Shared stop flag and wall clock deadline. Calling the instance with arbitrary 
+    arguments returns True if the optimization should terminate, so it can be passed
+    as ``is_terminate`` callback. A stop with parent is also set if its parent is set,
+    multiretry uses this to stop the optimizations of a single problem."""
+
+    def __init__(self, max_time = None, parent = None):
+        self.parent = parent
+        self.flag = mp.RawValue(ct.c_bool, False)
+        self.t0 = mp.RawValue(ct.c_double, time.time())
+        self.deadline = mp.RawValue(ct.c_double, math.inf)
+        if not max_time is None:
+            self.set_max_time(max_time)
+
+    def set(self):
+        """signals all workers to stop."""
+        self.flag.value = True
+
+    def clear(self):
+        self.flag.value = False
+
+    def set_max_time(self, max_time):
+        """sets the deadline to max_time seconds from now, None removes it."""
+        self.t0.value = time.time()
+        self.deadline.value = math.inf if max_time is None else self.t0.value + max_time
+
+    def set_deadline(self, deadline):
+        """sets the absolute deadline in seconds since the epoch."""
+        self.deadline.value = deadline
+
+    def time_left(self):
+        left = self.deadline.value - time.time()
+        return left if self.parent is None else min(left, self.parent.time_left())
+
+    def fraction_left(self):
+        """remaining fraction of the time budget, 1 if there is no deadline."""
+        if math.isinf(self.deadline.value):
+            return 1.0 if self.parent is None else self.parent.fraction_left()
+        total = self.deadline.value - self.t0.value
+        return 0.0 if total <= 0 else max(0.0, min(1.0, self.time_left() / total))
+
+    def is_set(self):
+        return self.flag.value or time.time() >= self.deadline.value or \
+            (not self.parent is None and self.parent.is_set())
+
+    @contextmanager
+    def on_signals(self, signums = (signal.SIGTERM,)):
+        """sets the stop flag when receiving one of the signals inside the with block. 
+        Only effective in the main thread, the previous handlers are restored afterwards.
+        Forked workers inherit the handlers."""
+        if threading.current_thread() is not threading.main_thread():
+            yield self
+            return
+        previous = [signal.signal(s, lambda *args: self.set()) for s in signums]
+        try:
+            yield self
+        finally:
+            for s, handler in zip(signums, previous):
+                signal.signal(s, handler)
+
+    def __call__(self, *args):
+        return self.is_set()
+
+    def wrap(self, is_terminate):
+        """is_terminate callback checking this stop condition first."""
+        if is_terminate is None:
+            return self
+        return lambda *args: self.is_set() or is_terminate(*args)
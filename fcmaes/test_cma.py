@@ -4,11 +4,30 @@
 # LICENSE file in the root directory.
 
 import sys
+import os
+import time
+import asyncio
+import socket
+import tempfile
+import pickle
+import threading
+import functools
+import ctypes as ct
 import multiprocessing as mp
 import numpy as np
-from scipy.optimize import OptimizeResult
+import pytest
+from scipy.optimize import OptimizeResult, Bounds
 from fcmaes.testfun import Wrapper, Rosen, Rastrigin, Eggholder
-from fcmaes import cmaes, de, decpp, cmaescpp, gcldecpp, retry, advretry
+from fcmaes import cmaes, de, decpp, cmaescpp, gcldecpp, retry, advretry, multiretry, asyncopt, remote, ldecpp, retrycpp, checkpoint, \
+    bitecpp, csmacpp, modecpp
+from fcmaes.evaluator import Evaluator, SharedEvaluator, ProcessFun, eval_parallel
+from fcmaes.pool import Pool
+from fcmaes.cache import Cache
+from fcmaes.monitor import LiveFile
+from fcmaes.stop import Stop
+from fcmaes.budget import Budget
+from fcmaes.astro import Cassini1
+from fcmaes.optimizer import Cma_cpp
 
 def almost_equal(X1, X2, eps = 1E-5):
     if np.isscalar(X1):
@@ -355,4 +374,633 @@ def test_eggholder_advanced_retry():
     assert(ret.nfev == wrapper.get_count()) # wrong number of function calls returned
     assert(almost_equal(ret.x, wrapper.get_best_x())) # wrong best X returned
     assert(almost_equal(ret.fun, wrapper.get_best_y())) # wrong best y returned
- 
\ No newline at end of file
+ 
+def test_shared_evaluator():
+    dim = 3
+    testfun = Rosen(dim)
+    xs = np.random.uniform(-1, 1, (300, dim))
+    ys = [testfun.fun(x) for x in xs]
+    for evaluator in [Evaluator(testfun.fun), SharedEvaluator(testfun.fun, dim)]:
+        evaluator.start(2)
+        assert(almost_equal(eval_parallel(xs, evaluator), ys)) # wrong function values
+        evaluator.stop()
+
+def test_shared_evaluator_stats():
+    dim = 3
+    testfun = Rosen(dim)
+    xs = np.random.uniform(-1, 1, (300, dim))
+    evaluator = SharedEvaluator(testfun.fun, dim)
+    evaluator.start(2)
+    eval_parallel(xs, evaluator)
+    stats = evaluator.stats()
+    evaluator.stop()
+    assert(stats['evaluations'] == 300) # all evaluations counted
+    assert(np.sum(stats['worker_evaluations']) == 300) # per worker counters
+    assert(np.sum(stats['latency_hist']) == 300) # each latency is binned
+    assert(stats['queue_max'] > 0) # requests exceeding the slots are queued
+    assert(0 <= stats['utilization'] <= 1) # busy time fraction
+
+def rosen_vectorized(xs):
+    return np.sum(100.0*(xs[:,1:] - xs[:,:-1]**2)**2 + (1 - xs[:,:-1])**2, axis=1)
+
+def test_rosen_vectorized_parallel():
+    popsize = 16
+    dim = 2
+    testfun = Rosen(dim)
+    max_eval = 10000
+    limit = 0.00001   
+    for _ in range(5):
+        ret = cmaes.minimize(rosen_vectorized, testfun.bounds, input_sigma = [1.0]*dim, 
+                       max_evaluations = max_eval, popsize=popsize, workers = 2, vectorized = True)
+        if limit > ret.fun:
+            break
+    assert(limit > ret.fun) # optimization target not reached
+    assert(max_eval + popsize >= ret.nfev) # too much function calls
+    assert(almost_equal(ret.fun, testfun.fun(ret.x))) # wrong best y returned
+
+def crashing_fun(x):
+    if x[0] > 0.5:
+        os._exit(1) # simulates a crash inside a C extension
+    return sum(x)
+
+def test_shared_evaluator_crash():
+    xs = np.random.uniform(0, 1, (50, 2))
+    evaluator = SharedEvaluator(crashing_fun, 2)
+    evaluator.start(2)
+    ys = eval_parallel(xs, evaluator)
+    evaluator.stop()
+    crashed = xs[:,0] > 0.5
+    assert(np.all(ys[crashed] == sys.float_info.max)) # penalty expected
+    assert(almost_equal(ys[~crashed], np.sum(xs[~crashed], axis=1))) # wrong function values
+    assert(evaluator.crashes == np.sum(crashed)) # each crash replaces a worker
+
+def hanging_fun(x):
+    if x[0] > 0.5:
+        time.sleep(100) # simulates a hanging simulation
+    return sum(x)
+
+def test_shared_evaluator_timeout():
+    xs = np.random.uniform(0, 1, (20, 2))
+    evaluator = SharedEvaluator(hanging_fun, 2, timeout = 0.5)
+    evaluator.start(2)
+    ys = eval_parallel(xs, evaluator)
+    evaluator.stop()
+    hanging = xs[:,0] > 0.5
+    assert(np.all(ys[hanging] == sys.float_info.max)) # penalty expected
+    assert(almost_equal(ys[~hanging], np.sum(xs[~hanging], axis=1))) # wrong function values
+    assert(evaluator.timeouts == np.sum(hanging)) # each timeout replaces a worker
+
+def test_minimize_timeout():
+    bounds = Bounds([0.6, 0], [1, 1]) # all evaluations hang
+    ret = de.minimize(hanging_fun, bounds = bounds, max_evaluations = 4, workers = 2, timeout = 0.2)
+    assert(ret.timeouts > 0) # timeouts not reported
+
+def test_rosen_pool():
+    popsize = 8
+    dim = 2
+    testfun = Rosen(dim)
+    max_eval = 10000
+    limit = 0.00001   
+    with Pool(2) as pool:
+        for _ in range(2): # reuses the pool workers
+            ret = cmaes.minimize(testfun.fun, testfun.bounds, input_sigma = [1.0]*dim, 
+                       max_evaluations = max_eval, popsize=popsize, workers = 2, pool = pool)
+            assert(limit > ret.fun) # optimization target not reached
+            assert(max_eval + popsize >= ret.nfev) # too much function calls
+        store = retry.Store(testfun.fun, testfun.bounds)
+        ret = retry.retry(store, Cma_cpp(2000).minimize, 8, workers = 2, pool = pool)
+        assert(limit > ret.fun) # optimization target not reached
+        assert(store.get_runs_compare_incr(8) == False) # all retries executed
+
+def test_pool_stores():
+    testfun = Rosen(2)
+    with Pool(2) as pool:
+        pids = [p.pid for p in pool.proc]
+        for _ in range(2): # a new store for each retry
+            store = retry.Store(testfun.fun, testfun.bounds)
+            ret = retry.retry(store, Cma_cpp(2000).minimize, 4, workers = 2, pool = pool)
+            assert(0.00001 > ret.fun) # optimization target not reached
+            assert(store.get_count_runs() == 4) # runs not counted in the shared store
+            assert([p.pid for p in pool.proc] == pids) # workers restarted
+
+def test_pool_unsupported(monkeypatch):
+    monkeypatch.setattr('fcmaes.pool.shared_memory_error', 'has unexpected internals')
+    with Pool(1) as p:
+        with pytest.raises(pickle.PicklingError): # clear error instead of a broken worker
+            p.map(id, [(mp.RawValue(ct.c_int, 0),)])
+        assert(p.map(abs, [(-1,)]) == [1]) # plain tasks still supported
+
+def test_pool_crash():
+    xs = np.random.uniform(0, 1, (20, 2))
+    crashed = xs[:,0] > 0.5
+    with Pool(2) as pool:
+        for _ in range(2):
+            evaluator = pool.evaluator(functools.partial(crashing_fun)) # new object each time
+            evaluator.start(2)
+            ys = eval_parallel(xs, evaluator)
+            evaluator.stop()
+            assert(np.all(ys[crashed] == sys.float_info.max)) # penalty expected
+            assert(almost_equal(ys[~crashed], np.sum(xs[~crashed], axis=1))) # wrong function values
+            assert(evaluator.crashes == np.sum(crashed)) # each crash replaces a worker
+        assert(len(pool.funs) == 0) # functions not released
+        assert(pool.map(crashing_fun, [([0, 1],), ([0.2, 1],)]) == [1, 1.2]) # replaced workers usable
+
+AUTHKEY = b'fcmaes-test'
+
+def free_address():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()
+
+def start_daemon(timeout = None):
+    address = free_address()
+    p = mp.Process(target=remote.serve, args=(address, 2, AUTHKEY, timeout))
+    p.start()
+    for _ in range(100): # wait until the daemon listens
+        try:
+            socket.create_connection(address).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return p, address
+
+def test_remote_evaluator():
+    dim = 3
+    testfun = Rosen(dim)
+    daemons = [start_daemon() for _ in range(2)]
+    try:
+        cluster = remote.Cluster([address for _, address in daemons], AUTHKEY)
+        xs = np.random.uniform(-1, 1, (300, dim))
+        ys = [testfun.fun(x) for x in xs]
+        evaluator = cluster.evaluator(testfun.fun)
+        evaluator.start()
+        assert(almost_equal(eval_parallel(xs, evaluator), ys)) # wrong function values
+        daemons[0][0].terminate() # dropped daemon, its requests are reissued
+        assert(almost_equal(eval_parallel(xs, evaluator), ys)) # wrong function values
+        assert(evaluator.reconnects == 1) # one daemon dropped
+        evaluator.stop()
+        ret = cmaes.minimize(testfun.fun, testfun.bounds, input_sigma = [1.0]*dim, 
+                       max_evaluations = 10000, popsize = 8, workers = 4, pool = cluster)
+        assert(0.01 > ret.fun) # optimization target not reached
+    finally:
+        for p, _ in daemons:
+            p.terminate()
+
+def test_remote_timeout():
+    p, address = start_daemon(timeout = 0.2)
+    try:
+        bounds = Bounds([0.6, 0], [1, 1]) # all evaluations hang
+        ret = de.minimize(hanging_fun, bounds = bounds, max_evaluations = 4, workers = 2, 
+                          pool = remote.Cluster([address], AUTHKEY))
+        assert(ret.timeouts > 0) # timeouts of the daemon not reported
+    finally:
+        p.terminate()
+
+def test_remote_unreachable():
+    authkey = os.environ.pop('FCMAES_AUTHKEY', None)
+    try:
+        remote.serve(free_address())
+        assert(False) # daemon started without authkey
+    except ValueError:
+        pass
+    finally:
+        if not authkey is None:
+            os.environ['FCMAES_AUTHKEY'] = authkey
+    evaluator = remote.RemoteEvaluator(Rosen(2).fun, [free_address()], authkey = AUTHKEY, 
+                                       reconnect_interval = 0.1, connect_timeout = 0.5)
+    evaluator.start()
+    evaluator.evaluate(0, np.zeros(2))
+    try:
+        evaluator.result()
+        assert(False) # no daemon reachable
+    except ConnectionError:
+        pass
+
+def test_cache():
+    dim = 3
+    testfun = Rosen(dim)
+    cache = Cache(testfun.fun, key = lambda x: np.round(x, 3))
+    xs = np.round(np.random.uniform(-1, 1, (300, dim)), 3)
+    ys = [testfun.fun(x) for x in xs]
+    evaluator = SharedEvaluator(cache.eval, dim)
+    evaluator.start(2)
+    assert(almost_equal(eval_parallel(xs, evaluator), ys)) # wrong function values
+    assert(almost_equal(eval_parallel(xs + 1E-5, evaluator), ys)) # wrong cached values
+    evaluator.stop()
+    assert(cache.get_misses() == 300) # each x evaluated once
+    assert(cache.get_hits() == 300) # rounded keys shared by all workers
+
+def test_cache_pool():
+    testfun = Rosen(2)
+    cache = Cache(testfun.fun)
+    x = np.array([0.5, 0.5])
+    with Pool(2) as pool:
+        pool.map(cache.eval, [(x,)])
+        ys = pool.map(cache.eval, [(x,)] * 11)
+    assert(almost_equal(ys, [testfun.fun(x)] * 11)) # wrong cached values
+    assert(cache.get_misses() == 1) # table not shared by the pool workers
+    assert(cache.get_hits() == 11) # cached value not found
+
+def _add_results(pid, store, ys):
+    for y in ys:
+        store.add_result(y, np.full(store.dim, y), 1, pid = pid)
+
+def test_retry_staging():
+    testfun = Rosen(2)
+    store = retry.Store(testfun.fun, testfun.bounds, capacity = 1000, staging = 2)
+    ys = np.random.uniform(0, 1, (2, 300))
+    proc = [mp.Process(target=_add_results, args=(pid, store, ys[pid])) for pid in range(2)]
+    [p.start() for p in proc]
+    [p.join() for p in proc]
+    assert(store.get_y_best() == np.amin(ys)) # best result lost
+    assert(almost_equal(store.get_x_best(), np.full(2, np.amin(ys)))) # wrong best x
+    store.merge()
+    assert(store.get_count_evals() == 600) # staged results not merged
+    assert(store.count_stat_runs.value == 600) # results lost
+
+def _sorted_store(xs, ys, diversity):
+    dim = xs.shape[1]
+    store = advretry.Store(Rosen(dim).fun, Bounds([-1]*dim, [2]*dim), diversity = diversity)
+    n = len(ys)
+    store.xs[:n] = xs
+    store.ys[:n] = ys
+    store.num_stored.value = n
+    store.sort()
+    return store
+
+def _clustered(n, dim):
+    centers = np.random.uniform(-1, 2, (10, dim))
+    return np.clip(centers[np.random.randint(0, 10, n)] + 
+                   np.random.normal(0, 0.2, (n, dim)), -1, 2)
+
+def test_diversity_neighbors():
+    dim = 3
+    for _ in range(5):
+        xs = _clustered(400, dim)
+        ys = np.random.uniform(0, 1, 400)
+        store = _sorted_store(xs, ys, 'neighbors')
+        # the rule of the original sort: skip entries similar to one of the two previously kept 
+        yi = ys.argsort()
+        xn = xs[yi] / (3 * np.sqrt(dim))
+        kept = [0]
+        for i in range(1, len(xn)):
+            if all(np.linalg.norm(xn[i] - xn[k]) > 0.15 for k in kept[-2:]):
+                kept.append(i)
+        assert(np.array_equal(store.get_ys(), ys[yi[kept]][:450])) # different entries kept
+        assert(np.array_equal(store.get_xs(), xs[yi[kept]][:450])) # wrong xs
+
+def test_diversity_all():
+    dim = 3
+    xs = _clustered(400, dim)
+    ys = np.random.uniform(0, 1, 400)
+    store = _sorted_store(xs, ys, 'all')
+    xn = store.get_xs() / (3 * np.sqrt(dim))
+    dists = np.linalg.norm(xn[:,None] - xn[None,:], axis=2)
+    assert(np.all(dists[np.triu_indices(len(xn), 1)] > 0.15)) # similar entries kept
+    assert(store.get_ys()[0] == np.amin(ys)) # best entry removed
+    assert(np.all(np.diff(store.get_ys()) > 0)) # not sorted
+    store = _sorted_store(xs, ys, None)
+    assert(np.array_equal(store.get_ys(), np.sort(ys))) # entries removed
+
+def test_limits_batch():
+    dim = 3
+    xs = _clustered(100, dim)
+    ys = np.random.uniform(0, 1, 100)
+    store = _sorted_store(xs, ys, None)
+    rg = np.random.default_rng()
+    proposals = store.limits_batch(20, rg)
+    assert(0 < len(proposals) <= 20) # wrong number of proposals
+    for y0, guess, lower, upper, sdev in proposals:
+        assert(y0 in ys) # y0 not a stored value
+        assert(np.all(store.lower <= lower) and np.all(lower <= guess)) # lower out of bounds
+        assert(np.all(guess <= upper) and np.all(upper <= store.upper)) # upper out of bounds
+        assert(np.all(sdev >= 0.001) and np.all(sdev <= 0.5)) # wrong step size
+    store = _sorted_store(xs[:1], ys[:1], None)
+    assert(len(store.limits_batch(20, rg)) == 0) # crossover needs 2 sorted entries
+    assert(store.limits(rg)[1] is None) # no guess expected
+
+def test_journal():
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = checkpoint.Journal(os.path.join(tmp, 'opt'), 2)
+        assert(journal.size() == 0) # no records expected
+        for i in range(3):
+            journal.append(float(i), [i, -i])
+        segment = journal.rotate()
+        journal.append(3.0, [3, -3])
+        assert(journal.size() == 4) # records lost
+        assert(checkpoint.Journal(journal.name, 2).segment.value == segment) # segment not found
+        ys, xs = journal.read(segment)
+        assert(np.array_equal(ys, [3])) # wrong ys
+        assert(np.array_equal(xs, [[3, -3]])) # wrong xs
+        assert(np.array_equal(journal.read()[0], [0, 1, 2, 3])) # wrong records
+        journal.remove(segment)
+        assert(journal.size() == 1) # older segment not removed
+        journal.clear()
+        assert(journal.size() == 0) # journal not cleared
+        journal.append(4.0, [4, -4])
+        assert(journal.read()[0].tolist() == [4]) # append after clear failed
+
+def test_snapshot_journal():
+    testfun = Rosen(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        name = os.path.join(tmp, 'opt')
+        store = advretry.Store(testfun.fun, testfun.bounds, datafile = name)
+        store.add_result(1.0, np.array([1, 1]), testfun.bounds.lb, testfun.bounds.ub, 10)
+        assert(store.journal.size() == 1) # result not journaled
+        store.save(name)
+        assert(store.journal.size() == 0) # journal not truncated by the snapshot
+        store.add_result(2.0, np.array([-1, -1]), testfun.bounds.lb, testfun.bounds.ub, 10)
+        resumed = advretry.Store(testfun.fun, testfun.bounds, datafile = name)
+        resumed.load(name)
+        assert(np.array_equal(resumed.get_ys(), [1, 2])) # result lost or replayed twice
+
+def test_checkpoint_save_load():
+    with tempfile.TemporaryDirectory() as tmp:
+        name = os.path.join(tmp, 'opt')
+        data = [np.random.uniform(0, 1, (3, 2)), np.arange(3.0), 7]
+        for i in range(2): # replaces the snapshot
+            data[2] = i
+            checkpoint.save(name, data)
+            loaded = checkpoint.load(name)
+            assert(np.array_equal(loaded[0], data[0]) and np.array_equal(loaded[1], data[1]))
+            assert(loaded[2] == i) # wrong data loaded
+            assert(os.listdir(tmp) == ['opt.pbz2']) # temporary file left
+        writer = checkpoint.Writer()
+        writer.submit(name, data[:2] + [2])
+        writer.close()
+        assert(checkpoint.load(name)[2] == 2) # snapshot not written in the background
+
+def test_advretry_resume():
+    testfun = Rosen(2)
+    with tempfile.TemporaryDirectory() as tmp:
+        name = os.path.join(tmp, 'opt')
+        store = advretry.Store(testfun.fun, testfun.bounds, datafile = name)
+        grid = np.linspace(-2.5, 2.5, 3) # entries not removed by the diversity filter
+        xs = np.array([[a, b] for a in grid for b in grid])
+        ys = np.random.uniform(1, 2, len(xs))
+        store.replay(ys, xs)
+        store.save(name)
+        # results found after the snapshot
+        for y, x in [(-2.0, [-5, -5]), (-1.0, [5, 5])]:
+            store.journal.append(y, x)
+        for _ in range(2): # the journal is replayed only once
+            resumed = advretry.Store(testfun.fun, testfun.bounds, datafile = name)
+            resumed.load(name)
+            assert(resumed.get_y_best() == -2) # best y not restored
+            assert(np.array_equal(resumed.get_x_best(), [-5, -5])) # wrong best x
+            assert(np.array_equal(resumed.get_ys(), np.concatenate(([-2, -1], np.sort(ys)))))
+            assert(resumed.journal.size() == 0) # journal not cleared
+        checkpoint.Journal(name, 2).append(-3.0, [5, -5])
+        ret = advretry.minimize(testfun.fun, testfun.bounds, num_retries = 8, 
+                                min_evaluations = 200, workers = 2, datafile = name)
+        assert(ret.fun == -3) # not resumed from the snapshot and journal
+        assert(np.array_equal(ret.x, [5, -5])) # wrong best x
+
+def _slow_rosen(x):
+    time.sleep(0.001)
+    return Rosen(len(x)).fun(x)
+
+def test_retry_max_time():
+    testfun = Rosen(5)
+    t0 = time.perf_counter()
+    ret = retry.minimize(_slow_rosen, testfun.bounds, num_retries = 10000, 
+                         max_evaluations = 100000, max_time = 1)
+    assert(time.perf_counter() - t0 < 3) # deadline not respected
+    assert(ret.nfev > 0) # no result returned
+    assert(ret.fun < 1E10) # no result returned
+
+def test_time_scaled():
+    testfun = Rosen(5)
+    opt = Cma_cpp(10000)
+    for store in [retry.Store(testfun.fun, testfun.bounds, time_scaled = True),
+                  advretry.Store(testfun.fun, testfun.bounds, time_scaled = True)]:
+        full = opt.max_eval_num(store)
+        store.stop.set_max_time(1)
+        evals = [opt.max_eval_num(store)]
+        for _ in range(2):
+            time.sleep(0.3)
+            evals.append(opt.max_eval_num(store))
+        assert(full >= evals[0] > evals[1] > evals[2] >= 1) # budget not scaled
+        assert(evals[2] < 0.6 * full) # budget not scaled by the remaining time
+    store = retry.Store(testfun.fun, testfun.bounds)
+    store.stop.set_max_time(0.1)
+    time.sleep(0.1)
+    assert(opt.max_eval_num(store) == 10000) # scaled without time_scaled
+
+def test_stop_native():
+    testfun = Rosen(5)
+    for workers in [1, 2]:
+        if workers > 1 and not cmaescpp.native_terminate_workers:
+            pytest.skip('libacmalib built without the terminate check of the workers loop')
+        stop = Stop()
+        def is_terminate(x, y):
+            if y[0] < 10:
+                stop.set()
+            return stop.is_set()
+        ret = cmaescpp.minimize(testfun.fun, testfun.bounds, max_evaluations = 100000, 
+                                is_terminate = is_terminate, workers = workers)
+        assert(stop.is_set()) # stop flag not set
+        assert(ret.nfev < 100000) # run not terminated
+        assert(ret.fun == testfun.fun(ret.x)) # result of terminated run corrupted
+
+def test_scheduler():
+    testfun = Rosen(3)
+    stores = [advretry.Store(testfun.fun, testfun.bounds) for _ in range(4)]
+    for i, store in enumerate(stores):
+        store.best_y.value = i
+        store.stop = Stop()
+    scheduler = multiretry.Scheduler(stores, 4, keep = 0.5)
+    rg = np.random.default_rng()
+    runs = 0
+    while True:
+        i = scheduler.choose(rg)
+        if i < 0:
+            break
+        scheduler.done(i)
+        runs += 1
+    assert(scheduler.remaining() == [0]) # best problem not kept
+    assert(stores[3].stop.is_set()) # removed problem not stopped
+    assert(not stores[0].stop.is_set()) # kept problem stopped
+    assert(runs == 8 + 6 + 8) # wrong number of runs
+    
+def test_budget():
+    budget = Budget(8, 2)
+    assert(budget.retries() == 4) # wrong number of parallel runs
+    assert([budget.acquire(10) for _ in range(4)] == [2]*4) # wrong share
+    for _ in range(3):
+        budget.release(2)
+    assert(budget.acquire(0) == 4) # share not increased for the last runs
+    assert(budget.used.value == 6) # wrong number of used cores
+    budget = Budget(8)
+    assert([budget.acquire(0) for _ in range(8)] == [1]*8) # cores without parallel evaluation
+
+class WorkersProbe(Cma_cpp):
+    """Cma_cpp recording the maximal number of evaluation workers of its runs."""
+    
+    def __init__(self, max_evaluations):
+        Cma_cpp.__init__(self, max_evaluations)
+        self.max_workers = mp.RawValue(ct.c_int, 0)
+        
+    def minimize(self, fun, bounds, guess=None, sdevs=0.3, rg=np.random.default_rng(),
+                 store=None, workers=None):
+        workers = self.eval_workers(store, workers)
+        self.max_workers.value = max(self.max_workers.value, workers)
+        return Cma_cpp.minimize(self, fun, bounds, guess, sdevs, rg, store, workers)
+
+def test_retry_eval_workers():
+    testfun = Rosen(3)
+    probe = WorkersProbe(200)
+    retry.minimize(testfun.fun, testfun.bounds, num_retries = 8, workers = 4, 
+                   optimizer = probe)
+    assert(probe.max_workers.value == 1) # parallel evaluation not requested
+
+def test_native_stats():
+    testfun = Rosen(3)
+    for optimize in [cmaescpp.minimize, decpp.minimize]:
+        ret = optimize(testfun.fun, bounds = testfun.bounds, max_evaluations = 2000, 
+                       workers = 2)
+        if decpp.native_telemetry:
+            assert(ret.stats['evaluations'] > 0) # telemetry not returned
+        else:
+            assert(not 'stats' in ret) # no telemetry written by the prebuilt library
+
+def test_native():
+    problem = Cassini1()
+    for optimize in [cmaescpp.minimize, decpp.minimize, bitecpp.minimize, csmacpp.minimize, 
+                     ldecpp.minimize]:
+        ret = optimize(problem.native, bounds = problem.bounds, max_evaluations = 5000)
+        assert(ret.nfev >= 5000 or ret.status != 0) # early termination without stop criterion
+        assert(almost_equal(ret.fun, problem.fun(ret.x))) # wrong function value
+        assert(almost_equal(problem.native(ret.x), problem.fun(ret.x))) # native call from Python
+
+def test_native_terminate():
+    problem = Cassini1()
+    for module in [cmaescpp, decpp, bitecpp, csmacpp]:
+        if not getattr(module, 'native_terminate', True):
+            continue # libacmalib built without the terminate check of the optimizer
+        ret = module.minimize(problem.native, bounds = problem.bounds, max_evaluations = 20000, 
+                       is_terminate = lambda *args: True)
+        assert(ret.nfev < 1000) # is_terminate ignored
+        assert(almost_equal(ret.fun, problem.fun(ret.x))) # wrong function value
+
+def test_parfun():
+    testfun = Rosen(5)
+    calls = [0]
+    def parfun(xs): # vectorized objective
+        calls[0] += 1
+        return [testfun.fun(x) for x in xs]
+    for optimize in [cmaescpp.minimize, decpp.minimize]:
+        calls[0] = 0
+        ret = optimize(None, bounds = testfun.bounds, max_evaluations = 2000, parfun = parfun)
+        assert(ret.nfev >= 2000) # early termination
+        assert(calls[0] > 0 and calls[0] <= ret.nfev) # parfun not called
+        assert(almost_equal(ret.fun, testfun.fun(ret.x))) # wrong function value
+
+def test_ask_tell_native():
+    if cmaescpp.initACMA_C is None:
+        pytest.skip('libacmalib built without the ask/tell interface')
+    testfun = Rosen(5)
+    for opt in [cmaescpp.ACMA_C(testfun.bounds), decpp.DE_C(bounds = testfun.bounds)]:
+        for _ in range(100):
+            xs = opt.ask()
+            stop = opt.tell([testfun.fun(x) for x in xs])
+            if stop != 0:
+                break
+        ret = opt.result()
+        assert(ret.nfev == 100*opt.popsize or stop != 0) # wrong number of evaluations
+        assert(almost_equal(ret.fun, testfun.fun(ret.x))) # wrong function value
+        assert(ret.fun < 10) # no progress
+    
+def test_native_retry():
+    if retrycpp.optimizeRetry_C is None:
+        pytest.skip('libacmalib built without the native retry')
+    problem = Cassini1()
+    ret = retrycpp.minimize(problem.native, problem.bounds, num_retries = 16, workers = 2)
+    assert(ret.nit <= 16) # too many runs
+    assert(ret.fun < 20) # no progress
+    assert(almost_equal(ret.fun, problem.fun(ret.x))) # wrong function value
+    t0 = time.perf_counter()
+    ret = retrycpp.minimize(problem.native, problem.bounds, num_retries = 100000, 
+                            min_evaluations = 100000, workers = 2, max_time = 0.2)
+    assert(time.perf_counter() - t0 < 2) # running optimizations not terminated
+    assert(almost_equal(ret.fun, problem.fun(ret.x))) # wrong function value
+
+def _pid(x):
+    return os.getpid()
+
+def test_process_fun():
+    pfun = ProcessFun(_pid, 2).start(2)
+    results = []
+    threads = [threading.Thread(target = lambda: results.append(pfun([0, 0]))) for _ in range(8)]
+    [t.start() for t in threads]
+    [t.join() for t in threads]
+    pfun.stop()
+    assert(len(results) == 8) # missing results
+    assert(not os.getpid() in results) # not evaluated by a worker process
+    assert(len(set(results)) <= 2) # more processes than workers
+
+def test_rosen_cpp_processes():
+    testfun = Rosen(3)
+    for optimize in [cmaescpp.minimize, decpp.minimize]:
+        ret = optimize(testfun.fun, bounds = testfun.bounds, max_evaluations = 2000, 
+                       workers = 2, processes = True)
+        assert(ret.nfev > 0) # no evaluations
+        assert(almost_equal(ret.fun, testfun.fun(ret.x))) # wrong function value
+
+def test_live_file():
+    testfun = Rosen(3)
+    name = os.path.join(tempfile.gettempdir(), 'fcmaes_test.live')
+    ret = retry.minimize(testfun.fun, testfun.bounds, num_retries = 16, 
+                         max_evaluations = 2000, livefile = name)
+    state = LiveFile.open(name).read(top = 3)
+    os.remove(name)
+    assert(state['seq'] % 2 == 0) # inconsistent live file
+    assert(state['best_y'] == ret.fun) # wrong best y 
+    assert(almost_equal(state['best_x'], ret.x)) # wrong best x
+    assert(state['count_evals'] == ret.nfev) # wrong number of evaluations
+    assert(state['ys'][0,0] == ret.fun) # entries not sorted
+
+def _mo_fun(x):
+    return np.array([np.sum(x**2), np.sum((x - 1)**2)])
+
+def test_live_file_mode():
+    name = os.path.join(tempfile.gettempdir(), 'fcmaes_test_mode.live')
+    xs, ys = modecpp.retry(_mo_fun, 2, 0, Bounds([0, 0], [1, 1]), num_retries = 4, 
+                           popsize = 16, max_evaluations = 1000, workers = 2, livefile = name)
+    state = LiveFile.open(name).read(top = 1000)
+    os.remove(name)
+    assert(state['nobj'] == 2) # wrong live file
+    assert(state['num_stored'] >= len(ys)) # results not stored in the live file
+    assert(any(np.array_equal(y, ys[0]) for y in state['ys'])) # front entry missing
+
+def test_rosen_de_threaded():
+    popsize = 8
+    dim = 2
+    testfun = Rosen(dim)
+    max_eval = 10000    
+    limit = 0.01   
+    for _ in range(5):
+        wrapper = Wrapper(testfun.fun, dim)
+        ret = de.minimize(wrapper.eval, dim, testfun.bounds, max_evaluations = max_eval, 
+                       popsize=popsize, workers = popsize, threaded = True)
+        if limit > ret.fun:
+            break
+    assert(limit > ret.fun) # optimization target not reached
+    assert(max_eval + popsize >= ret.nfev) # too much function calls
+    assert(ret.nfev == wrapper.get_count()) # wrong number of function calls returned
+    assert(almost_equal(ret.fun, wrapper.get_best_y(), eps = 1E-1)) # wrong best y returned
+
+def test_rosen_async():
+    popsize = 8
+    dim = 2
+    testfun = Rosen(dim)
+    max_eval = 10000
+    limit = 0.00001   
+    async def fun(x):
+        await asyncio.sleep(0)
+        return testfun.fun(x)
+    es = cmaes.Cmaes(testfun.bounds, input_sigma = [1.0]*dim, popsize = popsize)
+    ret = asyncio.run(asyncopt.minimize(fun, es, max_evaluations = max_eval, concurrency = 16))
+    assert(limit > ret.fun) # optimization target not reached
+    assert(max_eval >= ret.nfev) # too much function calls
+    assert(almost_equal(ret.fun, testfun.fun(ret.x))) # wrong best y returned
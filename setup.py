@@ -45,4 +45,8 @@ setup(
       ],
     keywords=["optimization", "multi-objective", "constraints", "CMA-ES", "BiteOpt", "MO-DE", "differential evolution", "annealing", "stochastic", "gradient free", "parallel execution", "boundary management"],
     include_package_data=True,
+    entry_points={
+        'console_scripts': ['fcmaes-worker=fcmaes.remote:main',
+                            'fcmaes-monitor=fcmaes.monitor:main'],
+    },
    )